@@ -1,18 +1,55 @@
 from oss2.auth import Auth
 
 from asyncoss.api import Service, Bucket
+from asyncoss.http import Session, ConnectionPool, get_connection_pool, close_connection_pools
 from asyncoss.iterators import (
     BucketIterator,
     ObjectIterator,
+    ShardedObjectIterator,
     MultipartUploadIterator,
     ObjectUploadIterator,
     PartIterator, LiveChannelIterator)
+from asyncoss.resumable import (
+    resumable_upload, resumable_download,
+    ResumableStore, ResumableDownloadStore,
+    determine_part_size, make_upload_store, make_download_store)
+from asyncoss.cache import MetadataCache, ContentCache
+from asyncoss.retry import RetryPolicy
+from asyncoss.limiter import AdaptiveLimiter
+from asyncoss.shaping import TokenBucket, TrafficShaper
+from asyncoss.hedging import HedgePolicy
+from asyncoss.columnar import ObjectTable
+from asyncoss.singleflight import SingleFlight
+from asyncoss.snapshot import take_snapshot, diff_snapshot
+from asyncoss.sync import sync_to_bucket, sync_from_bucket
 
 __all__ = [
     'Auth', 'Service', 'Bucket', 'BucketIterator',
+    'Session', 'ConnectionPool', 'get_connection_pool', 'close_connection_pools',
     'ObjectIterator',
+    'ShardedObjectIterator',
     'MultipartUploadIterator',
     'ObjectUploadIterator',
     'PartIterator',
-    'LiveChannelIterator'
+    'LiveChannelIterator',
+    'resumable_upload',
+    'resumable_download',
+    'ResumableStore',
+    'ResumableDownloadStore',
+    'determine_part_size',
+    'make_upload_store',
+    'make_download_store',
+    'ObjectTable',
+    'take_snapshot',
+    'diff_snapshot',
+    'sync_to_bucket',
+    'sync_from_bucket',
+    'MetadataCache',
+    'ContentCache',
+    'SingleFlight',
+    'RetryPolicy',
+    'AdaptiveLimiter',
+    'TokenBucket',
+    'TrafficShaper',
+    'HedgePolicy'
 ]
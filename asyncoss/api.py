@@ -1,21 +1,41 @@
 # -*- coding: utf-8 -*-
-import shutil
+import asyncio
+import functools
+import logging
+import re
+import time
+from xml.etree import ElementTree
 
 from oss2 import defaults, utils, xml_utils
 from oss2.compat import to_string, to_unicode, urlparse, urlquote
+from oss2.headers import OSS_USER_METADATA_PREFIX
+from oss2.models import BatchDeleteObjectVersionResult
+from oss2.resumable import determine_part_size
 from asyncoss import models, exceptions
-from asyncoss import http
+from asyncoss import http, signing, xml_stream
+from asyncoss.cache import MetadataCache
+from asyncoss.iterators import ObjectIterator
+from asyncoss.retry import RetryPolicy, is_retryable_error
+from asyncoss.task_queue import TaskQueue
+from asyncoss.utils import copyfileobj_and_verify
+
+logger = logging.getLogger(__name__)
 
 
 class _Base(object):
     def __init__(self, auth, endpoint, is_cname, session, connect_timeout,
-                 app_name='', enable_crc=False, loop=None):
+                 app_name='', enable_crc=False, loop=None, connection_pool=None, retry_policy=None,
+                 concurrency_limiter=None, traffic_shaper=None, hedge_policy=None):
         self.auth = auth
         self.endpoint = _normalize_endpoint(endpoint.strip())
-        self.session = session or http.Session(loop=loop)
+        self.session = session or http.Session(loop=loop, pool=connection_pool)
         self.timeout = defaults.get(connect_timeout, defaults.connect_timeout)
         self.app_name = app_name
         self.enable_crc = enable_crc
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.concurrency_limiter = concurrency_limiter
+        self.traffic_shaper = traffic_shaper
+        self.hedge_policy = hedge_policy
 
         self._make_url = _UrlMaker(self.endpoint, is_cname)
 
@@ -24,11 +44,110 @@ class _Base(object):
         req = http.Request(method, self._make_url(bucket_name, key),
                            app_name=self.app_name,
                            **kwargs)
+
+        policy = self.retry_policy
+        policy.on_request()
+
+        hedge = self.hedge_policy is not None and req.method in ('GET', 'HEAD') and req.data is None
+
+        attempt = 0
+        while True:
+            try:
+                if hedge:
+                    return await self.__do_hedged(req, bucket_name, key)
+                return await self.__do_once(req, bucket_name, key)
+            except (exceptions.RequestError, exceptions.ServerError) as e:
+                if not req.can_rewind() or not policy.should_retry(method, e, attempt):
+                    raise
+
+            await asyncio.sleep(policy.delay(attempt))
+            req.rewind()
+            attempt += 1
+
+    async def __do_hedged(self, req, bucket_name, key):
+        policy = self.hedge_policy
+
+        original = asyncio.ensure_future(self.__do_timed(req, bucket_name, key))
+        tasks = [original]
+        pending = {original}
+        winner = None
+        error = None
+        try:
+            while pending:
+                timeout = policy.delay() if len(tasks) == 1 else None
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    policy.hedged += 1
+                    hedge = asyncio.ensure_future(self.__do_timed(req.copy(), bucket_name, key))
+                    tasks.append(hedge)
+                    pending.add(hedge)
+                    continue
+
+                # 收到了响应的一方获胜，包括404、304等确定的错误响应；只有网络错误和5xx才继续等待另一方
+                for task in done:
+                    e = task.exception()
+                    if e is not None and is_retryable_error(e):
+                        if error is None:
+                            error = e
+                    elif winner is None or winner.exception() is not None:
+                        winner = task
+
+                if winner is not None:
+                    if winner is not original:
+                        policy.hedge_wins += 1
+                    return winner.result()
+
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif task is not winner and not task.cancelled() and task.exception() is None:
+                    task.result().response.close()
+
+    async def __do_timed(self, req, bucket_name, key):
+        started = time.monotonic()
+        try:
+            return await self.__do_once(req, bucket_name, key)
+        except exceptions.RequestError:
+            # 没有收到响应，不计入样本
+            started = None
+            raise
+        finally:
+            # 被取消的一方（对冲中落败的请求）记录已经等待的时间，作为其响应时间的下界；
+            # 否则慢请求总是不计入样本，分位数会偏低，对冲的比例随之升高
+            if started is not None:
+                self.hedge_policy.record(time.monotonic() - started)
+
+    async def __do_once(self, req, bucket_name, key):
+        limiter = self.concurrency_limiter
+        if limiter is None:
+            return await self.__send(req, bucket_name, key)
+
+        started = await limiter.acquire()
+        try:
+            resp = await self.__send(req, bucket_name, key)
+        except (exceptions.RequestError, exceptions.ServerError) as e:
+            limiter.release(started, e, req.data is None)
+            raise
+        except BaseException:
+            limiter.release(started, measure_latency=False)
+            raise
+
+        limiter.release(started, measure_latency=req.data is None)
+        return resp
+
+    async def __send(self, req, bucket_name, key):
         self.auth._sign_request(req, bucket_name, key)
-        resp = await self.session.do_request(req, timeout=self.timeout)
+        resp = await self.session.do_request(req, timeout=self.timeout, shaper=self.traffic_shaper)
 
         if resp.status // 100 != 2:
-            e = await exceptions.make_exception(resp)
+            # 错误响应只读取开头的错误信息，随后释放连接，以免重试时占用连接池
+            try:
+                e = await exceptions.make_exception(resp)
+            finally:
+                resp.response.release()
             raise e
 
         content_length = models._hget(resp.headers, 'content-length', int)
@@ -43,6 +162,16 @@ class _Base(object):
         parse_func(result, body)
         return result
 
+    async def _parse_stream_result(self, resp, parse_func, klass):
+        result = klass(resp)
+        await parse_func(result, resp)
+        return result
+
+    def _make_stream_result(self, resp, iter_func, klass):
+        result = klass(resp)
+        result.entries = iter_func(result, resp)
+        return result
+
     async def __aenter__(self):
         await self.session._aio_session.__aenter__()
         return self
@@ -59,9 +188,16 @@ class Service(_Base):
                  session=None,
                  connect_timeout=None,
                  app_name='',
-                 loop=None):
+                 loop=None,
+                 connection_pool=None,
+                 retry_policy=None,
+                 concurrency_limiter=None,
+                 traffic_shaper=None,
+                 hedge_policy=None):
         super().__init__(auth, endpoint, False, session, connect_timeout,
-                         app_name=app_name, loop=loop)
+                         app_name=app_name, loop=loop, connection_pool=connection_pool,
+                         retry_policy=retry_policy, concurrency_limiter=concurrency_limiter,
+                         traffic_shaper=traffic_shaper, hedge_policy=hedge_policy)
 
     async def list_buckets(self, prefix='', marker='', max_keys=100):
         """根据前缀罗列用户的Bucket。
@@ -77,7 +213,22 @@ class Service(_Base):
                               params={'prefix': prefix,
                                       'marker': marker,
                                       'max-keys': str(max_keys)})
-        return await self._parse_result(resp, xml_utils.parse_list_buckets, models.ListBucketsResult)
+        return await self._parse_stream_result(resp, xml_stream.parse_list_buckets, models.ListBucketsResult)
+
+    async def list_buckets_stream(self, prefix='', marker='', max_keys=100):
+        """与 :func:`list_buckets` 相同，但边下载边解析响应体。
+
+        返回结果的 `buckets` 为空；通过 ``async for bucket_info in result.entries`` 按到达顺序得到
+        :class:`SimplifiedBucketInfo <oss2.models.SimplifiedBucketInfo>` 对象，遍历结束后 `is_truncated` 、
+        `next_marker` 才可用。响应体必须遍历完，连接才会被释放。
+
+        :return: :class:`ListBucketsResult <oss2.models.ListBucketsResult>`
+        """
+        resp = await self._do('GET', '', '',
+                              params={'prefix': prefix,
+                                      'marker': marker,
+                                      'max-keys': str(max_keys)})
+        return self._make_stream_result(resp, xml_stream.iter_list_buckets, models.ListBucketsResult)
 
 
 class Bucket(_Base):
@@ -105,6 +256,31 @@ class Bucket(_Base):
 
     :param str app_name: 应用名。该参数不为空，则在User Agent中加入其值。
         注意到，最终这个字符串是要作为HTTP Header的值传输的，所以必须要遵循HTTP标准。
+
+    :param connection_pool: 新开会话时使用的共享连接池，参见 :func:`get_connection_pool <asyncoss.get_connection_pool>` 。
+        为None表示会话独占一个连接池。 `session` 不为None时忽略该参数
+    :type connection_pool: :class:`ConnectionPool <asyncoss.http.ConnectionPool>`
+
+    :param retry_policy: 幂等请求遇到网络错误或5xx错误时的重试策略。为None表示使用默认的 `RetryPolicy()`
+    :type retry_policy: :class:`RetryPolicy <asyncoss.retry.RetryPolicy>`
+
+    :param concurrency_limiter: 根据限流错误和延迟自动调整并发请求数。为None表示不限制
+    :type concurrency_limiter: :class:`AdaptiveLimiter <asyncoss.limiter.AdaptiveLimiter>`
+
+    :param traffic_shaper: 限制请求速率和上传、下载带宽，优先于 `session` 的 `shaper` 。为None表示不限制
+    :type traffic_shaper: :class:`TrafficShaper <asyncoss.shaping.TrafficShaper>`
+
+    :param hedge_policy: GET、HEAD请求迟迟没有响应时再发一个相同的请求，先返回的获胜。为None表示不对冲
+    :type hedge_policy: :class:`HedgePolicy <asyncoss.hedging.HedgePolicy>`
+
+    :param metadata_cache: 文件元信息缓存。为None表示不缓存
+    :type metadata_cache: :class:`MetadataCache <asyncoss.cache.MetadataCache>`
+
+    :param content_cache: 文件内容缓存，用于 :func:`get_object` 、 :func:`get_object_to_file` 。为None表示不缓存
+    :type content_cache: :class:`ContentCache <asyncoss.cache.ContentCache>`
+
+    :param single_flight: 用于合并同时发出的相同只读请求。为None表示不合并
+    :type single_flight: :class:`SingleFlight <asyncoss.singleflight.SingleFlight>`
     """
 
     ACL = 'acl'
@@ -129,11 +305,31 @@ class Bucket(_Base):
                  connect_timeout=None,
                  app_name='',
                  enable_crc=False,
-                 loop=None):
+                 loop=None,
+                 metadata_cache=None,
+                 content_cache=None,
+                 single_flight=None,
+                 connection_pool=None,
+                 retry_policy=None,
+                 concurrency_limiter=None,
+                 traffic_shaper=None,
+                 hedge_policy=None):
         super().__init__(auth, endpoint, is_cname, session, connect_timeout,
-                         app_name, enable_crc, loop=loop)
+                         app_name, enable_crc, loop=loop, connection_pool=connection_pool,
+                         retry_policy=retry_policy, concurrency_limiter=concurrency_limiter,
+                         traffic_shaper=traffic_shaper, hedge_policy=hedge_policy)
 
         self.bucket_name = bucket_name.strip()
+        self.metadata_cache = metadata_cache
+        self.content_cache = content_cache
+        self.single_flight = single_flight
+
+        # 合并请求时区分文件修改前后发出的请求。只记录有请求正在合并的文件： {文件名: [代数, 正在进行的请求数]}
+        self.__write_generations = {}
+        self.__write_clock = 0
+
+        #: :func:`sign_urls` 缓存的签名URL，类型为 :class:`MetadataCache <asyncoss.cache.MetadataCache>` ，第一次使用时创建
+        self.signed_url_cache = None
 
     def sign_url(self, method, key, expires, headers=None, params=None, slash_safe=False):
         """生成签名URL。
@@ -165,6 +361,55 @@ class Bucket(_Base):
                            params=params)
         return self.auth._sign_url(req, self.bucket_name, key, expires)
 
+    def sign_urls(self, keys, expires, expiry_window=None, slash_safe=False):
+        """批量生成下载文件（GET）的签名URL，比逐个调用 :func:`sign_url` 快得多。
+
+        `expiry_window` 不为None时，过期时间向上取整到 `expiry_window` 秒的整数倍：同一时间窗口内为同一个文件生成的URL完全相同，
+        CDN等按URL缓存的服务可以命中；生成的URL也会缓存在 `signed_url_cache` 中，重复生成时直接返回。缓存按AccessKeyId和
+        SecurityToken区分，凭证更换后会重新签名。
+
+            >>> urls = bucket.sign_urls(['a.jpg', 'b.jpg'], 3600, expiry_window=600)
+
+        :param keys: 文件名列表
+        :param int expires: 过期时间（单位：秒），链接至少在当前时间再过expires秒后才过期
+        :param int expiry_window: 过期时间取整的粒度（单位：秒）。为None表示不取整、不缓存
+        :param bool slash_safe: 是否开启key名称中的‘/’转义保护，如果不开启'/'将会转义成%2F
+
+        :return: 签名URL列表，与 `keys` 一一对应
+        """
+        expiration = int(time.time()) + expires
+        if expiry_window:
+            expiration = -(-expiration // expiry_window) * expiry_window
+
+        credentials = signing.get_credentials(self.auth)
+        sign = signing.make_url_signer(self.auth, self._make_url, self.bucket_name, expiration, slash_safe,
+                                       credentials)
+
+        # 无法取得凭证（如StsAuth）时不知道凭证是否已经更换，不缓存
+        if not expiry_window or credentials is None:
+            return [sign(to_string(key)) for key in keys]
+
+        if self.signed_url_cache is None:
+            self.signed_url_cache = MetadataCache(max_entries=_SIGNED_URL_CACHE_SIZE, ttl=_SIGNED_URL_CACHE_TTL)
+        cache = self.signed_url_cache
+
+        # 凭证更换（比如CredentialsProvider返回了新的STS临时凭证）后，用旧凭证签名的URL不再命中
+        credentials_key = (self.auth, credentials.get_access_key_id(), credentials.get_security_token())
+
+        urls = []
+        for key in keys:
+            key = to_string(key)
+
+            name = (key, expiration, slash_safe, credentials_key)
+            url = cache.get(name)
+            if url is None:
+                url = sign(key)
+                cache.put(name, url)
+
+            urls.append(url)
+
+        return urls
+
     def sign_rtmp_url(self, channel_name, playlist_name, expires):
         """生成RTMP推流的签名URL。
         常见的用法是生成加签的URL以供授信用户向OSS推RTMP流。
@@ -199,7 +444,25 @@ class Bucket(_Base):
                                               'marker': marker,
                                               'max-keys': str(max_keys),
                                               'encoding-type': 'url'})
-        return await self._parse_result(resp, xml_utils.parse_list_objects, models.ListObjectsResult)
+        return await self._parse_stream_result(resp, xml_stream.parse_list_objects, models.ListObjectsResult)
+
+    async def list_objects_stream(self, prefix='', delimiter='', marker='', max_keys=100):
+        """与 :func:`list_objects` 相同，但边下载边解析响应体，不必等待整个响应体下载完成就可以处理第一个文件。
+
+        返回结果的 `object_list` 、 `prefix_list` 为空；通过 ``async for obj in result.entries`` 按响应中的顺序得到
+        :class:`SimplifiedObjectInfo <oss2.models.SimplifiedObjectInfo>` 对象（先是文件，然后是公共前缀，
+        公共前缀的 `is_prefix()` 为True），遍历结束后 `is_truncated` 、 `next_marker` 才可用。
+        响应体必须遍历完，连接才会被释放。
+
+        :return: :class:`ListObjectsResult <oss2.models.ListObjectsResult>`
+        """
+        resp = await self.__do_object('GET', '',
+                                      params={'prefix': prefix,
+                                              'delimiter': delimiter,
+                                              'marker': marker,
+                                              'max-keys': str(max_keys),
+                                              'encoding-type': 'url'})
+        return self._make_stream_result(resp, xml_stream.iter_list_objects, models.ListObjectsResult)
 
     async def put_object(self, key, data,
                          headers=None,
@@ -251,12 +514,18 @@ class Bucket(_Base):
 
         :param progress_callback: 用户指定的进度回调函数。参考 :ref:`progress_callback`
 
+        与把打开的文件传给 :func:`put_object` 相同：文件的打开、读取都在线程池中进行，不阻塞事件循环，每次读取64KB后发送。
+
         :return: :class:`PutObjectResult <oss2.models.PutObjectResult>`
         """
         headers = utils.set_content_type(http.CaseInsensitiveDict(headers), filename)
 
-        with open(to_unicode(filename), 'rb') as f:
+        loop = asyncio.get_event_loop()
+        f = await loop.run_in_executor(None, open, to_unicode(filename), 'rb')
+        try:
             return await self.put_object(key, f, headers=headers, progress_callback=progress_callback)
+        finally:
+            await loop.run_in_executor(None, f.close)
 
     async def append_object(self, key, position, data,
                             headers=None,
@@ -329,6 +598,26 @@ class Bucket(_Base):
 
         :raises: 如果文件不存在，则抛出 :class:`NoSuchKey <oss2.exceptions.NoSuchKey>` ；还可能抛出其他异常
         """
+        if self.single_flight is not None and not headers and progress_callback is None and not process and not params:
+            key = to_string(key)
+            write_generation = self.__begin_read(key)
+            try:
+                name = ('get_object', self.bucket_name, key, _make_range_string(byte_range), write_generation)
+                resp = await self.single_flight.do_body(name, functools.partial(self.__get_object_resp, key, byte_range))
+            finally:
+                self.__end_read(key)
+            return models.GetObjectResult(resp, None, self.enable_crc)
+
+        return await self.__get_object(key, byte_range, headers, progress_callback, process, params)
+
+    async def __get_object_resp(self, key, byte_range):
+        result = await self.__get_object(key, byte_range)
+        return result.resp
+
+    async def __get_object(self, key, byte_range, headers=None, progress_callback=None, process=None, params=None):
+        if self.content_cache is not None and not headers and progress_callback is None and not process and not params:
+            return await self.__get_cached_object(key, byte_range)
+
         headers = http.CaseInsensitiveDict(headers)
 
         range_string = _make_range_string(byte_range)
@@ -342,6 +631,44 @@ class Bucket(_Base):
         resp = await self.__do_object('GET', key, headers=headers, params=params)
         return models.GetObjectResult(resp, progress_callback, self.enable_crc)
 
+    async def __get_cached_object(self, key, byte_range):
+        cache = self.content_cache
+        name = (self.bucket_name, to_string(key))
+
+        headers = http.CaseInsensitiveDict()
+        range_string = _make_range_string(byte_range)
+        if range_string:
+            headers['range'] = range_string
+
+        entry = cache.get(name)
+        if entry is not None:
+            conditional_headers = http.CaseInsensitiveDict(headers)
+            conditional_headers['If-None-Match'] = '"' + entry.etag + '"'
+            try:
+                resp = await self.__do_object('GET', key, headers=conditional_headers)
+            except exceptions.NotModified as e:
+                cached = await cache.open(name, entry, byte_range if range_string else None, e.request_id)
+                if cached is not None:
+                    return models.GetObjectResult(cached, None, self.enable_crc)
+
+                resp = await self.__do_object('GET', key, headers=headers)
+            except exceptions.NotFound:
+                cache.misses += 1
+                cache.invalidate(name)
+                raise
+            else:
+                # 缓存的内容已经过时
+                cache.misses += 1
+                cache.invalidate(name)
+        else:
+            resp = await self.__do_object('GET', key, headers=headers)
+
+        if range_string or not cache.can_store(models._hget(resp.headers, 'content-length', int)):
+            return models.GetObjectResult(resp, None, self.enable_crc)
+
+        cached = await cache.store(name, resp)
+        return models.GetObjectResult(cached, None, self.enable_crc)
+
     async def get_object_to_file(self, key, filename,
                                  byte_range=None,
                                  headers=None,
@@ -362,17 +689,32 @@ class Bucket(_Base):
 
         :return: 如果文件不存在，则抛出 :class:`NoSuchKey <oss2.exceptions.NoSuchKey>` ；还可能抛出其他异常
         """
-        with open(to_unicode(filename), 'wb') as f:
+        # 打开、关闭（刷新缓冲区）文件与写入一样在线程池中进行
+        loop = asyncio.get_event_loop()
+        f = await loop.run_in_executor(None, open, to_unicode(filename), 'wb')
+        try:
             result = await self.get_object(key, byte_range=byte_range, headers=headers,
-                                           progress_callback=progress_callback,
                                            process=process)
 
-            if result.content_length is None:
-                shutil.copyfileobj(result, f)
-            else:
-                utils.copyfileobj_and_verify(result, f, result.content_length, request_id=result.request_id)
+            crc = utils.Crc64() if self.enable_crc else None
+            try:
+                await copyfileobj_and_verify(result.resp, f, result.content_length,
+                                             request_id=result.request_id,
+                                             progress_callback=progress_callback,
+                                             crc=crc)
+            except BaseException:
+                # 响应体可能没有读完，关闭连接而不是放回连接池
+                result.resp.response.close()
+                raise
+
+            # 与oss2一样，通过Range头部只下载了一部分时，不校验整个文件的CRC
+            if crc is not None and byte_range is None and process is None and \
+                    'Range' not in http.CaseInsensitiveDict(headers):
+                utils.check_crc('get', crc.crc, result.server_crc, result.request_id)
 
             return result
+        finally:
+            await loop.run_in_executor(None, f.close)
 
     async def head_object(self, key, headers=None):
         """获取文件元信息。
@@ -393,7 +735,14 @@ class Bucket(_Base):
 
         :raises: 如果Bucket不存在或者Object不存在，则抛出 :class:`NotFound <oss2.exceptions.NotFound>`
         """
-        resp = await self.__do_object('HEAD', key, headers=headers)
+        if headers:
+            resp = await self.__do_object('HEAD', key, headers=headers)
+            return models.HeadObjectResult(resp)
+
+        return await self.__cached_metadata('head', key, self.__head_object)
+
+    async def __head_object(self, key):
+        resp = await self.__do_object('HEAD', key)
         return models.HeadObjectResult(resp)
 
     async def get_object_meta(self, key):
@@ -407,6 +756,9 @@ class Bucket(_Base):
 
         :raises: 如果文件不存在，则抛出 :class:`NoSuchKey <oss2.exceptions.NoSuchKey>` ；还可能抛出其他异常
         """
+        return await self.__cached_metadata('meta', key, self.__get_object_meta)
+
+    async def __get_object_meta(self, key):
         resp = await self.__do_object('GET', key, params={'objectMeta': ''})
         return models.GetObjectMetaResult(resp)
 
@@ -447,6 +799,77 @@ class Bucket(_Base):
 
         return models.PutObjectResult(resp)
 
+    async def copy_object_multipart(self, source_bucket_name, source_key, target_key,
+                                    headers=None,
+                                    multipart_threshold=None,
+                                    part_size=None,
+                                    num_threads=None):
+        """拷贝一个文件到当前Bucket。大文件通过分片拷贝完成，多个分片同时在服务端拷贝。
+
+        先通过HEAD请求获得源文件长度。长度小于 `multipart_threshold` 时等同于 :func:`copy_object` ；
+        否则按 `part_size` 切分，同时最多有 `num_threads` 个 :func:`upload_part_copy` 在进行，每个分片都通过
+        `x-oss-copy-source-if-match` 限定为同一个源文件版本，最后调用 :func:`complete_multipart_upload` 。
+        任一分片失败，会取消本次分片上传。
+
+        :param str source_bucket_name: 源Bucket名
+        :param str source_key: 源文件名
+        :param str target_key: 目标文件名
+
+        :param headers: 传给 `init_multipart_upload` 的HTTP头部。如不指定，则沿用源文件的Content-Type等头部及用户自定义元数据。
+        :type headers: 可以是dict，建议是oss2.CaseInsensitiveDict
+
+        :param int multipart_threshold: 源文件长度大于或等于该值时，采用分片拷贝。缺省为1GB。
+        :param int part_size: 期望的分片大小，实际大小可能更大。缺省为100MB。
+        :param int num_threads: 并发拷贝的分片数，如不指定则使用 `oss2.defaults.multipart_num_threads` 。
+
+        :return: :class:`PutObjectResult <oss2.models.PutObjectResult>`
+        """
+        resp = await self._do('HEAD', source_bucket_name, source_key)
+        source = models.HeadObjectResult(resp)
+
+        multipart_threshold = defaults.get(multipart_threshold, _MULTIPART_COPY_THRESHOLD)
+        if source.content_length < multipart_threshold:
+            return await self.copy_object(source_bucket_name, source_key, target_key, headers=headers)
+
+        if headers is None:
+            headers = _copy_source_headers(source.headers)
+
+        part_size = determine_part_size(source.content_length, defaults.get(part_size, _MULTIPART_COPY_PART_SIZE))
+        num_threads = defaults.get(num_threads, defaults.multipart_num_threads)
+
+        upload_id = (await self.init_multipart_upload(target_key, headers=headers)).upload_id
+        copy_headers = {'x-oss-copy-source-if-match': '"{0}"'.format(source.etag)}
+        parts = []
+
+        async def producer(q):
+            for part in _split_copy_parts(source.content_length, part_size):
+                await q.put(part)
+
+        async def consumer(q):
+            while True:
+                part = await q.get()
+                if part is None:
+                    break
+
+                part_number, start, end = part
+                result = await self.upload_part_copy(source_bucket_name, source_key, (start, end - 1),
+                                                     target_key, upload_id, part_number,
+                                                     headers=copy_headers)
+                parts.append(models.PartInfo(part_number, result.etag, size=end - start))
+
+        try:
+            await TaskQueue(producer, [consumer] * num_threads).run()
+        except Exception:
+            # 取消失败不应掩盖分片拷贝的错误
+            try:
+                await self.abort_multipart_upload(target_key, upload_id)
+            except Exception as e:
+                logger.warning('Failed to abort multipart copy to {0}, upload id {1}: {2!r}'.format(
+                    target_key, upload_id, e))
+            raise
+
+        return await self.complete_multipart_upload(target_key, upload_id, parts)
+
     async def update_object_meta(self, key, headers):
         """更改Object的元数据信息，包括Content-Type这类标准的HTTP头部，以及以x-oss-meta-开头的自定义元数据。
 
@@ -513,26 +936,97 @@ class Bucket(_Base):
 
         :return: :class:`GetObjectAclResult <oss2.models.GetObjectAclResult>`
         """
+        return await self.__coalesce('acl', key, self.__get_object_acl)
+
+    async def __get_object_acl(self, key):
         resp = await self.__do_object('GET', key, params={'acl': ''})
         return await self._parse_result(resp, xml_utils.parse_get_object_acl, models.GetObjectAclResult)
 
-    async def batch_delete_objects(self, key_list):
+    async def batch_delete_objects(self, key_list, quiet=False):
         """批量删除文件。待删除文件列表不能为空。
 
         :param key_list: 文件名列表，不能为空。
         :type key_list: list of str
 
+        :param bool quiet: 为True时采用简单模式，OSS不在响应中返回已删除的文件名。
+
         :return: :class:`BatchDeleteObjectsResult <oss2.models.BatchDeleteObjectsResult>`
         """
         if not key_list:
             raise models.ClientError('key_list should not be empty')
 
-        data = xml_utils.to_batch_delete_objects_request(key_list, False)
-        resp = await self.__do_object('POST', '',
-                                      data=data,
-                                      params={'delete': '', 'encoding-type': 'url'},
-                                      headers={'Content-MD5': utils.content_md5(data)})
-        return await self._parse_result(resp, xml_utils.parse_batch_delete_objects, models.BatchDeleteObjectsResult)
+        data = xml_utils.to_batch_delete_objects_request(key_list, quiet)
+        try:
+            resp = await self.__do_object('POST', '',
+                                          data=data,
+                                          params={'delete': '', 'encoding-type': 'url'},
+                                          headers={'Content-MD5': utils.content_md5(data)})
+        finally:
+            for key in key_list:
+                self.__invalidate(key)
+
+        return await self._parse_result(resp, _parse_batch_delete_objects, models.BatchDeleteObjectsResult)
+
+    async def bulk_delete_objects(self, keys, num_threads=None):
+        """删除任意多个文件。
+
+        `keys` 按每批 `_BATCH_DELETE_MAX_KEYS` 个切分，同时最多有 `num_threads` 批在删除，每批都采用简单（quiet）模式。
+        某一批请求失败时不会中断整个删除，该批的文件名会记入返回值的 `failed_keys` ；OSS拒绝删除的单个文件也会记入其中。
+
+        用法 ::
+
+            >>> result = await bucket.bulk_delete_objects(asyncoss.ObjectIterator(bucket, prefix='tmp/'))
+            >>> print(result.failed_keys)
+            []
+
+        :param keys: 文件名的可迭代对象或异步可迭代对象，元素可以是str，也可以是带有 `key` 属性的对象，
+            如 :class:`ObjectIterator <asyncoss.ObjectIterator>` 返回的 `SimplifiedObjectInfo` （公共前缀会被跳过）。
+        :param int num_threads: 并发删除的批数
+
+        :return: :class:`BulkDeleteObjectsResult <asyncoss.models.BulkDeleteObjectsResult>`
+        """
+        num_threads = defaults.get(num_threads, _BULK_DELETE_NUM_THREADS)
+        result = models.BulkDeleteObjectsResult()
+
+        async def producer(q):
+            batch = []
+            async for key in _iter_keys(keys):
+                batch.append(key)
+                if len(batch) == _BATCH_DELETE_MAX_KEYS:
+                    await q.put(batch)
+                    batch = []
+
+            if batch:
+                await q.put(batch)
+
+        async def consumer(q):
+            while True:
+                batch = await q.get()
+                if batch is None:
+                    break
+
+                try:
+                    batch_result = await self.batch_delete_objects(batch, quiet=True)
+                except exceptions.OssError as e:
+                    result.failed_keys.extend(batch)
+                    result.errors.append(e)
+                else:
+                    failed_keys = [key for key, code, message in batch_result.failed_objects]
+                    result.failed_keys.extend(failed_keys)
+                    result.deleted_count += len(batch) - len(failed_keys)
+
+        await TaskQueue(producer, [consumer] * num_threads, maxsize=num_threads).run()
+        return result
+
+    async def delete_prefix(self, prefix, num_threads=None):
+        """删除所有以 `prefix` 开头的文件。参见 :func:`bulk_delete_objects` 。
+
+        :param str prefix: 文件名前缀。注意空串表示删除Bucket里的所有文件。
+
+        :return: :class:`BulkDeleteObjectsResult <asyncoss.models.BulkDeleteObjectsResult>`
+        """
+        return await self.bulk_delete_objects(ObjectIterator(self, prefix=prefix, max_keys=_BATCH_DELETE_MAX_KEYS),
+                                              num_threads=num_threads)
 
     async def init_multipart_upload(self, key, headers=None):
         """初始化分片上传。
@@ -640,7 +1134,32 @@ class Bucket(_Base):
                                               'upload-id-marker': upload_id_marker,
                                               'max-uploads': str(max_uploads),
                                               'encoding-type': 'url'})
-        return await self._parse_result(resp, xml_utils.parse_list_multipart_uploads, models.ListMultipartUploadsResult)
+        return await self._parse_stream_result(resp, xml_stream.parse_list_multipart_uploads,
+                                               models.ListMultipartUploadsResult)
+
+    async def list_multipart_uploads_stream(self,
+                                            prefix='',
+                                            delimiter='',
+                                            key_marker='',
+                                            upload_id_marker='',
+                                            max_uploads=1000):
+        """与 :func:`list_multipart_uploads` 相同，但边下载边解析响应体。
+
+        返回结果的 `upload_list` 、 `prefix_list` 为空；通过 ``async for upload in result.entries`` 得到
+        :class:`MultipartUploadInfo <oss2.models.MultipartUploadInfo>` 对象（公共前缀的 `is_prefix()` 为True），
+        遍历结束后 `is_truncated` 、 `next_key_marker` 、 `next_upload_id_marker` 才可用。响应体必须遍历完，连接才会被释放。
+
+        :return: :class:`ListMultipartUploadsResult <oss2.models.ListMultipartUploadsResult>`
+        """
+        resp = await self.__do_object('GET', '',
+                                      params={'uploads': '',
+                                              'prefix': prefix,
+                                              'delimiter': delimiter,
+                                              'key-marker': key_marker,
+                                              'upload-id-marker': upload_id_marker,
+                                              'max-uploads': str(max_uploads),
+                                              'encoding-type': 'url'})
+        return self._make_stream_result(resp, xml_stream.iter_list_multipart_uploads, models.ListMultipartUploadsResult)
 
     async def upload_part_copy(self, source_bucket_name, source_key, byte_range,
                                target_key, target_upload_id, target_part_number,
@@ -655,7 +1174,7 @@ class Bucket(_Base):
         :return: :class:`PutObjectResult <oss2.models.PutObjectResult>`
         """
         headers = http.CaseInsensitiveDict(headers)
-        headers['x-oss-copy-source'] = '/' + source_bucket_name + '/' + source_key
+        headers['x-oss-copy-source'] = '/' + source_bucket_name + '/' + urlquote(source_key, '')
 
         range_string = _make_range_string(byte_range)
         if range_string:
@@ -683,7 +1202,22 @@ class Bucket(_Base):
                                       params={'uploadId': upload_id,
                                               'part-number-marker': marker,
                                               'max-parts': str(max_parts)})
-        return await self._parse_result(resp, xml_utils.parse_list_parts, models.ListPartsResult)
+        return await self._parse_stream_result(resp, xml_stream.parse_list_parts, models.ListPartsResult)
+
+    async def list_parts_stream(self, key, upload_id,
+                                marker='', max_parts=1000):
+        """与 :func:`list_parts` 相同，但边下载边解析响应体。
+
+        返回结果的 `parts` 为空；通过 ``async for part in result.entries`` 得到 :class:`PartInfo <oss2.models.PartInfo>`
+        对象，遍历结束后 `is_truncated` 、 `next_marker` 才可用。响应体必须遍历完，连接才会被释放。
+
+        :return: :class:`ListPartsResult <oss2.models.ListPartsResult>`
+        """
+        resp = await self.__do_object('GET', key,
+                                      params={'uploadId': upload_id,
+                                              'part-number-marker': marker,
+                                              'max-parts': str(max_parts)})
+        return self._make_stream_result(resp, xml_stream.iter_list_parts, models.ListPartsResult)
 
     async def put_symlink(self, target_key, symlink_key, headers=None):
         """创建Symlink。
@@ -707,6 +1241,9 @@ class Bucket(_Base):
 
         :raises: 如果文件的符号链接不存在，则抛出 :class:`NoSuchKey <oss2.exceptions.NoSuchKey>` ；还可能抛出其他异常
         """
+        return await self.__coalesce('symlink', symlink_key, self.__get_symlink)
+
+    async def __get_symlink(self, symlink_key):
         resp = await self.__do_object('GET', symlink_key, params={Bucket.SYMLINK: ''})
         return models.GetSymlinkResult(resp)
 
@@ -986,7 +1523,81 @@ class Bucket(_Base):
         return await self.__do_bucket('GET', params={config: ''})
 
     async def __do_object(self, method, key, **kwargs):
-        return await self._do(method, self.bucket_name, key, **kwargs)
+        if method in ('GET', 'HEAD'):
+            return await self._do(method, self.bucket_name, key, **kwargs)
+
+        # 上传、拷贝、删除、追加等都会修改文件，无论成功与否都使缓存失效，之后的读请求也不再与之前发出的请求合并
+        try:
+            return await self._do(method, self.bucket_name, key, **kwargs)
+        finally:
+            self.__invalidate(key)
+
+    async def __cached_metadata(self, kind, key, fetch):
+        cache = self.metadata_cache
+        if cache is None:
+            return await self.__coalesce(kind, key, fetch)
+
+        name = (self.bucket_name, to_string(key), kind)
+        cached = cache.get(name)
+        if isinstance(cached, exceptions.NoSuchKey):
+            raise cached.with_traceback(None)
+        if cached is not None:
+            return cached
+
+        # 请求期间文件被修改时，代数会变化，旧的结果不会被缓存，也不会与之后的请求合并
+        generation = cache.begin(name)
+        try:
+            result = await self.__coalesce(kind, key, fetch, generation)
+        except exceptions.NoSuchKey as e:
+            cache.put(name, e, negative=True, generation=generation)
+            raise
+        else:
+            cache.put(name, result, generation=generation)
+        finally:
+            cache.end(name)
+
+        return result
+
+    async def __coalesce(self, kind, key, fetch, generation=None):
+        if self.single_flight is None:
+            return await fetch(key)
+
+        key = to_string(key)
+        write_generation = self.__begin_read(key)
+        try:
+            name = (kind, self.bucket_name, key, generation, write_generation)
+            return await self.single_flight.do(name, functools.partial(fetch, key))
+        finally:
+            self.__end_read(key)
+
+    def __begin_read(self, key):
+        entry = self.__write_generations.get(key)
+        if entry is None:
+            entry = self.__write_generations[key] = [self.__write_clock, 0]
+
+        entry[1] += 1
+        return entry[0]
+
+    def __end_read(self, key):
+        entry = self.__write_generations[key]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self.__write_generations[key]
+
+    def __invalidate(self, key):
+        if not key:
+            return
+
+        key = to_string(key)
+
+        self.__write_clock += 1
+        entry = self.__write_generations.get(key)
+        if entry is not None:
+            entry[0] = self.__write_clock
+
+        if self.metadata_cache is not None:
+            self.metadata_cache.invalidate((self.bucket_name, key, 'head'))
+            self.metadata_cache.invalidate((self.bucket_name, key, 'meta'))
 
     async def __do_bucket(self, method, **kwargs):
         return await self._do(method, self.bucket_name, '', **kwargs)
@@ -998,6 +1609,12 @@ class Bucket(_Base):
             return data
 
 
+def _split_copy_parts(total_size, part_size):
+    """按 `part_size` 切分 [0, `total_size`) ，依次返回 (分片号, 起始偏移, 结束偏移) ，结束偏移不包含在分片内。"""
+    for part_number, start in enumerate(range(0, total_size, part_size), 1):
+        yield part_number, start, min(start + part_size, total_size)
+
+
 def _normalize_endpoint(endpoint):
     if not endpoint.startswith('http://') and not endpoint.startswith('https://'):
         return 'http://' + endpoint
@@ -1005,6 +1622,84 @@ def _normalize_endpoint(endpoint):
         return endpoint
 
 
+#: copy_object_multipart缺省的分片拷贝阈值，与单次CopyObject支持的上限一致
+_MULTIPART_COPY_THRESHOLD = 1024 * 1024 * 1024
+
+#: copy_object_multipart缺省的分片大小
+_MULTIPART_COPY_PART_SIZE = 100 * 1024 * 1024
+
+#: 一次批量删除请求最多包含的文件数
+_BATCH_DELETE_MAX_KEYS = 1000
+
+#: bulk_delete_objects缺省的并发批数
+_BULK_DELETE_NUM_THREADS = 4
+
+#: sign_urls最多缓存的签名URL数
+_SIGNED_URL_CACHE_SIZE = 100000
+
+#: sign_urls缓存的签名URL的有效期（秒）。缓存按过期时间区分，过了时间窗口的URL不会再命中，只是等待被淘汰
+_SIGNED_URL_CACHE_TTL = 24 * 3600
+
+
+def _parse_batch_delete_objects(result, body):
+    # 与xml_utils.parse_batch_delete_objects相同，另外解析删除失败的文件（Error节点）；只解析、遍历一次
+    if not body:
+        return result
+
+    root = ElementTree.fromstring(body)
+    url_encoded = xml_utils._is_url_encoding(root)
+
+    for node in root:
+        if node.tag == 'Deleted':
+            key = xml_utils._find_object(node, 'Key', url_encoded)
+            result.deleted_keys.append(key)
+
+            delete_marker = node.find('DeleteMarker') is not None and xml_utils._find_bool(node, 'DeleteMarker')
+            result.delete_versions.append(BatchDeleteObjectVersionResult(
+                key,
+                xml_utils._find_tag_with_default(node, 'VersionId', None),
+                delete_marker,
+                xml_utils._find_tag_with_default(node, 'DeleteMarkerVersionId', '')))
+        elif node.tag == 'Error':
+            result.failed_objects.append((xml_utils._find_object(node, 'Key', url_encoded),
+                                          xml_utils._find_tag_with_default(node, 'Code', ''),
+                                          xml_utils._find_tag_with_default(node, 'Message', '')))
+
+    return result
+
+
+async def _iter_keys(keys):
+    if hasattr(keys, '__aiter__'):
+        async for key in keys:
+            if _is_deletable(key):
+                yield _key_of(key)
+    else:
+        for key in keys:
+            if _is_deletable(key):
+                yield _key_of(key)
+
+
+def _is_deletable(key):
+    return not (hasattr(key, 'is_prefix') and key.is_prefix())
+
+
+def _key_of(key):
+    return getattr(key, 'key', key)
+
+
+_COPY_SOURCE_HEADERS = ('content-type', 'content-encoding', 'content-disposition', 'content-language',
+                        'cache-control', 'expires')
+
+
+def _copy_source_headers(source_headers):
+    headers = http.CaseInsensitiveDict()
+    for name, value in source_headers.items():
+        if name.lower() in _COPY_SOURCE_HEADERS or name.lower().startswith(OSS_USER_METADATA_PREFIX):
+            headers[name] = value
+
+    return headers
+
+
 _ENDPOINT_TYPE_ALIYUN = 0
 _ENDPOINT_TYPE_CNAME = 1
 _ENDPOINT_TYPE_IP = 2
@@ -1046,6 +1741,9 @@ def _determine_endpoint_type(netloc, is_cname, bucket_name):
         return _ENDPOINT_TYPE_IP
 
 
+_PLAIN_KEY = re.compile(r'[A-Za-z0-9_.\-/]*\Z')
+
+
 class _UrlMaker(object):
     def __init__(self, endpoint, is_cname):
         p = urlparse(endpoint)
@@ -1054,22 +1752,37 @@ class _UrlMaker(object):
         self.netloc = p.netloc
         self.is_cname = is_cname
 
+        # Bucket名 -> (访问域名类型, URL中文件名之前的部分)。一个Bucket对象通常只访问一个Bucket，缓存后不必每次都判断
+        self.__prefixes = {}
+
     def __call__(self, bucket_name, key, slash_safe=False):
-        self.type = _determine_endpoint_type(self.netloc, self.is_cname, bucket_name)
+        try:
+            self.type, prefix = self.__prefixes[bucket_name]
+        except KeyError:
+            self.type, prefix = self.__prefixes[bucket_name] = self.__make_prefix(bucket_name)
+
+        if not key:
+            return prefix
+
+        if _PLAIN_KEY.match(key):
+            # 只含有不需要转义的字符，除了'/'
+            return prefix + (key if slash_safe is True else key.replace('/', '%2F'))
 
-        safe = '/' if slash_safe is True else ''
-        key = urlquote(key, safe=safe)
+        return prefix + urlquote(key, safe='/' if slash_safe is True else '')
 
-        if self.type == _ENDPOINT_TYPE_CNAME:
-            return '{0}://{1}/{2}'.format(self.scheme, self.netloc, key)
+    def __make_prefix(self, bucket_name):
+        endpoint_type = _determine_endpoint_type(self.netloc, self.is_cname, bucket_name)
 
-        if self.type == _ENDPOINT_TYPE_IP:
+        if endpoint_type == _ENDPOINT_TYPE_CNAME:
+            return endpoint_type, '{0}://{1}/'.format(self.scheme, self.netloc)
+
+        if endpoint_type == _ENDPOINT_TYPE_IP:
             if bucket_name:
-                return '{0}://{1}/{2}/{3}'.format(self.scheme, self.netloc, bucket_name, key)
+                return endpoint_type, '{0}://{1}/{2}/'.format(self.scheme, self.netloc, bucket_name)
             else:
-                return '{0}://{1}/{2}'.format(self.scheme, self.netloc, key)
+                return endpoint_type, '{0}://{1}/'.format(self.scheme, self.netloc)
+
         if not bucket_name:
-            assert not key
-            return '{0}://{1}'.format(self.scheme, self.netloc)
+            return endpoint_type, '{0}://{1}'.format(self.scheme, self.netloc)
 
-        return '{0}://{1}.{2}/{3}'.format(self.scheme, bucket_name, self.netloc, key)
+        return endpoint_type, '{0}://{1}.{2}/'.format(self.scheme, bucket_name, self.netloc)
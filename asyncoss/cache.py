@@ -0,0 +1,459 @@
+# -*- coding: utf-8 -*-
+
+"""
+asyncoss.cache
+~~~~~~~~~~~~~~
+
+客户端缓存。
+"""
+
+import asyncio
+import binascii
+import collections
+import hashlib
+import json
+import os
+import re
+import time
+
+from oss2.exceptions import InconsistentError
+from requests.structures import CaseInsensitiveDict
+
+from asyncoss.http import _LocalResponse
+from asyncoss.utils import copyfileobj_and_verify
+
+
+class MetadataCache(object):
+    """文件元信息缓存，供 :class:`Bucket <asyncoss.Bucket>` 的 `head_object` 、 `get_object_meta` 、 `object_exists` 使用。
+
+    缓存条目按最近最少使用（LRU）的顺序淘汰，最多保存 `max_entries` 个；每个条目在 `ttl` 秒后过期。
+    文件不存在（NoSuchKey）的结果也会被缓存，过期时间为 `negative_ttl` 秒。
+
+    同一个 `Bucket` 对象上传、拷贝、删除文件后，会自动使该文件的缓存失效；其他客户端的修改只能等缓存过期。
+    每个名字有一个代数（generation），失效时递增；在失效之前发出、之后才返回的请求结果不会被缓存。
+
+    用法 ::
+
+        >>> bucket = Bucket(auth, endpoint, bucket_name, metadata_cache=MetadataCache(max_entries=100000, ttl=30))
+        >>> await bucket.object_exists('a.txt')
+        >>> print(bucket.metadata_cache.hit_rate())
+
+    :param int max_entries: 最多缓存的条目数
+    :param float ttl: 缓存条目的有效期，单位为秒
+    :param float negative_ttl: 文件不存在的结果的有效期，单位为秒。None表示与 `ttl` 相同
+    """
+    def __init__(self, max_entries=10000, ttl=60, negative_ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+
+        #: 命中次数
+        self.hits = 0
+
+        #: 未命中（包括已过期）次数
+        self.misses = 0
+
+        #: 因容量不足被淘汰的条目数
+        self.evictions = 0
+
+        self.__entries = collections.OrderedDict()
+
+        # 只记录有请求正在进行的名字： {name: [代数, 正在进行的请求数]}
+        self.__generations = {}
+        self.__clock = 0
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def get(self, name):
+        """返回缓存的值，没有或已过期返回None。"""
+        entry = self.__entries.get(name)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self.__entries.move_to_end(name)
+                self.hits += 1
+                return value
+
+            del self.__entries[name]
+
+        self.misses += 1
+        return None
+
+    def begin(self, name):
+        """在为 `name` 发出请求前调用，返回当前的代数，应传给 :func:`put` 。请求结束后必须调用 :func:`end` 。"""
+        entry = self.__generations.get(name)
+        if entry is None:
+            entry = self.__generations[name] = [self.__clock, 0]
+
+        entry[1] += 1
+        return entry[0]
+
+    def end(self, name):
+        """与 :func:`begin` 配对，在请求结束（无论成功与否）后调用。"""
+        entry = self.__generations[name]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self.__generations[name]
+
+    def put(self, name, value, negative=False, generation=None):
+        """缓存一个值。`negative` 为True时按 `negative_ttl` 计算过期时间。
+
+        :param generation: :func:`begin` 的返回值。如果请求期间该条目失效过，则不缓存
+        """
+        if generation is not None and self.__generations[name][0] != generation:
+            return
+
+        ttl = self.negative_ttl if negative else self.ttl
+        if ttl <= 0:
+            return
+
+        self.__entries[name] = (time.monotonic() + ttl, value)
+        self.__entries.move_to_end(name)
+
+        while len(self.__entries) > self.max_entries:
+            self.__entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, name):
+        """使以 `name` 为名的条目失效，正在进行的请求的结果也不会被缓存。"""
+        self.__entries.pop(name, None)
+
+        self.__clock += 1
+        entry = self.__generations.get(name)
+        if entry is not None:
+            entry[0] = self.__clock
+
+    def clear(self):
+        """清空缓存，统计数据不变。"""
+        self.__entries.clear()
+
+    def hit_rate(self):
+        """返回命中率，没有访问过返回0.0。"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ContentCache(object):
+    """文件内容缓存，供 :func:`Bucket.get_object <asyncoss.Bucket.get_object>` 、
+    :func:`Bucket.get_object_to_file <asyncoss.Bucket.get_object_to_file>` 使用。
+
+    缓存的是整个文件的内容和响应头，以文件名和ETag为键。再次下载时带上 `If-None-Match` 头部向OSS确认文件没有变化，
+    OSS返回304（NotModified）就直接从缓存读取，包括指定了 `byte_range` 的下载。未缓存时指定 `byte_range` 的下载不会被缓存。
+
+    `directory` 为None时缓存在内存中，否则缓存在该目录下（进程重启后仍然有效）。所有缓存内容的总字节数不超过 `max_bytes` ，
+    按最近最少使用（LRU）的顺序淘汰；超过 `max_bytes` 的文件不会被缓存。
+
+    :param int max_bytes: 缓存内容的总字节数上限
+    :param str directory: 缓存目录，不存在会被创建。None表示缓存在内存中
+    """
+    def __init__(self, max_bytes, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+
+        #: 命中次数，即OSS返回304、直接从缓存读取的次数
+        self.hits = 0
+
+        #: 未命中次数，包括没有缓存和缓存的内容已经过时
+        self.misses = 0
+
+        #: 因容量不足被淘汰的条目数
+        self.evictions = 0
+
+        #: 当前缓存内容的总字节数
+        self.size = 0
+
+        self.__entries = collections.OrderedDict()
+
+        if directory is not None:
+            self.__load_directory()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def get(self, name):
+        """返回缓存条目，没有返回None。"""
+        entry = self.__entries.get(name)
+        if entry is None:
+            self.misses += 1
+        return entry
+
+    def can_store(self, size):
+        """长度为 `size` 的文件能否被缓存。"""
+        return size is not None and size <= self.max_bytes
+
+    async def store(self, name, resp):
+        """读取整个响应体并缓存，返回从缓存读取该文件的对象，参见 :func:`open` 。
+
+        :param resp: :class:`Response <asyncoss.http.Response>` 对象，必须是不带Range的完整下载
+        """
+        loop = asyncio.get_event_loop()
+
+        headers = dict((k, v) for k, v in resp.headers.items() if k.lower() not in _UNCACHED_HEADERS)
+        etag = resp.headers.get('etag', '').strip('"')
+        size = int(resp.headers['content-length'])
+
+        if self.directory is None:
+            data = await resp.read()
+            if len(data) != size:
+                raise InconsistentError('IncompleteRead from source', resp.request_id)
+            entry = _CacheEntry(etag, size, headers, data=data)
+        else:
+            path = os.path.join(self.directory, _entry_filename(name))
+            suffix = _TMP_SUFFIX + '-' + binascii.hexlify(os.urandom(4)).decode('ascii')
+            meta = {'name': list(name), 'etag': etag, 'size': size, 'headers': headers}
+
+            # 直接创建临时文件而不放到线程池中，否则被取消时，文件可能在下面删除之后才被创建
+            f = open(path + suffix, 'wb')
+            try:
+                try:
+                    await copyfileobj_and_verify(resp, f, size, request_id=resp.request_id)
+                finally:
+                    await loop.run_in_executor(None, f.close)
+
+                await loop.run_in_executor(None, _commit_entry_files, path, suffix, meta)
+            finally:
+                # 提交成功后临时文件已经不存在，失败（包括被取消）时删除
+                await loop.run_in_executor(None, _remove_file, path + suffix)
+
+            entry = _CacheEntry(etag, size, headers, path=path)
+
+        self.__discard(name, remove_files=False)
+        self.__entries[name] = entry
+        self.size += size
+
+        await self.__evict()
+        return await self.__open(name, entry, None, resp.request_id)
+
+    async def open(self, name, entry, byte_range=None, request_id=''):
+        """打开缓存条目，返回可以像 :class:`Response <asyncoss.http.Response>` 一样读取的对象。
+
+        条目已被淘汰，或 `byte_range` 不合法时返回None，计为未命中。
+        """
+        cached = await self.__open(name, entry, byte_range, request_id)
+        if cached is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return cached
+
+    async def __open(self, name, entry, byte_range, request_id):
+        if self.__entries.get(name) is not entry:
+            return None
+
+        span = _byte_range_span(byte_range, entry.size)
+        if span is None:
+            return None
+
+        if entry.data is not None:
+            fileobj = None
+        else:
+            loop = asyncio.get_event_loop()
+            try:
+                fileobj = await loop.run_in_executor(None, _open_entry_file, entry.path, span[0])
+            except (IOError, OSError):
+                self.__discard(name)
+                return None
+
+        self.__entries.move_to_end(name)
+        return _CachedResponse(entry, span, byte_range is not None, fileobj, request_id)
+
+    def invalidate(self, name):
+        """使以 `name` 为名的条目失效，同时删除其缓存文件。"""
+        self.__discard(name)
+
+    def hit_rate(self):
+        """返回命中率，没有访问过返回0.0。"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self):
+        """清空缓存，统计数据不变。"""
+        for name in list(self.__entries):
+            self.__discard(name)
+
+    async def __evict(self):
+        loop = asyncio.get_event_loop()
+
+        while self.size > self.max_bytes and self.__entries:
+            name, entry = self.__entries.popitem(last=False)
+            self.size -= entry.size
+            self.evictions += 1
+
+            if entry.path is not None:
+                await loop.run_in_executor(None, _remove_entry_files, entry.path)
+
+    def __discard(self, name, remove_files=True):
+        entry = self.__entries.pop(name, None)
+        if entry is None:
+            return
+
+        self.size -= entry.size
+        if remove_files and entry.path is not None:
+            _remove_entry_files(entry.path)
+
+    def __load_directory(self):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory, exist_ok=True)
+
+        filenames = os.listdir(self.directory)
+        existing = set(filenames)
+
+        found = []
+        for filename in filenames:
+            # 进程在写入过程中退出时遗留的临时文件，以及没有元信息文件的内容文件
+            if _TMP_SUFFIX in filename or (_ENTRY_FILENAME.match(filename) and filename + '.json' not in existing):
+                _remove_file(os.path.join(self.directory, filename))
+                continue
+
+            if not filename.endswith('.json'):
+                continue
+
+            meta_path = os.path.join(self.directory, filename)
+            path = meta_path[:-len('.json')]
+            try:
+                with open(meta_path, 'r') as f:
+                    meta = json.load(f)
+                if os.path.getsize(path) != meta['size']:
+                    raise ValueError('size mismatch')
+                found.append((os.path.getmtime(meta_path), tuple(meta['name']), meta, path))
+            except (IOError, OSError, ValueError, KeyError):
+                _remove_entry_files(path)
+
+        for mtime, name, meta, path in sorted(found, key=lambda x: x[0]):
+            self.__entries[name] = _CacheEntry(meta['etag'], meta['size'], meta['headers'], path=path)
+            self.size += meta['size']
+
+        while self.size > self.max_bytes and self.__entries:
+            name, entry = self.__entries.popitem(last=False)
+            self.size -= entry.size
+            _remove_entry_files(entry.path)
+
+
+#: 缓存目录中的临时文件名都含有该标记
+_TMP_SUFFIX = '.tmp'
+
+#: 内容文件名，即 `_entry_filename` 的返回值
+_ENTRY_FILENAME = re.compile(r'^[0-9a-f]{40}$')
+
+# 这些头部描述的是某次HTTP响应，而不是文件本身
+_UNCACHED_HEADERS = ('date', 'connection', 'keep-alive', 'transfer-encoding', 'content-range', 'x-oss-request-id',
+                     'x-oss-server-time', 'server')
+
+
+class _CacheEntry(object):
+    __slots__ = ('etag', 'size', 'headers', 'data', 'path')
+
+    def __init__(self, etag, size, headers, data=None, path=None):
+        self.etag = etag
+        self.size = size
+        self.headers = headers
+        self.data = data
+        self.path = path
+
+
+class _CachedResponse(_LocalResponse):
+    """从缓存读取的响应，接口与 :class:`Response <asyncoss.http.Response>` 相同。"""
+    def __init__(self, entry, span, partial, fileobj, request_id):
+        start, stop = span
+
+        headers = CaseInsensitiveDict(entry.headers)
+        headers['Content-Length'] = str(stop - start)
+        if partial:
+            headers['Content-Range'] = 'bytes {0}-{1}/{2}'.format(start, stop - 1, entry.size)
+
+        super(_CachedResponse, self).__init__(206 if partial else 200, headers, request_id)
+
+        self.__data = entry.data
+        self.__view = memoryview(entry.data) if entry.data is not None else None
+        self.__file = fileobj
+        self.__offset = start
+        self.__stop = stop
+
+    async def read(self, amt=None):
+        remaining = self.__stop - self.__offset
+        if amt is None or amt > remaining:
+            amt = remaining
+
+        if amt <= 0:
+            self.close()
+            return b''
+
+        if self.__data is not None:
+            if self.__offset == 0 and amt == len(self.__data):
+                # 一次读取整个文件，直接返回缓存的bytes对象
+                chunk = self.__data
+            else:
+                chunk = self.__view[self.__offset:self.__offset + amt].tobytes()
+        else:
+            chunk = await asyncio.get_event_loop().run_in_executor(None, self.__file.read, amt)
+            if len(chunk) != amt:
+                self.close()
+                raise InconsistentError('IncompleteRead from cache', self.request_id)
+
+        self.__offset += len(chunk)
+        return chunk
+
+    def close(self):
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+    def __del__(self):
+        self.close()
+
+
+def _byte_range_span(byte_range, size):
+    if byte_range is None or byte_range == (None, None):
+        return 0, size
+
+    start, last = byte_range
+    if start is None:
+        if last is None or last <= 0:
+            return None
+        return max(0, size - last), size
+
+    if start < 0 or start >= size or (last is not None and last < start):
+        return None
+
+    if last is None or last >= size:
+        return start, size
+
+    return start, last + 1
+
+
+def _entry_filename(name):
+    return hashlib.sha1(json.dumps(list(name)).encode('utf-8')).hexdigest()
+
+
+def _open_entry_file(path, offset):
+    f = open(path, 'rb')
+    f.seek(offset)
+    os.utime(path + '.json', None)
+    return f
+
+
+def _commit_entry_files(path, suffix, meta):
+    meta_path = path + '.json'
+    try:
+        with open(meta_path + suffix, 'w') as f:
+            json.dump(meta, f)
+
+        # 先删除旧的元信息文件：中途失败时只会留下没有元信息的内容文件，下次打开缓存目录时被清理
+        _remove_file(meta_path)
+        os.replace(path + suffix, path)
+        os.replace(meta_path + suffix, meta_path)
+    finally:
+        _remove_file(meta_path + suffix)
+
+
+def _remove_entry_files(path):
+    _remove_file(path + '.json')
+    _remove_file(path)
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
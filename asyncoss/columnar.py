@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+
+"""
+asyncoss.columnar
+~~~~~~~~~~~~~~~~~
+
+按列存储的文件列表，用于在内存中保存整个Bucket（或很大的前缀）的罗列结果。
+
+每个文件不再对应一个Python对象：所有文件名以UTF-8编码拼接在一个缓冲区中，另用偏移数组定位；文件大小、最后修改时间、
+ETag等分别保存在定长的 `array.array` 中。这些数组支持缓冲区协议，可以用 ``numpy.frombuffer(table.sizes, 'int64')``
+零拷贝地转换为numpy数组做向量化过滤，再用 :func:`ObjectTable.take` 取出结果。
+"""
+
+import array
+import binascii
+import heapq
+import json
+import re
+import sys
+
+from asyncoss.models import SimplifiedObjectInfo
+
+
+_MAGIC = b'AOSSTBL1'
+
+_MD5_ETAG_PATTERN = re.compile(r'^([0-9A-F]{32})(?:-([1-9][0-9]{0,8}))?$')
+
+
+class ObjectTable(object):
+    """按列存储的文件列表。
+
+    只保存文件，不保存公共前缀。文件按追加的顺序保存，按文件名（UTF-8字节序，与OSS罗列的顺序相同）有序时，
+    可以用 :func:`prefix_range` 、 :func:`find` 做二分查找。
+
+    用法 ::
+
+        >>> table = await ObjectTable.from_iterator(ObjectIterator(bucket, max_keys=1000))
+        >>> for i in table.prefix_range('logs/2019/'):
+        >>>     print(table.key(i), table.sizes[i])
+    """
+
+    def __init__(self):
+        self._key_offsets = array.array('Q', [0])
+        self._key_data = bytearray()
+
+        #: 文件大小数组，类型为 `array.array('q')`
+        self.sizes = array.array('q')
+
+        #: 文件最后修改时间数组，类型为 `array.array('q')` 。参考 :ref:`unix_time`
+        self.mtimes = array.array('q')
+
+        # 形如MD5的ETag（32位大写十六进制，分片上传的还带有"-分片数"）保存为16字节摘要和分片数，其余的保存在字典中
+        self._etag_digests = bytearray()
+        self._etag_parts = array.array('I')
+        self._odd_etags = {}
+
+        # 文件类型和存储类型取值很少，保存为 `_symbols` 中的下标
+        self._types = array.array('B')
+        self._storage_classes = array.array('B')
+        self._symbols = []
+        self._symbol_codes = {}
+
+        self._sorted = True
+
+    @classmethod
+    async def from_iterator(cls, iterator):
+        """把罗列结果收集到一个新的 `ObjectTable` 中。
+
+        :param iterator: :class:`ObjectIterator <asyncoss.ObjectIterator>` 或 :class:`ShardedObjectIterator
+            <asyncoss.ShardedObjectIterator>` 等，每次返回 `SimplifiedObjectInfo` 的异步迭代器
+
+        :return: :class:`ObjectTable`
+        """
+        table = cls()
+
+        if hasattr(iterator, 'pages'):
+            async for page in iterator.pages():
+                table.extend(page)
+        else:
+            async for obj in iterator:
+                table.append(obj)
+
+        return table
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def __getitem__(self, i):
+        """返回第 `i` 个文件，类型为 :class:`SimplifiedObjectInfo <asyncoss.models.SimplifiedObjectInfo>` 。"""
+        i = self.__check_index(i)
+        return SimplifiedObjectInfo(self.key(i), self.mtimes[i], self.etag(i),
+                                    self._symbols[self._types[i]], self.sizes[i],
+                                    self._symbols[self._storage_classes[i]])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def append(self, obj):
+        """追加一个文件。公共前缀会被忽略。
+
+        :param obj: :class:`SimplifiedObjectInfo <asyncoss.models.SimplifiedObjectInfo>` 对象
+        """
+        if obj.is_prefix():
+            return
+
+        key = obj.key.encode('utf-8')
+        n = len(self)
+
+        if self._sorted and n > 0 and key < self.key_bytes(n - 1):
+            self._sorted = False
+
+        self._key_data += key
+        self._key_offsets.append(len(self._key_data))
+
+        self.sizes.append(obj.size)
+        self.mtimes.append(obj.last_modified)
+        self.__append_etag(n, obj.etag)
+
+        self._types.append(self.__symbol_code(obj.type))
+        self._storage_classes.append(self.__symbol_code(obj.storage_class))
+
+    def extend(self, objs):
+        """追加多个文件。公共前缀会被忽略。"""
+        for obj in objs:
+            self.append(obj)
+
+    def key_bytes(self, i):
+        """返回第 `i` 个文件名的UTF-8编码。"""
+        return bytes(self._key_data[self._key_offsets[i]:self._key_offsets[i + 1]])
+
+    def key(self, i):
+        """返回第 `i` 个文件名。"""
+        return self._key_data[self._key_offsets[i]:self._key_offsets[i + 1]].decode('utf-8')
+
+    def etag(self, i):
+        """返回第 `i` 个文件的ETag。"""
+        if i in self._odd_etags:
+            return self._odd_etags[i]
+
+        etag = binascii.hexlify(self._etag_digests[i * 16:i * 16 + 16]).decode('ascii').upper()
+
+        parts = self._etag_parts[i]
+        if parts:
+            etag += '-' + str(parts)
+        return etag
+
+    def is_sorted(self):
+        """文件是否按文件名有序。"""
+        return self._sorted
+
+    def sort(self):
+        """按文件名（UTF-8字节序）排序。已经有序时不做任何事情。
+
+        OSS罗列的结果本身有序，无序的表通常由几段有序的罗列结果拼接而成（比如 `ordered` 为False的
+        :class:`ShardedObjectIterator <asyncoss.ShardedObjectIterator>` ）。这里找出各个有序段后做多路归并，
+        除新的表之外只需要每个文件8字节的下标数组，不为每个文件名同时生成bytes对象。
+        """
+        if self._sorted:
+            return
+
+        runs = []
+        start = 0
+        for i in range(1, len(self)):
+            if self.key_bytes(i) < self.key_bytes(i - 1):
+                runs.append(range(start, i))
+                start = i
+        runs.append(range(start, len(self)))
+
+        order = array.array('Q', heapq.merge(*runs, key=self.key_bytes))
+        self.__dict__.update(self.take(order).__dict__)
+        self._sorted = True
+
+    def take(self, indices):
+        """按给定下标取出文件，组成新的 `ObjectTable` 。
+
+        :param indices: 下标的可迭代对象，比如 `range` 、列表，或用numpy过滤得到的下标数组
+
+        :return: :class:`ObjectTable`
+        """
+        table = ObjectTable()
+        table._symbols = list(self._symbols)
+        table._symbol_codes = dict(self._symbol_codes)
+
+        prev = None
+        for i in indices:
+            i = int(i)
+            key = self._key_data[self._key_offsets[i]:self._key_offsets[i + 1]]
+
+            if table._sorted and prev is not None and key < prev:
+                table._sorted = False
+            prev = key
+
+            table._key_data += key
+            table._key_offsets.append(len(table._key_data))
+
+            table.sizes.append(self.sizes[i])
+            table.mtimes.append(self.mtimes[i])
+
+            n = len(table._etag_parts)
+            table._etag_digests += self._etag_digests[i * 16:i * 16 + 16]
+            table._etag_parts.append(self._etag_parts[i])
+            if i in self._odd_etags:
+                table._odd_etags[n] = self._odd_etags[i]
+
+            table._types.append(self._types[i])
+            table._storage_classes.append(self._storage_classes[i])
+
+        return table
+
+    def prefix_range(self, prefix):
+        """返回文件名以 `prefix` 开头的文件的下标范围。要求文件有序。
+
+        :return: `range` 对象
+        :raises: 如果文件无序，抛出ValueError。可以先调用 :func:`sort`
+        """
+        prefix = prefix.encode('utf-8')
+        lo = self.__bisect_left(prefix)
+
+        hi = lo
+        step = 1
+        # 先倍增找到上界，再二分，匹配的文件少时只需要几次比较
+        while hi + step <= len(self) and self.key_bytes(hi + step - 1).startswith(prefix):
+            hi += step
+            step *= 2
+        while step > 1:
+            step //= 2
+            if hi + step <= len(self) and self.key_bytes(hi + step - 1).startswith(prefix):
+                hi += step
+
+        return range(lo, hi)
+
+    def find(self, key):
+        """查找文件名为 `key` 的文件的下标，找不到返回-1。要求文件有序。
+
+        :raises: 如果文件无序，抛出ValueError。可以先调用 :func:`sort`
+        """
+        key = key.encode('utf-8')
+        i = self.__bisect_left(key)
+        if i < len(self) and self.key_bytes(i) == key:
+            return i
+        return -1
+
+    def save(self, filename):
+        """保存到文件。该函数会阻塞，在事件循环中应通过 `run_in_executor` 调用。"""
+        header = {
+            'count': len(self),
+            'key_bytes': len(self._key_data),
+            'byteorder': sys.byteorder,
+            'sorted': self._sorted,
+            'symbols': self._symbols,
+            'odd_etags': [[i, etag] for i, etag in self._odd_etags.items()]
+        }
+        header = json.dumps(header).encode('utf-8')
+
+        with open(filename, 'wb') as f:
+            f.write(_MAGIC)
+            f.write(len(header).to_bytes(8, 'little'))
+            f.write(header)
+            f.write(self._key_data)
+            f.write(self._etag_digests)
+
+            for a in self.__arrays():
+                a.tofile(f)
+
+    @classmethod
+    def load(cls, filename):
+        """从 :func:`save` 保存的文件中加载。该函数会阻塞，在事件循环中应通过 `run_in_executor` 调用。
+
+        :return: :class:`ObjectTable`
+        :raises: 文件格式不对，抛出ValueError
+        """
+        table = cls()
+
+        with open(filename, 'rb') as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError('{0} is not a saved ObjectTable'.format(filename))
+
+            header_len = int.from_bytes(f.read(8), 'little')
+            header = json.loads(f.read(header_len).decode('utf-8'))
+            n = header['count']
+
+            table._key_data = bytearray(f.read(header['key_bytes']))
+            table._etag_digests = bytearray(f.read(n * 16))
+
+            table._key_offsets = array.array('Q')
+            for a in table.__arrays():
+                a.fromfile(f, n + 1 if a is table._key_offsets else n)
+                if header['byteorder'] != sys.byteorder:
+                    a.byteswap()
+
+        table._sorted = header['sorted']
+        table._symbols = header['symbols']
+        table._symbol_codes = dict((s, i) for i, s in enumerate(table._symbols))
+        table._odd_etags = dict((i, etag) for i, etag in header['odd_etags'])
+        return table
+
+    def __arrays(self):
+        return [self._key_offsets, self.sizes, self.mtimes, self._etag_parts, self._types, self._storage_classes]
+
+    def __append_etag(self, n, etag):
+        m = _MD5_ETAG_PATTERN.match(etag or '')
+        if m:
+            self._etag_digests += binascii.unhexlify(m.group(1))
+            self._etag_parts.append(int(m.group(2) or 0))
+        else:
+            self._etag_digests += bytes(16)
+            self._etag_parts.append(0)
+            self._odd_etags[n] = etag
+
+    def __symbol_code(self, s):
+        try:
+            return self._symbol_codes[s]
+        except KeyError:
+            self._symbols.append(s)
+            self._symbol_codes[s] = len(self._symbols) - 1
+            return len(self._symbols) - 1
+
+    def __bisect_left(self, key):
+        if not self._sorted:
+            raise ValueError('ObjectTable is not sorted, call sort() first')
+
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key_bytes(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def __check_index(self, i):
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError('ObjectTable index out of range')
+        return i
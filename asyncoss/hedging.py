@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+"""
+asyncoss.hedging
+~~~~~~~~~~~~~~~~
+
+对冲请求：读请求迟迟没有响应时，再发出一个相同的请求，先返回的获胜，另一个被取消。
+"""
+
+import collections
+
+
+class HedgePolicy(object):
+    """对冲请求的策略，只用于不带请求体的GET、HEAD请求。
+
+    请求发出后，如果在 `delay()` 秒内没有收到响应头，就通过连接池中的另一个连接再发一个相同的请求，先收到响应头的获胜
+    （包括404等确定的错误响应，网络错误和5xx除外），另一个被取消。 `delay()` 是最近 `window` 个请求收到响应头所用时间的
+    `percentile` 分位数，因此大约只有 (100 - `percentile`)% 的请求会被对冲；被取消的请求以已经等待的时间计入样本。
+
+    用法 ::
+
+        >>> bucket = Bucket(auth, endpoint, 'my-bucket', hedge_policy=HedgePolicy(percentile=95))
+        >>> result = await bucket.get_object('small.json')
+
+    :param float percentile: 以响应时间的该分位数作为对冲前等待的时间，取值范围(0, 100)
+    :param float initial_delay: 样本数不足 `min_samples` 时，对冲前等待的秒数
+    :param float min_delay: 对冲前至少等待的秒数
+    :param float max_delay: 对冲前最多等待的秒数
+    :param int window: 统计最近多少个请求的响应时间
+    :param int min_samples: 样本数达到该值后才按分位数计算等待时间
+    """
+    def __init__(self, percentile=95, initial_delay=0.1, min_delay=0.005, max_delay=2.0, window=1000,
+                 min_samples=20):
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+
+        #: 发出的对冲请求数
+        self.hedged = 0
+
+        #: 对冲请求先于原请求返回的次数
+        self.hedge_wins = 0
+
+        self.__samples = collections.deque(maxlen=window)
+        self.__recorded = 0
+        self.__delay = None
+
+    def delay(self):
+        """对冲前等待的秒数。"""
+        if self.__delay is None:
+            self.__delay = self.__compute_delay()
+        return self.__delay
+
+    def record(self, latency):
+        """记录一个请求收到响应头所用的秒数。"""
+        self.__samples.append(latency)
+        self.__recorded += 1
+
+        # 每隔一段时间才重新计算分位数，避免每个请求都排序
+        if self.__recorded % 64 == 0 or self.__recorded == self.min_samples:
+            self.__delay = None
+
+    def __compute_delay(self):
+        if len(self.__samples) < self.min_samples:
+            return self.initial_delay
+
+        samples = sorted(self.__samples)
+        index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return min(self.max_delay, max(self.min_delay, samples[index]))
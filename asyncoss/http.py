@@ -1,37 +1,85 @@
 # -*- coding: utf-8 -*-
 import asyncio
+import copy
+import functools
+import io
+import time
+import weakref
 
-from oss2 import defaults, http, __version__
+from oss2 import defaults, http, utils, __version__
+from oss2.compat import to_bytes
 from requests.structures import CaseInsensitiveDict
 
 import aiohttp
+import aiohttp.tcp_helpers
 import platform
 
+from asyncoss.exceptions import RequestError
+
 
 _USER_AGENT = 'aliyun-sdk-python/{0}({1}/{2}/{3};{4})'.format(
     __version__, platform.system(), platform.release(), platform.machine(), platform.python_version())
 
 
 class Session(object):
-    """属于同一个Session的请求共享一组连接池，如有可能也会重用HTTP连接。"""
+    """属于同一个Session的请求共享一组连接池，如有可能也会重用HTTP连接。
+
+    :param pool: 共享的连接池，关闭Session时不会关闭该连接池。为None表示Session独占一个新的连接池
+    :type pool: :class:`ConnectionPool`
 
-    def __init__(self, loop=None):
+    :param shaper: 限制该Session的请求速率和带宽。为None表示不限制
+    :type shaper: :class:`TrafficShaper <asyncoss.shaping.TrafficShaper>`
+    """
+
+    def __init__(self, loop=None, pool=None, shaper=None):
         self._loop = loop or asyncio.get_event_loop()
+        self.pool = pool
+        self.shaper = shaper
+
+        if pool is None:
+            psize = defaults.connection_pool_size
+            self._aio_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=psize, loop=self._loop),
+                skip_auto_headers=['Content-Type', 'User-Agent'],
+                loop=self._loop)
+        else:
+            self._aio_session = aiohttp.ClientSession(
+                connector=pool.connector,
+                connector_owner=False,
+                trace_configs=[pool._trace_config],
+                skip_auto_headers=['Content-Type', 'User-Agent'],
+                loop=self._loop)
+
+    async def do_request(self, req, timeout=300, shaper=None):
+        """发送请求。
+
+        :param shaper: 限制本次请求的速率和带宽，为None表示使用Session的 `shaper`
+        """
+        shaper = shaper or self.shaper
+
+        data = req.data
+        headers = req.headers
+        if shaper is not None:
+            await shaper.acquire_request()
 
-        psize = defaults.connection_pool_size
-        connector = aiohttp.TCPConnector(limit=psize, loop=self._loop)
+            data = shaper.wrap_body(data)
+            if data is not req.data and data.len is not None and 'Content-Length' not in headers:
+                # 不修改req.headers，重试、对冲时请求体可能不再经过限速
+                headers = CaseInsensitiveDict(headers)
+                headers['Content-Length'] = str(data.len)
 
-        self._aio_session = aiohttp.ClientSession(
-            connector=connector,
-            skip_auto_headers=['Content-Type', 'User-Agent'],
-            loop=self._loop)
+        try:
+            resp = await self._aio_session.request(req.method, url=req.url,
+                                                   data=data,
+                                                   params=req.params,
+                                                   headers=headers,
+                                                   timeout=timeout)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise RequestError(e)
+
+        if shaper is not None:
+            resp = shaper.wrap_response(resp)
 
-    async def do_request(self, req, timeout=300):
-        resp = await self._aio_session.request(req.method, url=req.url,
-                                               data=req.data,
-                                               params=req.params,
-                                               headers=req.headers,
-                                               timeout=timeout)
         return Response(resp)
 
     async def __aenter__(self):
@@ -45,7 +93,170 @@ class Session(object):
         await self._aio_session.close()
 
 
+class ConnectionPool(object):
+    """可以被多个 :class:`Session` 共享的连接池。
+
+    每个Session默认独占一个连接池，频繁创建 `Bucket` 时，每次都要重新建立TCP连接、完成TLS握手。
+    通过 :func:`get_connection_pool` 得到的连接池在同一个事件循环内按参数共享，Session关闭时连接池不会被关闭。
+
+    用法 ::
+
+        >>> pool = asyncoss.get_connection_pool(limit=64, limit_per_host=32)
+        >>> async with asyncoss.Bucket(auth, endpoint, 'my-bucket', connection_pool=pool) as bucket:
+        >>>     await bucket.get_object('a.txt')
+        >>> print(pool.connections_created, pool.connections_reused, pool.utilization())
+
+    :param int limit: 最大连接数。为None表示使用 `oss2.defaults.connection_pool_size`
+    :param int limit_per_host: 对同一个域名的最大连接数，0表示不限制
+    :param float keepalive_timeout: 空闲连接保持的秒数。为None表示使用aiohttp的默认值
+    :param int dns_cache_ttl: DNS解析结果缓存的秒数，为None表示一直缓存
+    :param bool tcp_nodelay: 是否关闭Nagle算法
+    """
+
+    def __init__(self, limit=None, limit_per_host=0, keepalive_timeout=None, dns_cache_ttl=10, tcp_nodelay=True,
+                 loop=None):
+        self._loop = loop or asyncio.get_event_loop()
+
+        self.limit = defaults.get(limit, defaults.connection_pool_size)
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.tcp_nodelay = tcp_nodelay
+
+        kwargs = {}
+        if keepalive_timeout is not None:
+            kwargs['keepalive_timeout'] = keepalive_timeout
+
+        self.connector = _PoolConnector(tcp_nodelay,
+                                        limit=self.limit,
+                                        limit_per_host=limit_per_host,
+                                        ttl_dns_cache=dns_cache_ttl,
+                                        loop=self._loop,
+                                        **kwargs)
+
+        #: 通过该连接池发出的请求数
+        self.requests = 0
+
+        #: 新建的连接数
+        self.connections_created = 0
+
+        #: 复用已有连接的次数
+        self.connections_reused = 0
+
+        #: 因连接数达到上限而排队等待的次数
+        self.queued = 0
+
+        #: 排队等待的总时间，以秒为单位
+        self.queue_wait_time = 0.0
+
+        self._trace_config = self.__make_trace_config()
+
+    @property
+    def in_use(self):
+        """正在被请求占用的连接数。"""
+        return len(self.connector._acquired)
+
+    @property
+    def idle(self):
+        """空闲、可以复用的连接数。"""
+        return sum(len(conns) for conns in self.connector._conns.values())
+
+    @property
+    def closed(self):
+        return self.connector.closed
+
+    def utilization(self):
+        """正在使用的连接数占最大连接数的比例。"""
+        if not self.limit:
+            return 0.0
+        return self.in_use / self.limit
+
+    def reuse_rate(self):
+        """复用已有连接的请求占比。没有请求时返回0。"""
+        total = self.connections_created + self.connections_reused
+        if total == 0:
+            return 0.0
+        return self.connections_reused / total
+
+    async def close(self):
+        """关闭所有连接。正在使用该连接池的Session之后的请求都会失败。"""
+        await self.connector.close()
+
+    def __make_trace_config(self):
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            self.requests += 1
+
+        async def on_connection_create_end(session, context, params):
+            self.connections_created += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.connections_reused += 1
+
+        async def on_connection_queued_start(session, context, params):
+            self.queued += 1
+            context.queued_at = time.monotonic()
+
+        async def on_connection_queued_end(session, context, params):
+            self.queue_wait_time += time.monotonic() - context.queued_at
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_connection_queued_start.append(on_connection_queued_start)
+        trace_config.on_connection_queued_end.append(on_connection_queued_end)
+        return trace_config
+
+
+class _PoolConnector(aiohttp.TCPConnector):
+    """aiohttp总是为新连接打开TCP_NODELAY，`tcp_nodelay` 为False时在连接建立后关闭它。"""
+    def __init__(self, tcp_nodelay, **kwargs):
+        super(_PoolConnector, self).__init__(**kwargs)
+        self.__tcp_nodelay = tcp_nodelay
+
+    async def _create_connection(self, req, traces, timeout):
+        proto = await super(_PoolConnector, self)._create_connection(req, traces, timeout)
+        if not self.__tcp_nodelay and proto.transport is not None:
+            aiohttp.tcp_helpers.tcp_nodelay(proto.transport, False)
+        return proto
+
+
+# 事件循环 -> {连接池参数: ConnectionPool}
+_connection_pools = weakref.WeakKeyDictionary()
+
+
+def get_connection_pool(limit=None, limit_per_host=0, keepalive_timeout=None, dns_cache_ttl=10, tcp_nodelay=True,
+                        loop=None):
+    """返回当前事件循环中参数相同的共享连接池，不存在或已关闭则新建一个。参数含义参见 :class:`ConnectionPool` 。
+
+    :return: :class:`ConnectionPool`
+    """
+    loop = loop or asyncio.get_event_loop()
+    options = (defaults.get(limit, defaults.connection_pool_size), limit_per_host, keepalive_timeout,
+               dns_cache_ttl, tcp_nodelay)
+
+    pools = _connection_pools.setdefault(loop, {})
+    pool = pools.get(options)
+    if pool is None or pool.closed:
+        pool = ConnectionPool(*options, loop=loop)
+        pools[options] = pool
+
+    return pool
+
+
+async def close_connection_pools(loop=None):
+    """关闭当前事件循环中 :func:`get_connection_pool` 创建的所有连接池，通常在程序退出前调用。"""
+    loop = loop or asyncio.get_event_loop()
+
+    pools = _connection_pools.pop(loop, {})
+    for pool in pools.values():
+        await pool.close()
+
+
 class Request(object):
+    __slots__ = ('method', 'url', 'data', 'params', 'headers')
+
     def __init__(self, method, url,
                  data=None,
                  params=None,
@@ -53,27 +264,155 @@ class Request(object):
                  app_name=''):
         self.method = method
         self.url = url
-        self.data = http._convert_request_body(data)
+
+        # 没有请求体、请求体是bytes时不需要转换
+        if data is None or type(data) is bytes:
+            self.data = data
+        else:
+            self.data = _convert_request_body(data)
 
         self.params = params or {}
 
+        if headers is None and not isinstance(self.data, _AsyncReadAdapter):
+            # 最常见的情况：只需要默认头部
+            self.headers = CaseInsensitiveDict()
+            self.headers['Accept-Encoding'] = ''
+            self.headers['User-Agent'] = _user_agent(app_name)
+            return
+
         if not isinstance(headers, CaseInsensitiveDict):
             self.headers = CaseInsensitiveDict(headers)
         else:
             self.headers = headers
 
+        if isinstance(self.data, _AsyncReadAdapter) and self.data.len is not None:
+            if 'Content-Length' not in self.headers:
+                self.headers['Content-Length'] = str(self.data.len)
+
         if 'Accept-Encoding' not in self.headers:
             self.headers['Accept-Encoding'] = ''
 
         if 'User-Agent' not in self.headers:
-            if app_name:
-                self.headers['User-Agent'] = _USER_AGENT + '/' + app_name
-            else:
-                self.headers['User-Agent'] = _USER_AGENT
+            self.headers['User-Agent'] = _user_agent(app_name)
+
+    def copy(self):
+        """返回一个副本，副本的头部可以单独修改（比如重新签名）。请求体是共享的。"""
+        req = copy.copy(self)
+        req.headers = CaseInsensitiveDict(self.headers)
+        return req
+
+    def can_rewind(self):
+        """请求体能否重新发送。"""
+        if self.data is None or isinstance(self.data, (bytes, bytearray, memoryview)):
+            return True
 
+        return isinstance(self.data, _AsyncReadAdapter) and self.data.seekable()
+
+    def rewind(self):
+        """把请求体恢复到发送前的状态，以便重试。
+
+        :return: 不能恢复时返回False
+        """
+        if not self.can_rewind():
+            return False
+
+        if isinstance(self.data, _AsyncReadAdapter):
+            self.data.rewind()
+        return True
+
+
+def _user_agent(app_name):
+    try:
+        return _USER_AGENTS[app_name]
+    except KeyError:
+        user_agent = _USER_AGENT + '/' + app_name if app_name else _USER_AGENT
+        _USER_AGENTS[app_name] = user_agent
+        return user_agent
+
+
+_USER_AGENTS = {}
 
 _CHUNK_SIZE = 8 * 1024
 
+#: 在线程池中读取请求体时，每次读取的字节数
+_READ_CHUNK_SIZE = 64 * 1024
+
+
+def _convert_request_body(data):
+    """把请求体转换成aiohttp能直接发送的类型。
+
+    bytes、bytearray、memoryview原样返回；文件对象、oss2的进度/CRC适配器等只能同步读取的对象，以及普通可迭代对象，
+    转换为 :class:`_AsyncReadAdapter` ，在线程池中读取。
+    """
+    data = http._convert_request_body(data)
+
+    if data is None or isinstance(data, (bytes, bytearray, memoryview)):
+        return data
+
+    if hasattr(data, 'read') or hasattr(data, '__iter__'):
+        return _AsyncReadAdapter(data, getattr(data, 'len', None))
+
+    return data
+
+
+class _AsyncReadAdapter(object):
+    """把只能同步读取的 `data` 包装成异步可迭代对象，每次读取都在线程池中进行，不阻塞事件循环。
+
+    :param data: 支持read的file-like object，或可迭代对象
+    :param int size: `data` 的长度，未知则为None
+    """
+    def __init__(self, data, size=None):
+        self.data = data
+        self.len = size
+
+        self.__start = _tell(data)
+
+    def seekable(self):
+        """`data` 是否支持定位，即能否通过 :func:`rewind` 重新读取。"""
+        return self.__start is not None
+
+    def rewind(self):
+        """定位到 `data` 最初的位置。"""
+        if isinstance(self.data, utils.SizedFileAdapter):
+            self.data.file_object.seek(self.__start)
+            self.data.offset = 0
+        else:
+            self.data.seek(self.__start)
+
+    def __aiter__(self):
+        return self.__iter_chunks()
+
+    async def __iter_chunks(self):
+        loop = asyncio.get_event_loop()
+
+        if hasattr(self.data, 'read'):
+            read = functools.partial(self.data.read, _READ_CHUNK_SIZE)
+        else:
+            read = functools.partial(next, iter(self.data), b'')
+
+        while True:
+            chunk = await loop.run_in_executor(None, read)
+            if not chunk:
+                break
+
+            yield to_bytes(chunk)
+
+
+def _tell(data):
+    # oss2把文件对象包装成SizedFileAdapter，定位的是其中的文件对象
+    if isinstance(data, utils.SizedFileAdapter):
+        if data.offset != 0:
+            return None
+        data = data.file_object
+
+    if not hasattr(data, 'seek') or not hasattr(data, 'tell'):
+        return None
+
+    try:
+        return data.tell()
+    except (OSError, ValueError):
+        return None
+
 
 class Response(object):
     def __init__(self, response):
@@ -92,22 +431,143 @@ class Response(object):
         # raw.read() does not uncompress response body when the encoding is gzip etc., and
         # we try to avoid depends on details of self.response.raw.
         self.__all_read = False
+        self.__consumed = False
 
     async def read(self, amt=None):
         if self.__all_read:
             return b''
 
         if amt is None:
-            content_list = []
-            async for chunk in self.response.content.iter_chunked(_CHUNK_SIZE):
-                content_list.append(chunk)
-            content = b''.join(content_list)
+            length = self.__body_length()
+            if length is None:
+                content = await self.__read_all()
+            else:
+                content = await self.__read_preallocated(length)
 
             self.__all_read = True
             # logger.debug("Get response body, req-id: {0}, content: {1}", self.request_id, content)
             return content
         else:
+            self.__consumed = True
             return await self.response.content.read(amt)
 
+    async def readinto(self, buffer):
+        """把响应体读入 `buffer` ，直到填满或者读完。数据直接从网络缓冲区拷贝到 `buffer` 中，只拷贝一次。
+
+        用法 ::
+
+            >>> buf = bytearray(result.content_length)
+            >>> n = await result.resp.readinto(buf)
+
+        :param buffer: 可写的bytes-like object，如 `bytearray` 、 `memoryview` 、 `mmap`
+        :return: 读到的字节数。小于 `buffer` 的长度说明响应体已经读完
+        """
+        if self.__all_read:
+            return 0
+
+        self.__consumed = True
+
+        content = self.response.content
+        pos = 0
+
+        with memoryview(buffer) as raw, raw.cast('B') as view:
+            size = len(view)
+            while pos < size:
+                chunk = await content.read(size - pos)
+                if not chunk:
+                    self.__all_read = True
+                    break
+
+                view[pos:pos + len(chunk)] = chunk
+                pos += len(chunk)
+
+        return pos
+
+    def __body_length(self):
+        # 已经读过一部分时剩余的长度未知；HEAD请求的Content-Length是文件大小，但没有响应体
+        if self.__consumed or self.response.method == 'HEAD' or self.status in (204, 304):
+            return None
+
+        # 压缩过的响应体解压后与Content-Length不一致
+        if self.headers.get('Content-Encoding', 'identity') != 'identity':
+            return None
+
+        length = self.headers.get('Content-Length')
+        return int(length) if length is not None else None
+
+    async def __read_all(self):
+        # readany返回网络缓冲区中的整块数据，不拷贝；最后只在join时拷贝一次
+        content_list = []
+        while True:
+            chunk = await self.response.content.readany()
+            if not chunk:
+                return b''.join(content_list)
+            content_list.append(chunk)
+
+    async def __read_preallocated(self, length):
+        # 以预先分配的bytes对象作为BytesIO的初始缓冲区：写入时不会重新分配（没有其他引用），
+        # 写满后getvalue()直接返回该bytes对象。整个过程只拷贝一次，内存峰值约为响应体大小。
+        # 这依赖CPython中BytesIO与初始bytes对象共享缓冲区（写时复制）的实现细节；在其他实现中结果同样正确，只是多拷贝一次
+        buf = io.BytesIO(bytes(length))
+        with buf.getbuffer() as view:
+            n = await self.readinto(view)
+
+        if n < length:
+            buf.truncate(n)
+            return buf.getvalue()
+
+        content = buf.getvalue()
+        rest = await self.__read_all()
+        return content + rest if rest else content
+
+    def iter_chunked(self, chunk_size=_CHUNK_SIZE):
+        """按块异步迭代响应体，每次返回最多 `chunk_size` 字节。"""
+        self.__consumed = True
+        return self.response.content.iter_chunked(chunk_size)
+
     def __aiter__(self):
+        self.__consumed = True
         return self.response.content
+
+
+class _LocalResponse(object):
+    """不直接来自网络的响应（比如来自缓存），子类实现 `read` ，其余接口与 :class:`Response` 相同。"""
+    def __init__(self, status, headers, request_id):
+        self.status = status
+        self.headers = headers
+        self.request_id = request_id
+
+        # GetObjectResult通过 `response.content` 迭代响应体
+        self.response = self
+        self.content = self
+
+    def close(self):
+        """不再读取响应体。"""
+
+    async def readinto(self, buffer):
+        """把响应体读入 `buffer` ，直到填满或者读完，返回读到的字节数。"""
+        pos = 0
+        with memoryview(buffer) as raw, raw.cast('B') as view:
+            while pos < len(view):
+                chunk = await self.read(len(view) - pos)
+                if not chunk:
+                    break
+
+                view[pos:pos + len(chunk)] = chunk
+                pos += len(chunk)
+
+        return pos
+
+    async def iter_chunked(self, chunk_size=_CHUNK_SIZE):
+        while True:
+            chunk = await self.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    async def iter_chunks(self):
+        async for chunk in self.iter_chunked(_CHUNK_SIZE):
+            yield chunk, False
+
+    def __aiter__(self):
+        return self.iter_chunked(_CHUNK_SIZE)
@@ -7,49 +7,169 @@ oss2.iterators
 该模块包含了一些易于使用的迭代器，可以用来遍历Bucket、文件、分片上传等。
 """
 
-from oss2 import defaults
-from oss2.exceptions import ServerError
-from oss2.models import MultipartUploadInfo, SimplifiedObjectInfo
+import asyncio
+import collections
+import warnings
+import weakref
+
+from asyncoss.models import MultipartUploadInfo, SimplifiedObjectInfo
+
+
+def _warn_max_retries(max_retries, stacklevel):
+    if max_retries is not None:
+        warnings.warn('max_retries is deprecated and ignored, use the retry_policy of Bucket and Service instead',
+                      DeprecationWarning, stacklevel=stacklevel + 1)
 
 
 class _BaseIterator(object):
-    def __init__(self, marker, max_retries):
+    """所有分页迭代器的基类。
+
+    `prefetch` 大于0时，在用户处理当前页的同时，后台预先获取后面最多 `prefetch` 页。预取的请求仍然是逐页串行发出的。
+    提前结束迭代时，应调用 `close` （或者用 `async with` 语句）取消后台预取；忘记调用时，迭代器被回收后预取也会被取消。
+
+    请求失败时按 `Bucket` 、 `Service` 的 `retry_policy` 重试，迭代器本身不再重试。
+    `max_retries` 参数和 `fetch_with_retry` 方法已废弃，不起任何作用，将在以后的版本中删除；重试次数请通过 `retry_policy` 设置。
+    """
+    def __init__(self, marker, max_retries, prefetch=0):
         self.is_truncated = True
         self.next_marker = marker
 
-        max_retries = defaults.get(max_retries, defaults.request_retries)
-        self.max_retries = max_retries if max_retries > 0 else 1
+        _warn_max_retries(max_retries, 3)
+        self.max_retries = max_retries
 
-        self.entries = []
+        self.prefetch = prefetch
+
+        self.entries = collections.deque()
+
+        self.__exhausted = False
+        self.__pages = None
+        self.__slots = None
+        self.__prefetch_task = None
 
     async def _fetch(self):
+        """获取下一页，返回 (该页的条目列表, is_truncated, next_marker)。"""
         raise NotImplemented  # pragma: no cover
 
-    async def __aiter__(self):
+    def __aiter__(self):
         return self
 
     async def __anext__(self):
+        while not self.entries:
+            page = await self.__next_page()
+            if page is None:
+                raise StopAsyncIteration
+
+            self.entries = collections.deque(page)
+
+        return self.entries.popleft()
+
+    async def pages(self):
+        """按页迭代，每次返回一页的条目列表（不会返回空列表）。
+
+        用法 ::
+
+            >>> async for page in ObjectIterator(bucket).pages():
+            >>>     process(page)
+
+        如果之前已经逐个迭代过，当前页剩余的条目作为第一页返回。
+        """
+        if self.entries:
+            page = list(self.entries)
+            self.entries.clear()
+            yield page
+
         while True:
-            if self.entries:
-                return self.entries.pop(0)
+            page = await self.__next_page()
+            if page is None:
+                return
 
-            if not self.is_truncated:
-                raise StopAsyncIteration
+            if page:
+                yield page
+
+    async def __next_page(self):
+        if self.__exhausted:
+            return None
 
-            await self.fetch_with_retry()
+        if self.prefetch > 0:
+            page = await self.__next_prefetched_page()
+        elif self.is_truncated:
+            page = await self._fetch_page()
+        else:
+            page = None
+
+        if page is None:
+            self.__exhausted = True
+        return page
 
     async def fetch_with_retry(self):
-        for i in range(self.max_retries):
-            try:
-                self.is_truncated, self.next_marker = await self._fetch()
-            except ServerError as e:
-                if e.status // 100 != 5:
-                    raise
+        """获取下一页，放入 `entries` 。
 
-                if i == self.max_retries - 1:
-                    raise
-            else:
+        已废弃：迭代器本身不再重试，该方法与直接获取下一页相同，将在以后的版本中删除。
+        """
+        warnings.warn('fetch_with_retry is deprecated, retries are done by the retry_policy of Bucket and Service',
+                      DeprecationWarning, stacklevel=2)
+        self.entries = collections.deque(await self._fetch_page())
+
+    async def _fetch_page(self):
+        # 失败的请求已经由 `Bucket` 、 `Service` 按其 `retry_policy` 重试过，这里不再重试
+        entries, self.is_truncated, self.next_marker = await self._fetch()
+        return entries
+
+    def close(self):
+        """取消后台预取。"""
+        if self.__prefetch_task is not None:
+            self.__prefetch_task.cancel()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    async def __next_prefetched_page(self):
+        if self.__prefetch_task is None:
+            self.__pages = asyncio.Queue()
+            self.__slots = asyncio.Semaphore(self.prefetch)
+            self.__prefetch_task = asyncio.ensure_future(
+                _prefetch_pages(weakref.ref(self), self.__pages, self.__slots))
+
+            # 预取任务只持有迭代器的弱引用，迭代器被回收时取消预取
+            weakref.finalize(self, self.__prefetch_task.cancel)
+
+        page = await self.__pages.get()
+        if isinstance(page, Exception):
+            # 预取任务已经结束，下次调用时从出错的那一页重新开始预取，与不预取时的行为一致
+            self.__prefetch_task = None
+            raise page
+
+        self.__slots.release()
+        return page
+
+
+async def _prefetch_pages(ref, pages, slots):
+    # 只在发出请求期间持有迭代器，等待空位时不持有，以免迭代器因为本任务而无法回收
+    try:
+        while True:
+            iterator = ref()
+            if iterator is None:
+                return
+            if not iterator.is_truncated:
+                break
+            iterator = None
+
+            await slots.acquire()
+
+            iterator = ref()
+            if iterator is None:
                 return
+            page = await iterator._fetch_page()
+            iterator = None
+
+            pages.put_nowait(page)
+    except Exception as e:
+        pages.put_nowait(e)
+    else:
+        pages.put_nowait(None)
 
 
 class BucketIterator(_BaseIterator):
@@ -61,10 +181,11 @@ class BucketIterator(_BaseIterator):
     :param prefix: 只列举匹配该前缀的Bucket
     :param marker: 分页符。只列举Bucket名字典序在此之后的Bucket
     :param max_keys: 每次调用 `list_buckets` 时的max_keys参数。注意迭代器返回的数目可能会大于该值。
+    :param prefetch: 后台预取的页数，0表示不预取。
     """
 
-    def __init__(self, service, prefix='', marker='', max_keys=100, max_retries=None):
-        super(BucketIterator, self).__init__(marker, max_retries)
+    def __init__(self, service, prefix='', marker='', max_keys=100, max_retries=None, prefetch=0):
+        super(BucketIterator, self).__init__(marker, max_retries, prefetch)
         self.service = service
         self.prefix = prefix
         self.max_keys = max_keys
@@ -73,9 +194,7 @@ class BucketIterator(_BaseIterator):
         result = await self.service.list_buckets(prefix=self.prefix,
                                                  marker=self.next_marker,
                                                  max_keys=self.max_keys)
-        self.entries = result.buckets
-
-        return result.is_truncated, result.next_marker
+        return result.buckets, result.is_truncated, result.next_marker
 
 
 class ObjectIterator(_BaseIterator):
@@ -89,10 +208,11 @@ class ObjectIterator(_BaseIterator):
     :param delimiter: 目录分隔符
     :param marker: 分页符
     :param max_keys: 每次调用 `list_objects` 时的max_keys参数。注意迭代器返回的数目可能会大于该值。
+    :param prefetch: 后台预取的页数，0表示不预取。
     """
 
-    def __init__(self, bucket, prefix='', delimiter='', marker='', max_keys=100, max_retries=None):
-        super(ObjectIterator, self).__init__(marker, max_retries)
+    def __init__(self, bucket, prefix='', delimiter='', marker='', max_keys=100, max_retries=None, prefetch=0):
+        super(ObjectIterator, self).__init__(marker, max_retries, prefetch)
 
         self.bucket = bucket
         self.prefix = prefix
@@ -104,11 +224,205 @@ class ObjectIterator(_BaseIterator):
                                                 delimiter=self.delimiter,
                                                 marker=self.next_marker,
                                                 max_keys=self.max_keys)
-        self.entries = result.object_list + [SimplifiedObjectInfo(prefix, None, None, None, None, None)
-                                             for prefix in result.prefix_list]
-        self.entries.sort(key=lambda obj: obj.key)
+        entries = result.object_list + [SimplifiedObjectInfo(prefix, None, None, None, None, None)
+                                        for prefix in result.prefix_list]
+        entries.sort(key=lambda obj: obj.key)
+
+        return entries, result.is_truncated, result.next_marker
+
+
+class ShardedObjectIterator(object):
+    """并发遍历Bucket里文件的迭代器。
 
-        return result.is_truncated, result.next_marker
+    先把键空间切分为多个分片，再同时罗列多个分片，从而减少逐页请求带来的等待。切分方式有两种：
+
+        #. 指定 `split_markers` 时，按这些分页符切分，第i个分片包含 `split_markers[i-1]` 之后、`split_markers[i]` 及其之前的文件；
+        #. 否则，用 `delimiter` 罗列 `prefix` 下的公共前缀（目录），每个公共前缀是一个分片；`prefix` 下直接的文件在这次罗列中得到。
+
+    罗列某个分片时如果一页（ `max_keys` 个文件）没有列完，说明该分片较大，其余部分再用 `delimiter` 按下一级公共前缀切分为子分片，
+    如此逐级细分，因此文件集中在少数几个深层目录中时也能并发罗列。 `delimiter` 为空时不细分。
+
+    每次迭代返回的是 :class:`SimplifiedObjectInfo <oss2.models.SimplifiedObjectInfo>` 对象，不会返回公共前缀。
+    `ordered` 为True时，按文件名有序返回，每一级最多预先罗列 `num_threads` 个分片；否则按到达顺序返回。
+    无论哪种方式，同时进行的请求都不超过 `num_threads` 个。
+
+    :param bucket: :class:`Bucket <oss2.Bucket>` 对象
+    :param prefix: 只列举匹配该前缀的文件
+    :param delimiter: 用来发现分片的目录分隔符
+    :param split_markers: 用来切分键空间的分页符列表
+    :param num_threads: 同时罗列的分片数
+    :param ordered: 是否按文件名有序返回
+    :param max_keys: 每次调用 `list_objects` 时的max_keys参数。
+    :param max_retries: 已废弃，不起任何作用，重试次数请通过 `Bucket` 的 `retry_policy` 设置。
+    """
+
+    def __init__(self, bucket, prefix='', delimiter='/', split_markers=None,
+                 num_threads=4, ordered=False, max_keys=1000, max_retries=None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.delimiter = delimiter
+        self.split_markers = split_markers
+        self.num_threads = num_threads
+        self.ordered = ordered
+        self.max_keys = max_keys
+
+        _warn_max_retries(max_retries, 2)
+        self.max_retries = max_retries
+
+    def __aiter__(self):
+        return self.__iterate()
+
+    async def __iterate(self):
+        # 有序时每个分片把页和子分片依次放入自己的队列；无序时所有分片把页放入同一个队列，pending为还没有罗列完的分片数
+        output = None if self.ordered else asyncio.Queue(self.num_threads * 2)
+        pending = [0]
+        semaphore = asyncio.Semaphore(self.num_threads)
+        tasks = set()
+
+        def start(shard):
+            if self.ordered:
+                shard.queue = asyncio.Queue(max(2, self.num_threads))
+            else:
+                pending[0] += 1
+
+            task = asyncio.ensure_future(run(shard))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        async def emit(shard, item):
+            if isinstance(item, _Shard):
+                start(item)
+                if not self.ordered:
+                    return
+
+            await (shard.queue if self.ordered else output).put(item)
+
+        async def run(shard):
+            try:
+                await self.__list_shard(shard, emit, semaphore)
+            except Exception as e:
+                await (shard.queue if self.ordered else output).put(e)
+                return
+
+            if self.ordered:
+                await shard.queue.put(None)
+            else:
+                pending[0] -= 1
+                if pending[0] == 0:
+                    await output.put(None)
+
+        root = _Shard(self.prefix, '', None, 0)
+        start(root)
+        try:
+            if self.ordered:
+                pages = self.__ordered_pages(root)
+            else:
+                pages = self.__unordered_pages(output)
+
+            async for page in pages:
+                for entry in page:
+                    yield entry
+        finally:
+            for t in list(tasks):
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def __ordered_pages(self, shard):
+        while True:
+            item = await shard.queue.get()
+            if isinstance(item, Exception):
+                raise item
+            if item is None:
+                return
+
+            if isinstance(item, _Shard):
+                async for page in self.__ordered_pages(item):
+                    yield page
+            else:
+                yield item
+
+    async def __unordered_pages(self, q):
+        while True:
+            page = await q.get()
+            if isinstance(page, Exception):
+                raise page
+            if page is None:
+                return
+            yield page
+
+    async def __list_shard(self, shard, emit, semaphore):
+        if shard.depth == 0 and self.split_markers is not None:
+            markers = [''] + sorted(self.split_markers) + [None]
+            for i in range(len(markers) - 1):
+                await emit(shard, _Shard(shard.prefix, markers[i], markers[i + 1], 1))
+            return
+
+        if shard.depth == 0 and self.delimiter:
+            await self.__split(shard, '', emit, semaphore)
+            return
+
+        it = ObjectIterator(self.bucket, prefix=shard.prefix, marker=shard.lo, max_keys=self.max_keys)
+        while it.is_truncated:
+            # 只在发出请求时占用名额，向队列放入结果时可能要等待，不能占着名额
+            async with semaphore:
+                entries = await it._fetch_page()
+
+            page = [e for e in entries if shard.hi is None or e.key <= shard.hi]
+            if page:
+                await emit(shard, page)
+
+            if len(page) < len(entries):
+                return
+
+            if it.is_truncated and page and self.delimiter:
+                await self.__split(shard, page[-1].key, emit, semaphore)
+                return
+
+    async def __split(self, shard, marker, emit, semaphore):
+        """把 `shard` 中 `marker` 之后的部分按下一级公共前缀切分为子分片，直接位于 `shard.prefix` 下的文件随即输出。"""
+        prefix, hi, depth = shard.prefix, shard.hi, shard.depth + 1
+
+        # marker所在的子目录中还有剩余文件，它一定排在最前面
+        current = None
+        rest = marker[len(prefix):] if marker.startswith(prefix) else ''
+        if self.delimiter in rest:
+            current = prefix + rest[:rest.index(self.delimiter) + len(self.delimiter)]
+            await emit(shard, _Shard(current, marker, hi, depth))
+
+        it = ObjectIterator(self.bucket, prefix=prefix, delimiter=self.delimiter, marker=marker,
+                            max_keys=self.max_keys)
+        while it.is_truncated:
+            async with semaphore:
+                entries = await it._fetch_page()
+
+            files = []
+            for entry in entries:
+                if hi is not None and entry.key > hi:
+                    it.is_truncated = False
+                    break
+
+                if not entry.is_prefix():
+                    files.append(entry)
+                elif entry.key != current:
+                    if files:
+                        await emit(shard, files)
+                        files = []
+                    await emit(shard, _Shard(entry.key, '', hi, depth))
+
+            if files:
+                await emit(shard, files)
+
+
+class _Shard(object):
+    """:class:`ShardedObjectIterator` 的一个分片： `prefix` 下 `lo` 之后、 `hi` 及其之前的文件。 `hi` 为None表示不限。"""
+    __slots__ = ('prefix', 'lo', 'hi', 'depth', 'queue')
+
+    def __init__(self, prefix, lo, hi, depth):
+        self.prefix = prefix
+        self.lo = lo
+        self.hi = hi
+        self.depth = depth
+        self.queue = None
 
 
 class MultipartUploadIterator(_BaseIterator):
@@ -123,12 +437,13 @@ class MultipartUploadIterator(_BaseIterator):
     :param key_marker: 文件名分页符
     :param upload_id_marker: 分片上传ID分页符
     :param max_uploads: 每次调用 `list_multipart_uploads` 时的max_uploads参数。注意迭代器返回的数目可能会大于该值。
+    :param prefetch: 后台预取的页数，0表示不预取。
     """
 
     def __init__(self, bucket,
                  prefix='', delimiter='', key_marker='', upload_id_marker='',
-                 max_uploads=1000, max_retries=None):
-        super(MultipartUploadIterator, self).__init__(key_marker, max_retries)
+                 max_uploads=1000, max_retries=None, prefetch=0):
+        super(MultipartUploadIterator, self).__init__(key_marker, max_retries, prefetch)
 
         self.bucket = bucket
         self.prefix = prefix
@@ -142,11 +457,11 @@ class MultipartUploadIterator(_BaseIterator):
                                                           key_marker=self.next_marker,
                                                           upload_id_marker=self.next_upload_id_marker,
                                                           max_uploads=self.max_uploads)
-        self.entries = result.upload_list + [MultipartUploadInfo(prefix, None, None) for prefix in result.prefix_list]
-        self.entries.sort(key=lambda u: u.key)
+        entries = result.upload_list + [MultipartUploadInfo(prefix, None, None) for prefix in result.prefix_list]
+        entries.sort(key=lambda u: u.key)
 
         self.next_upload_id_marker = result.next_upload_id_marker
-        return result.is_truncated, result.next_key_marker
+        return entries, result.is_truncated, result.next_key_marker
 
 
 class ObjectUploadIterator(_BaseIterator):
@@ -158,10 +473,11 @@ class ObjectUploadIterator(_BaseIterator):
     :param bucket: :class:`Bucket <oss2.Bucket>` 对象
     :param key: 文件名
     :param max_uploads: 每次调用 `list_multipart_uploads` 时的max_uploads参数。注意迭代器返回的数目可能会大于该值。
+    :param prefetch: 后台预取的页数，0表示不预取。
     """
 
-    def __init__(self, bucket, key, max_uploads=1000, max_retries=None):
-        super(ObjectUploadIterator, self).__init__('', max_retries)
+    def __init__(self, bucket, key, max_uploads=1000, max_retries=None, prefetch=0):
+        super(ObjectUploadIterator, self).__init__('', max_retries, prefetch)
         self.bucket = bucket
         self.key = key
         self.next_upload_id_marker = ''
@@ -173,16 +489,16 @@ class ObjectUploadIterator(_BaseIterator):
                                                           upload_id_marker=self.next_upload_id_marker,
                                                           max_uploads=self.max_uploads)
 
-        self.entries = [u for u in result.upload_list if u.key == self.key]
+        entries = [u for u in result.upload_list if u.key == self.key]
         self.next_upload_id_marker = result.next_upload_id_marker
 
-        if not result.is_truncated or not self.entries:
-            return False, result.next_key_marker
+        if not result.is_truncated or not entries:
+            return entries, False, result.next_key_marker
 
         if result.next_key_marker > self.key:
-            return False, result.next_key_marker
+            return entries, False, result.next_key_marker
 
-        return result.is_truncated, result.next_key_marker
+        return entries, result.is_truncated, result.next_key_marker
 
 
 class PartIterator(_BaseIterator):
@@ -195,11 +511,12 @@ class PartIterator(_BaseIterator):
     :param upload_id: 分片上传ID
     :param marker: 分页符
     :param max_parts: 每次调用 `list_parts` 时的max_parts参数。注意迭代器返回的数目可能会大于该值。
+    :param prefetch: 后台预取的页数，0表示不预取。
     """
 
     def __init__(self, bucket, key, upload_id,
-                 marker='0', max_parts=1000, max_retries=None):
-        super(PartIterator, self).__init__(marker, max_retries)
+                 marker='0', max_parts=1000, max_retries=None, prefetch=0):
+        super(PartIterator, self).__init__(marker, max_retries, prefetch)
 
         self.bucket = bucket
         self.key = key
@@ -210,9 +527,7 @@ class PartIterator(_BaseIterator):
         result = await self.bucket.list_parts(self.key, self.upload_id,
                                               marker=self.next_marker,
                                               max_parts=self.max_parts)
-        self.entries = result.parts
-
-        return result.is_truncated, result.next_marker
+        return result.parts, result.is_truncated, result.next_marker
 
 
 class LiveChannelIterator(_BaseIterator):
@@ -224,10 +539,11 @@ class LiveChannelIterator(_BaseIterator):
     :param prefix: 只列举匹配该前缀的文件
     :param marker: 分页符
     :param max_keys: 每次调用 `list_live_channel` 时的max_keys参数。注意迭代器返回的数目可能会大于该值。
+    :param prefetch: 后台预取的页数，0表示不预取。
     """
 
-    def __init__(self, bucket, prefix='', marker='', max_keys=100, max_retries=None):
-        super(LiveChannelIterator, self).__init__(marker, max_retries)
+    def __init__(self, bucket, prefix='', marker='', max_keys=100, max_retries=None, prefetch=0):
+        super(LiveChannelIterator, self).__init__(marker, max_retries, prefetch)
 
         self.bucket = bucket
         self.prefix = prefix
@@ -237,6 +553,4 @@ class LiveChannelIterator(_BaseIterator):
         result = await self.bucket.list_live_channel(prefix=self.prefix,
                                                      marker=self.next_marker,
                                                      max_keys=self.max_keys)
-        self.entries = result.channels
-
-        return result.is_truncated, result.next_marker
+        return result.channels, result.is_truncated, result.next_marker
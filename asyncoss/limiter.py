@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+"""
+asyncoss.limiter
+~~~~~~~~~~~~~~~~
+
+根据OSS的限流错误和响应延迟自动调整并发数。
+"""
+
+import asyncio
+import collections
+import time
+
+from asyncoss import exceptions
+
+
+#: 表示请求被限流的错误码
+_THROTTLING_CODES = frozenset(['SlowDown', 'ServerBusy', 'RequestRateLimited'])
+
+
+class AdaptiveLimiter(object):
+    """按AIMD（加性增、乘性减）调整同时进行的请求数。
+
+    请求在发出前申请一个名额，收到响应头后归还。请求正常完成且名额接近用满时，上限每轮增加约1（每个请求增加 1 / 上限）；
+    遇到限流错误（503、429或 `SlowDown` 等错误码）、超时，或者不带请求体的请求延迟超过基准延迟的 `latency_tolerance` 倍时，
+    上限乘以 `backoff_ratio` 。在上次降低之前就已发出的请求不会再次导致降低，避免一次拥塞让上限连续下降。
+
+    同一个 `AdaptiveLimiter` 可以被多个 `Bucket` 共享，它们发出的请求共用一个上限。
+
+    用法 ::
+
+        >>> limiter = AdaptiveLimiter(initial_limit=32, max_limit=512)
+        >>> bucket = Bucket(auth, endpoint, 'my-bucket', concurrency_limiter=limiter)
+        >>> await asyncio.gather(*[bucket.head_object(key) for key in keys])
+        >>> print(limiter.limit, limiter.throttled)
+
+    :param int initial_limit: 初始的并发上限
+    :param int min_limit: 并发上限的最小值
+    :param int max_limit: 并发上限的最大值
+    :param float backoff_ratio: 降低上限时乘以的系数，介于0和1之间
+    :param float latency_tolerance: 延迟超过基准延迟的多少倍时认为出现了拥塞。为None表示只根据错误调整
+    """
+    def __init__(self, initial_limit=16, min_limit=1, max_limit=1000, backoff_ratio=0.7, latency_tolerance=3.0):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+
+        #: 正在进行的请求数
+        self.in_flight = 0
+
+        #: 遇到限流错误的次数
+        self.throttled = 0
+
+        self.__limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.__waiters = collections.deque()
+        self.__base_latency = None
+        self.__last_decrease = 0.0
+
+    @property
+    def limit(self):
+        """当前的并发上限。"""
+        return int(self.__limit)
+
+    @property
+    def base_latency(self):
+        """基准延迟，即近期不带请求体的请求的最小延迟，以秒为单位。还没有样本时为None。"""
+        return self.__base_latency
+
+    async def acquire(self):
+        """等待直到有空闲的名额。
+
+        :return: 请求开始的时间，应原样传给 :func:`release`
+        """
+        if self.in_flight < self.limit and not self.__waiters:
+            self.in_flight += 1
+            return time.monotonic()
+
+        waiter = asyncio.get_event_loop().create_future()
+        self.__waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # 名额已经分配给了本协程，归还给其他等待者
+            if waiter.done() and not waiter.cancelled():
+                self.in_flight -= 1
+                self.__wake_up()
+            raise
+
+        return time.monotonic()
+
+    def release(self, started, error=None, measure_latency=True):
+        """归还名额，并根据请求的结果调整上限。
+
+        :param float started: :func:`acquire` 的返回值
+        :param error: 请求抛出的异常，成功则为None
+        :param bool measure_latency: 是否用本次请求的延迟判断拥塞。上传等延迟取决于数据量的请求应为False
+        """
+        latency = time.monotonic() - started
+        saturated = self.in_flight >= self.__limit / 2
+
+        self.in_flight -= 1
+
+        if is_throttling_error(error):
+            self.throttled += 1
+            self.__decrease(started)
+        elif measure_latency and self.__is_congested(latency):
+            self.__decrease(started)
+        elif saturated:
+            self.__limit = min(self.max_limit, self.__limit + 1 / self.__limit)
+
+        self.__wake_up()
+
+    def __is_congested(self, latency):
+        base = self.__base_latency
+        if base is None or latency < base:
+            self.__base_latency = latency
+            return False
+
+        # 基准延迟缓慢向当前延迟靠拢，以适应网络环境的长期变化
+        self.__base_latency = base + (latency - base) * 0.01
+
+        return self.latency_tolerance is not None and latency > base * self.latency_tolerance
+
+    def __decrease(self, started):
+        if started < self.__last_decrease:
+            return
+
+        self.__limit = max(self.min_limit, self.__limit * self.backoff_ratio)
+        self.__last_decrease = time.monotonic()
+
+    def __wake_up(self):
+        while self.__waiters and self.in_flight < self.limit:
+            waiter = self.__waiters.popleft()
+            if waiter.done():
+                continue
+
+            self.in_flight += 1
+            waiter.set_result(None)
+
+
+def is_throttling_error(error):
+    """请求是否因为服务端过载、限流而失败。"""
+    if isinstance(error, exceptions.ServerError):
+        return error.status in (429, 503) or error.code in _THROTTLING_CODES
+
+    if isinstance(error, exceptions.RequestError):
+        return isinstance(error.exception, asyncio.TimeoutError)
+
+    return False
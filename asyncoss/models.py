@@ -26,6 +26,8 @@ class PartInfo(object):
     :param int last_modified: 该分片最后修改的时间戳，类型为int。参考 :ref:`unix_time`
     :param int part_crc: 该分片的crc64值
     """
+    __slots__ = ('part_number', 'etag', 'size', 'last_modified', 'part_crc')
+
     def __init__(self, part_number, etag, size=None, last_modified=None, part_crc=None):
         self.part_number = part_number
         self.etag = etag
@@ -45,6 +47,29 @@ def _get_etag(headers):
     return _hget(headers, 'etag', lambda x: x.strip('"'))
 
 
+class _HeaderField(object):
+    """从HTTP头中解析得到的字段。首次访问时才解析，结果缓存在实例上，后续访问不再解析。
+
+    :param str header: HTTP头的名字
+    :param converter: 把HTTP头的值转换为字段值的函数
+    """
+    def __init__(self, header, converter=lambda x: x):
+        self.header = header
+        self.converter = converter
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        value = _hget(instance.headers, self.header, self.converter)
+        instance.__dict__[self.name] = value
+        return value
+
+
 class RequestResult(object):
     def __init__(self, resp):
         #: HTTP响应
@@ -60,27 +85,23 @@ class RequestResult(object):
         self.request_id = resp.request_id
 
 class HeadObjectResult(RequestResult):
-    def __init__(self, resp):
-        super(HeadObjectResult, self).__init__(resp)
+    #: 文件类型，可以是'Normal'、'Multipart'、'Appendable'等
+    object_type = _HeaderField(OSS_OBJECT_TYPE)
 
-        #: 文件类型，可以是'Normal'、'Multipart'、'Appendable'等
-        self.object_type = _hget(self.headers, OSS_OBJECT_TYPE)
+    #: 文件最后修改时间，类型为int。参考 :ref:`unix_time` 。
+    last_modified = _HeaderField('last-modified', http_to_unixtime)
 
-        #: 文件最后修改时间，类型为int。参考 :ref:`unix_time` 。
+    #: 文件的MIME类型
+    content_type = _HeaderField('content-type')
 
-        self.last_modified = _hget(self.headers, 'last-modified', http_to_unixtime)
+    #: Content-Length，可能是None。
+    content_length = _HeaderField('content-length', int)
 
-        #: 文件的MIME类型
-        self.content_type = _hget(self.headers, 'content-type')
+    #: HTTP ETag
+    etag = _HeaderField('etag', lambda x: x.strip('"'))
 
-        #: Content-Length，可能是None。
-        self.content_length = _hget(self.headers, 'content-length', int)
-
-        #: HTTP ETag
-        self.etag = _get_etag(self.headers)
-
-        #: 文件 server_crc
-        self._server_crc = _hget(self.headers, 'x-oss-hash-crc64ecma', int)
+    #: 文件 server_crc
+    _server_crc = _HeaderField('x-oss-hash-crc64ecma', int)
 
     @property
     def server_crc(self):
@@ -100,17 +121,14 @@ class GetSelectObjectMetaResult(HeadObjectResult):
 
 
 class GetObjectMetaResult(RequestResult):
-    def __init__(self, resp):
-        super(GetObjectMetaResult, self).__init__(resp)
-
-        #: 文件最后修改时间，类型为int。参考 :ref:`unix_time` 。
-        self.last_modified = _hget(self.headers, 'last-modified', http_to_unixtime)
+    #: 文件最后修改时间，类型为int。参考 :ref:`unix_time` 。
+    last_modified = _HeaderField('last-modified', http_to_unixtime)
 
-        #: Content-Length，文件大小，类型为int。
-        self.content_length = _hget(self.headers, 'content-length', int)
+    #: Content-Length，文件大小，类型为int。
+    content_length = _HeaderField('content-length', int)
 
-        #: HTTP ETag
-        self.etag = _get_etag(self.headers)
+    #: HTTP ETag
+    etag = _HeaderField('etag', lambda x: x.strip('"'))
 
 
 class GetSymlinkResult(RequestResult):
@@ -151,6 +169,34 @@ class GetObjectResult(HeadObjectResult):
     async def read(self, amt=None):
         return await self.stream.read(amt)
 
+    async def readinto(self, buffer):
+        """把文件内容读入 `buffer` ，直到填满或者读完。与 :func:`read` 相比少一次拷贝，适合把大文件读入预先分配的内存。
+
+        用法 ::
+
+            >>> result = await bucket.get_object('big.bin')
+            >>> buf = bytearray(result.content_length)
+            >>> n = await result.readinto(buf)
+
+        :param buffer: 可写的bytes-like object，如 `bytearray` 、 `memoryview` 、 `mmap`
+        :return: 读到的字节数。小于 `buffer` 的长度说明已经读完
+        """
+        if self.stream is self.resp:
+            return await self.resp.readinto(buffer)
+
+        # 经过进度回调、CRC校验、解密等处理的数据只能逐块读取再拷贝
+        pos = 0
+        with memoryview(buffer) as raw, raw.cast('B') as view:
+            while pos < len(view):
+                chunk = await self.stream.read(len(view) - pos)
+                if not chunk:
+                    break
+
+                view[pos:pos + len(chunk)] = chunk
+                pos += len(chunk)
+
+        return pos
+
     def __aiter__(self):
         return self.stream.response.content.iter_chunks()
 
@@ -208,6 +254,44 @@ class BatchDeleteObjectsResult(RequestResult):
         #: 已经删除的文件名列表
         self.deleted_keys = []
 
+        #: 删除的文件的版本信息列表
+        self.delete_versions = []
+
+        #: 删除失败的文件列表，元素为 (文件名, 错误码, 错误信息)。简单模式下OSS只返回这部分
+        self.failed_objects = []
+
+
+class BulkDeleteObjectsResult(object):
+    """:func:`bulk_delete_objects <asyncoss.Bucket.bulk_delete_objects>` 的结果。"""
+    def __init__(self):
+        #: 成功删除的文件数
+        self.deleted_count = 0
+
+        #: 删除失败的文件名列表
+        self.failed_keys = []
+
+        #: 失败的批次对应的异常列表
+        self.errors = []
+
+
+class SyncResult(object):
+    """:func:`sync_to_bucket <asyncoss.sync_to_bucket>` 、 :func:`sync_from_bucket <asyncoss.sync_from_bucket>` 的结果。"""
+    def __init__(self):
+        #: 上传或下载了的文件列表，元素为OSS文件名
+        self.transferred_keys = []
+
+        #: 内容相同而跳过的文件数
+        self.skipped_count = 0
+
+        #: 删除了的多余文件列表，元素为OSS文件名
+        self.deleted_keys = []
+
+        #: 比较、传输或删除失败的文件列表，元素为OSS文件名
+        self.failed_keys = []
+
+        #: 失败的文件以及删除失败的批次对应的异常列表
+        self.errors = []
+
 
 class InitMultipartUploadResult(RequestResult):
     def __init__(self, resp):
@@ -235,7 +319,9 @@ class ListObjectsResult(RequestResult):
 
 
 class SimplifiedObjectInfo(object):
-    def __init__(self, key, last_modified, etag, type, size, storage_class):
+    __slots__ = ('key', 'last_modified', 'etag', 'type', 'size', 'storage_class', 'owner', 'restore_info')
+
+    def __init__(self, key, last_modified, etag, type, size, storage_class, owner=None, restore_info=None):
         #: 文件名，或公共前缀名。
         self.key = key
 
@@ -254,6 +340,12 @@ class SimplifiedObjectInfo(object):
         #: 文件的存储类别，是一个字符串。
         self.storage_class = storage_class
 
+        #: 文件的拥有者，类型为 :class:`Owner` ，可能是None。
+        self.owner = owner
+
+        #: 归档文件的解冻状态，可能是None。
+        self.restore_info = restore_info
+
     def is_prefix(self):
         """如果是公共前缀，返回True；是文件，则返回False"""
         return self.last_modified is None
@@ -276,7 +368,11 @@ class GetObjectAclResult(RequestResult):
 
 class SimplifiedBucketInfo(object):
     """:func:`list_buckets <oss2.Service.list_objects>` 结果中的单个元素类型。"""
-    def __init__(self, name, location, creation_date, extranet_endpoint, intranet_endpoint, storage_class):
+    __slots__ = ('name', 'location', 'creation_date', 'extranet_endpoint', 'intranet_endpoint', 'storage_class',
+                 'region', 'resource_group_id')
+
+    def __init__(self, name, location, creation_date, extranet_endpoint, intranet_endpoint, storage_class,
+                 region=None, resource_group_id=None):
         #: Bucket名
         self.name = name
 
@@ -295,6 +391,12 @@ class SimplifiedBucketInfo(object):
         #: Bucket存储类型，支持“Standard”、“IA”、“Archive”
         self.storage_class = storage_class
 
+        #: Bucket所在的地域，可能是None。
+        self.region = region
+
+        #: Bucket所属的资源组ID，可能是None。
+        self.resource_group_id = resource_group_id
+
 
 class ListBucketsResult(RequestResult):
     def __init__(self, resp):
@@ -311,6 +413,8 @@ class ListBucketsResult(RequestResult):
 
 
 class MultipartUploadInfo(object):
+    __slots__ = ('key', 'upload_id', 'initiation_date')
+
     def __init__(self, key, upload_id, initiation_date):
         #: 文件名
         self.key = key
@@ -420,6 +524,8 @@ class AccessControlList(object):
 
 
 class Owner(object):
+    __slots__ = ('display_name', 'id')
+
     def __init__(self, display_name, owner_id):
         self.display_name = display_name
         self.id = owner_id
@@ -0,0 +1,512 @@
+# -*- coding: utf-8 -*-
+
+"""
+asyncoss.resumable
+~~~~~~~~~~~~~~~~~~
+
+该模块包含了断点续传相关的函数和类。断点信息的持久化沿用 :class:`oss2.ResumableStore` 。
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import random
+import string
+
+from oss2 import defaults, utils
+from oss2.compat import to_string, to_unicode
+from oss2.headers import IF_MATCH
+from oss2.resumable import (ResumableStore, ResumableDownloadStore, determine_part_size,
+                            make_upload_store, make_download_store,
+                            _determine_part_size_internal, _split_to_parts, _PartToProcess)
+
+from asyncoss import exceptions
+from asyncoss.models import PartInfo
+from asyncoss.iterators import PartIterator
+from asyncoss.task_queue import TaskQueue
+from asyncoss.utils import copyfileobj_and_verify
+
+logger = logging.getLogger(__name__)
+
+
+async def resumable_upload(bucket, key, filename,
+                           store=None,
+                           headers=None,
+                           multipart_threshold=None,
+                           part_size=None,
+                           progress_callback=None,
+                           num_threads=None):
+    """断点上传本地文件。
+
+    实现中采用分片上传方式上传本地文件，同时最多有 `num_threads` 个分片在上传，它们共享 `bucket` 的会话（连接池）。
+    已经开始的分片上传会话信息保存在本地磁盘上。如果因为某种原因上传被中断，下次上传同样的文件，即源文件和目标文件路径都
+    一样，会通过 :class:`PartIterator <asyncoss.PartIterator>` 找出已经上传的分片，只上传缺失的分片。
+
+    缺省条件下，该函数会在用户 `HOME` 目录下保存断点续传的信息。当待上传的本地文件没有发生变化，
+    且目标文件名没有变化时，会根据本地保存的信息，从断点开始上传。
+
+    :param bucket: :class:`Bucket <asyncoss.Bucket>` 对象
+    :param key: 上传到用户空间的文件名
+    :param filename: 待上传本地文件名
+    :param store: 用来保存断点信息的持久存储，参见 :class:`ResumableStore` 的接口。如不指定，则使用 `ResumableStore` 。
+
+    :param headers: 传给 `put_object` 或 `init_multipart_upload` 的HTTP头部
+    :type headers: 可以是dict，建议是oss2.CaseInsensitiveDict
+
+    :param multipart_threshold: 文件长度大于该值时，则用分片上传。
+    :param part_size: 指定分片上传的每个分片的大小。如不指定，则自动计算。
+    :param progress_callback: 上传进度回调函数。参见 :ref:`progress_callback` 。
+    :param num_threads: 并发上传的分片数，如不指定则使用 `oss2.defaults.multipart_num_threads` 。
+
+    :return: :class:`PutObjectResult <oss2.models.PutObjectResult>`
+    """
+    size = os.path.getsize(filename)
+    multipart_threshold = defaults.get(multipart_threshold, defaults.multipart_threshold)
+
+    if size >= multipart_threshold:
+        uploader = _ResumableUploader(bucket, key, filename, size, store,
+                                      part_size=part_size,
+                                      headers=headers,
+                                      progress_callback=progress_callback,
+                                      num_threads=num_threads)
+        result = await uploader.upload()
+    else:
+        data = await _read_file(filename, 0, size)
+        result = await bucket.put_object(key, data, headers=headers, progress_callback=progress_callback)
+
+    return result
+
+
+async def resumable_download(bucket, key, filename,
+                             multiget_threshold=None,
+                             part_size=None,
+                             progress_callback=None,
+                             num_threads=None,
+                             store=None):
+    """并发分段下载。
+
+    实现的方法是：
+        #. 通过 `head_object` 获得文件长度和ETag；
+        #. 在本地创建一个临时文件并预分配到文件长度，文件名由原始文件名加上一个随机的后缀组成；
+        #. 通过指定请求的 `Range` 头按照范围并发读取OSS文件，每个请求都带上 `If-Match` 头，确保读到的都是同一个版本，
+           然后写入到临时文件里对应的位置；
+        #. 全部完成之后，把临时文件重命名为目标文件 （即 `filename` ）
+
+    在上述过程中，断点信息，即已经完成的范围，会保存在磁盘上。因为某种原因下载中断，后续如果下载
+    同样的文件，也就是源文件和目标文件一样，就会先读取断点信息，然后只下载缺失的部分。
+
+    使用该函数应注意如下细节：
+        #. 对同样的源文件、目标文件，避免多个程序（协程）同时调用该函数。因为断点信息会在磁盘上互相覆盖，或临时文件名会冲突。
+        #. 避免使用太小的范围（分片），即 `part_size` 不宜过小，建议大于或等于 `oss2.defaults.multiget_part_size` 。
+        #. 如果目标文件已经存在，那么该函数会覆盖此文件。
+
+    :param bucket: :class:`Bucket <asyncoss.Bucket>` 对象
+    :param str key: 待下载的远程文件名。
+    :param str filename: 本地的目标文件名。
+    :param int multiget_threshold: 文件长度大于该值时，则使用并发分段下载。
+    :param int part_size: 指定期望的分片大小，即每个请求获得的字节数，实际的分片大小可能有所不同。
+    :param progress_callback: 下载进度回调函数。参见 :ref:`progress_callback` 。
+    :param num_threads: 并发下载的分片数，如不指定则使用 `oss2.defaults.multiget_num_threads` 。
+
+    :param store: 用来保存断点信息的持久存储，可以指定断点信息所在的目录。
+    :type store: `ResumableDownloadStore`
+
+    :raises: 如果OSS文件不存在，则抛出 :class:`NotFound <asyncoss.exceptions.NotFound>` ；也有可能抛出其他因下载文件而产生的异常。
+    """
+    multiget_threshold = defaults.get(multiget_threshold, defaults.multiget_threshold)
+
+    result = await bucket.head_object(key)
+    if result.content_length >= multiget_threshold:
+        downloader = _ResumableDownloader(bucket, key, filename, _ObjectInfo.make(result),
+                                          part_size=part_size,
+                                          progress_callback=progress_callback,
+                                          num_threads=num_threads,
+                                          store=store)
+        await downloader.download(result.server_crc)
+    else:
+        await bucket.get_object_to_file(key, filename, progress_callback=progress_callback)
+
+
+async def _read_file(filename, offset, size):
+    """在线程池中读取本地文件的一段内容，避免阻塞事件循环。"""
+    def read():
+        with open(to_unicode(filename), 'rb') as f:
+            f.seek(offset, os.SEEK_SET)
+            return f.read(size)
+
+    return await asyncio.get_event_loop().run_in_executor(None, read)
+
+
+class _ResumableOperation(object):
+    def __init__(self, bucket, key, filename, size, store,
+                 progress_callback=None):
+        self.bucket = bucket
+        self.key = to_string(key)
+        self.filename = filename
+        self.size = size
+
+        self._abspath = os.path.abspath(filename)
+
+        self.__store = store
+        self.__record_key = self.__store.make_store_key(bucket.bucket_name, self.key, self._abspath)
+
+        self.__progress_callback = progress_callback
+
+    def _del_record(self):
+        self.__store.delete(self.__record_key)
+
+    def _put_record(self, record):
+        self.__store.put(self.__record_key, record)
+
+    def _get_record(self):
+        return self.__store.get(self.__record_key)
+
+    def _report_progress(self, consumed_size):
+        if self.__progress_callback:
+            self.__progress_callback(consumed_size, self.size)
+
+
+class _ObjectInfo(object):
+    def __init__(self):
+        self.size = None
+        self.etag = None
+        self.mtime = None
+
+    @staticmethod
+    def make(head_object_result):
+        object_info = _ObjectInfo()
+        object_info.size = head_object_result.content_length
+        object_info.etag = head_object_result.etag
+        object_info.mtime = head_object_result.last_modified
+
+        return object_info
+
+
+class _ResumableDownloader(_ResumableOperation):
+    def __init__(self, bucket, key, filename, object_info,
+                 part_size=None,
+                 store=None,
+                 progress_callback=None,
+                 num_threads=None):
+        super(_ResumableDownloader, self).__init__(bucket, key, filename, object_info.size,
+                                                   store or ResumableDownloadStore(),
+                                                   progress_callback=progress_callback)
+        self.object_info = object_info
+        self.__op = 'ResumableDownload'
+        self.__part_size = defaults.get(part_size, defaults.multiget_part_size)
+        self.__part_size = _determine_part_size_internal(self.size, self.__part_size, _MAX_MULTIGET_PART_COUNT)
+
+        self.__tmp_file = None
+        self.__num_threads = defaults.get(num_threads, defaults.multiget_num_threads)
+        self.__finished_parts = None
+        self.__finished_size = None
+
+        self.__record = None
+
+    async def download(self, server_crc=None):
+        self.__load_record()
+
+        parts_to_download = self.__get_parts_to_download()
+        logger.debug('Parts need to download: {0}'.format(parts_to_download))
+
+        await asyncio.get_event_loop().run_in_executor(None, _preallocate_file, self.__tmp_file, self.size)
+
+        q = TaskQueue(functools.partial(self.__producer, parts_to_download=parts_to_download),
+                      [self.__consumer] * self.__num_threads)
+        await q.run()
+
+        if self.bucket.enable_crc:
+            parts = sorted(self.__finished_parts, key=lambda p: p.part_number)
+            object_crc = utils.calc_obj_crc_from_parts(parts)
+            utils.check_crc('resume download', object_crc, server_crc, None)
+
+        utils.force_rename(self.__tmp_file, self.filename)
+
+        self._report_progress(self.size)
+        self._del_record()
+
+    async def __producer(self, q, parts_to_download=None):
+        for part in parts_to_download:
+            await q.put(part)
+
+    async def __consumer(self, q):
+        while True:
+            part = await q.get()
+            if part is None:
+                break
+
+            await self.__download_part(part)
+
+    async def __download_part(self, part):
+        self._report_progress(self.__finished_size)
+
+        headers = {IF_MATCH: '"{0}"'.format(self.object_info.etag)}
+        result = await self.bucket.get_object(self.key, byte_range=(part.start, part.end - 1), headers=headers)
+
+        # 边下载边写入临时文件中对应的位置，不把整个分片读入内存
+        crc = utils.Crc64() if self.bucket.enable_crc else None
+        with open(to_unicode(self.__tmp_file), 'rb+') as f:
+            f.seek(part.start, os.SEEK_SET)
+            await copyfileobj_and_verify(result.resp, f, part.size, request_id=result.request_id, crc=crc)
+
+        part.part_crc = crc.crc if crc is not None else None
+
+        self.__finish_part(part)
+
+    def __load_record(self):
+        record = self._get_record()
+
+        if record and not self.__is_record_sane(record):
+            logger.warning('The content of record is invalid, delete the record')
+            self._del_record()
+            record = None
+
+        if record and not os.path.exists(self.filename + record['tmp_suffix']):
+            logger.warning('Temp file: {0} does not exist, delete the record'.format(
+                self.filename + record['tmp_suffix']))
+            self._del_record()
+            record = None
+
+        if record and self.__is_remote_changed(record):
+            logger.warning('Object: {0} has been overwritten, delete the record and tmp file'.format(self.key))
+            utils.silently_remove(self.filename + record['tmp_suffix'])
+            self._del_record()
+            record = None
+
+        if not record:
+            record = {'op_type': self.__op, 'bucket': self.bucket.bucket_name, 'key': self.key,
+                      'size': self.object_info.size, 'mtime': self.object_info.mtime, 'etag': self.object_info.etag,
+                      'part_size': self.__part_size, 'file_path': self._abspath, 'tmp_suffix': self.__gen_tmp_suffix(),
+                      'parts': []}
+            self._put_record(record)
+
+        self.__tmp_file = self.filename + record['tmp_suffix']
+        self.__part_size = record['part_size']
+        self.__finished_parts = list(
+            _PartToProcess(p['part_number'], p['start'], p['end'], p['part_crc']) for p in record['parts'])
+        self.__finished_size = sum(p.size for p in self.__finished_parts)
+        self.__record = record
+
+    def __get_parts_to_download(self):
+        assert self.__record
+
+        all_set = set(_split_to_parts(self.size, self.__part_size))
+        finished_set = set(self.__finished_parts)
+
+        return sorted(list(all_set - finished_set), key=lambda p: p.part_number)
+
+    def __is_record_sane(self, record):
+        try:
+            if record['op_type'] != self.__op:
+                return False
+
+            for key in ('etag', 'tmp_suffix', 'file_path', 'bucket', 'key'):
+                if not isinstance(record[key], str):
+                    return False
+
+            for key in ('part_size', 'size', 'mtime'):
+                if not isinstance(record[key], int):
+                    return False
+
+            if not isinstance(record['parts'], list):
+                return False
+        except KeyError:
+            return False
+
+        return True
+
+    def __is_remote_changed(self, record):
+        return (record['mtime'] != self.object_info.mtime or
+                record['size'] != self.object_info.size or
+                record['etag'] != self.object_info.etag)
+
+    def __finish_part(self, part):
+        self.__finished_parts.append(part)
+        self.__finished_size += part.size
+
+        self.__record['parts'].append({'part_number': part.part_number,
+                                       'start': part.start,
+                                       'end': part.end,
+                                       'part_crc': part.part_crc})
+        self._put_record(self.__record)
+
+    def __gen_tmp_suffix(self):
+        return '.tmp-' + ''.join(random.choice(string.ascii_lowercase) for i in range(12))
+
+
+_MAX_MULTIGET_PART_COUNT = 100000
+
+
+def _preallocate_file(filename, size):
+    with open(to_unicode(filename), 'ab') as f:
+        if f.tell() < size:
+            f.truncate(size)
+
+
+class _ResumableUploader(_ResumableOperation):
+    """以断点续传方式上传文件。
+
+    :param bucket: :class:`Bucket <asyncoss.Bucket>` 对象
+    :param key: 文件名
+    :param filename: 待上传的文件名
+    :param size: 文件总长度
+    :param store: 用来保存进度的持久化存储
+    :param headers: 传给 `init_multipart_upload` 的HTTP头部
+    :param part_size: 分片大小。优先使用用户提供的值。如果用户没有指定，那么对于新上传，计算出一个合理值；对于老的上传，采用第一个
+        分片的大小。
+    :param progress_callback: 上传进度回调函数。参见 :ref:`progress_callback` 。
+    :param num_threads: 并发上传的分片数
+    """
+
+    def __init__(self, bucket, key, filename, size,
+                 store=None,
+                 headers=None,
+                 part_size=None,
+                 progress_callback=None,
+                 num_threads=None):
+        super(_ResumableUploader, self).__init__(bucket, key, filename, size,
+                                                 store or ResumableStore(),
+                                                 progress_callback=progress_callback)
+
+        self.__op = 'ResumableUpload'
+        self.__headers = headers
+
+        self.__part_size = defaults.get(part_size, defaults.part_size)
+
+        self.__mtime = os.path.getmtime(filename)
+
+        self.__num_threads = defaults.get(num_threads, defaults.multipart_num_threads)
+
+        self.__upload_id = None
+
+        self.__record = None
+        self.__finished_size = 0
+        self.__finished_parts = None
+
+    async def upload(self):
+        await self.__load_record()
+
+        parts_to_upload = self.__get_parts_to_upload(self.__finished_parts)
+        parts_to_upload = sorted(parts_to_upload, key=lambda p: p.part_number)
+        logger.debug('Parts need to upload: {0}'.format(parts_to_upload))
+
+        q = TaskQueue(functools.partial(self.__producer, parts_to_upload=parts_to_upload),
+                      [self.__consumer] * self.__num_threads)
+        await q.run()
+
+        self._report_progress(self.size)
+
+        result = await self.bucket.complete_multipart_upload(self.key, self.__upload_id, self.__finished_parts)
+        self._del_record()
+
+        return result
+
+    async def __producer(self, q, parts_to_upload=None):
+        for part in parts_to_upload:
+            await q.put(part)
+
+    async def __consumer(self, q):
+        while True:
+            part = await q.get()
+            if part is None:
+                break
+
+            await self.__upload_part(part)
+
+    async def __upload_part(self, part):
+        self._report_progress(self.__finished_size)
+
+        data = await _read_file(self.filename, part.start, part.size)
+        result = await self.bucket.upload_part(self.key, self.__upload_id, part.part_number, data)
+
+        self.__finish_part(PartInfo(part.part_number, result.etag, size=part.size, part_crc=result.crc))
+
+    def __finish_part(self, part_info):
+        self.__finished_parts.append(part_info)
+        self.__finished_size += part_info.size
+
+    async def __load_record(self):
+        record = self._get_record()
+
+        if record and not self.__is_record_sane(record):
+            logger.warning('The content of record is invalid, delete the record')
+            self._del_record()
+            record = None
+
+        if record and self.__file_changed(record):
+            logger.warning('File: {0} has been changed, delete the record'.format(self.filename))
+            self._del_record()
+            record = None
+
+        if record and not await self.__upload_exists(record['upload_id']):
+            logger.warning('Multipart upload: {0} does not exist, delete the record'.format(record['upload_id']))
+            self._del_record()
+            record = None
+
+        if not record:
+            part_size = determine_part_size(self.size, self.__part_size)
+            upload_id = (await self.bucket.init_multipart_upload(self.key, headers=self.__headers)).upload_id
+            record = {'op_type': self.__op, 'upload_id': upload_id, 'file_path': self._abspath, 'size': self.size,
+                      'mtime': self.__mtime, 'bucket': self.bucket.bucket_name, 'key': self.key, 'part_size': part_size}
+
+            self._put_record(record)
+
+        self.__record = record
+        self.__part_size = self.__record['part_size']
+        self.__upload_id = self.__record['upload_id']
+        self.__finished_parts = await self.__get_finished_parts()
+        self.__finished_size = sum(p.size for p in self.__finished_parts)
+
+    async def __get_finished_parts(self):
+        parts = []
+
+        async for part in PartIterator(self.bucket, self.key, self.__upload_id):
+            parts.append(part)
+
+        return parts
+
+    async def __upload_exists(self, upload_id):
+        try:
+            async for part in PartIterator(self.bucket, self.key, upload_id, '0', max_parts=1):
+                break
+        except exceptions.NoSuchUpload:
+            return False
+        else:
+            return True
+
+    def __file_changed(self, record):
+        return record['mtime'] != self.__mtime or record['size'] != self.size
+
+    def __get_parts_to_upload(self, parts_uploaded):
+        all_parts = _split_to_parts(self.size, self.__part_size)
+        if not parts_uploaded:
+            return all_parts
+
+        all_parts_map = dict((p.part_number, p) for p in all_parts)
+
+        for uploaded in parts_uploaded:
+            if uploaded.part_number in all_parts_map:
+                del all_parts_map[uploaded.part_number]
+
+        return all_parts_map.values()
+
+    def __is_record_sane(self, record):
+        try:
+            if record['op_type'] != self.__op:
+                return False
+
+            for key in ('upload_id', 'file_path', 'bucket', 'key'):
+                if not isinstance(record[key], str):
+                    return False
+
+            for key in ('size', 'part_size'):
+                if not isinstance(record[key], int):
+                    return False
+
+            if not isinstance(record['mtime'], (int, float)):
+                return False
+        except KeyError:
+            return False
+
+        return True
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+"""
+asyncoss.retry
+~~~~~~~~~~~~~~
+
+请求失败后的重试策略。
+
+只有幂等的请求才会被重试，且只在网络错误（连接被重置、超时等）或服务端返回5xx时重试。两次尝试之间按指数退避等待一个
+随机时间（full jitter），避免大量客户端同时重试；另有重试预算限制重试在全部请求中的比例，服务端过载时不会因为重试而
+雪上加霜。
+"""
+
+import random
+
+from oss2 import defaults
+
+from asyncoss import exceptions
+
+
+#: 可以安全重试的HTTP方法。POST（如追加上传、完成分片上传）重试可能产生不同的结果，不重试
+_IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'])
+
+
+class RetryPolicy(object):
+    """`Service` 、 `Bucket` 发送请求时使用的重试策略。
+
+    重试预算是一个令牌桶：每个请求向桶中加入 `budget_ratio` 个令牌，每次重试消耗一个，桶中最多有 `budget_burst` 个令牌。
+    因此长期来看重试数不超过请求数的 `budget_ratio` 倍。多个 `Bucket` 共享同一个 `RetryPolicy` 对象时，也共享重试预算。
+
+    用法 ::
+
+        >>> policy = RetryPolicy(max_retries=5, base_delay=0.2)
+        >>> bucket = Bucket(auth, endpoint, 'my-bucket', retry_policy=policy)
+
+    :param int max_retries: 单个请求最多重试的次数，不包括第一次尝试。为None表示使用 `oss2.defaults.request_retries` ，0表示不重试
+    :param float base_delay: 第一次重试前最多等待的秒数，之后每次翻倍
+    :param float max_delay: 两次尝试之间最多等待的秒数
+    :param float budget_ratio: 每个请求为重试预算增加的令牌数
+    :param float budget_burst: 重试预算的上限，也是初始值
+    """
+    def __init__(self, max_retries=None, base_delay=0.1, max_delay=10.0, budget_ratio=0.1, budget_burst=10):
+        self.max_retries = defaults.get(max_retries, defaults.request_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget_ratio = budget_ratio
+        self.budget_burst = budget_burst
+
+        #: 重试的次数
+        self.retries = 0
+
+        #: 因为重试预算耗尽而放弃重试的次数
+        self.budget_exhausted = 0
+
+        self.__tokens = float(budget_burst)
+
+    @property
+    def budget(self):
+        """当前剩余的重试预算。"""
+        return self.__tokens
+
+    def on_request(self):
+        """发送一个新请求（不包括重试）前调用，为重试预算增加令牌。"""
+        self.__tokens = min(self.budget_burst, self.__tokens + self.budget_ratio)
+
+    def should_retry(self, method, error, attempt):
+        """判断第 `attempt` 次尝试（从0开始）失败后是否重试。返回True时会消耗一个令牌。
+
+        :param str method: HTTP方法
+        :param error: 本次尝试抛出的异常
+        :param int attempt: 已经失败的尝试次数减一
+        """
+        if attempt >= self.max_retries or method.upper() not in _IDEMPOTENT_METHODS:
+            return False
+
+        if not is_retryable_error(error):
+            return False
+
+        if self.__tokens < 1:
+            self.budget_exhausted += 1
+            return False
+
+        self.__tokens -= 1
+        self.retries += 1
+        return True
+
+    def delay(self, attempt):
+        """第 `attempt` 次尝试（从0开始）失败后，重试前等待的秒数。"""
+        return backoff_delay(attempt, self.base_delay, self.max_delay)
+
+
+def is_retryable_error(error):
+    """网络错误、服务端5xx错误（501除外）可以重试。"""
+    if isinstance(error, exceptions.RequestError):
+        return True
+
+    if isinstance(error, exceptions.ServerError):
+        return error.status // 100 == 5 and error.status != 501
+
+    return False
+
+
+def backoff_delay(attempt, base_delay=0.1, max_delay=10.0):
+    """带随机抖动的指数退避：在 [0, min(max_delay, base_delay * 2 ** attempt)] 中均匀取值。"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+"""
+asyncoss.shaping
+~~~~~~~~~~~~~~~~
+
+用令牌桶限制请求速率和上传、下载带宽。
+"""
+
+import asyncio
+import time
+
+from asyncoss.http import _AsyncReadAdapter, _READ_CHUNK_SIZE
+
+
+class TokenBucket(object):
+    """令牌桶。令牌以每秒 `rate` 个的速度生成，最多积累 `burst` 个。
+
+    取令牌时允许透支：先扣除令牌，余额为负时等待到余额回到0。因此一次可以取多于 `burst` 个令牌，多个协程同时取令牌时，
+    总体速度仍然不超过 `rate` 。
+
+    :param float rate: 每秒生成的令牌数
+    :param float burst: 最多积累的令牌数，也是初始的令牌数。为None表示等于 `rate` ，即最多积累一秒的令牌
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = rate if burst is None else burst
+
+        self.__tokens = float(self.burst)
+        self.__updated = time.monotonic()
+
+    async def consume(self, n):
+        """取 `n` 个令牌，令牌不足时等待。"""
+        now = time.monotonic()
+        self.__tokens = min(self.burst, self.__tokens + (now - self.__updated) * self.rate)
+        self.__updated = now
+
+        self.__tokens -= n
+        if self.__tokens < 0:
+            await asyncio.sleep(-self.__tokens / self.rate)
+
+
+class TrafficShaper(object):
+    """限制请求速率和上传、下载带宽。
+
+    上传时请求体按块发送，每块发送前取令牌；下载时每读到一块数据后取令牌，读得太快时暂停读取，由TCP流控让服务端放慢发送。
+    数据块原样传递，不会被复制。同一个 `TrafficShaper` 可以被多个 `Bucket` 、 `Session` 共享，它们共用同一个上限。
+
+    用法 ::
+
+        >>> # 把后台任务限制在约600Mbps、每秒200个请求
+        >>> shaper = TrafficShaper(bytes_per_second=75 * 1024 * 1024, requests_per_second=200)
+        >>> bucket = Bucket(auth, endpoint, 'my-bucket', traffic_shaper=shaper)
+
+    :param int bytes_per_second: 上传、下载合计的字节速率上限。为None表示不限制
+    :param float requests_per_second: 请求速率上限，重试也计算在内。为None表示不限制
+    :param int burst_bytes: 最多可以突发的字节数，为None表示一秒的量
+    :param float burst_requests: 最多可以突发的请求数，为None表示一秒的量
+    """
+    def __init__(self, bytes_per_second=None, requests_per_second=None, burst_bytes=None, burst_requests=None):
+        self.bytes = None if bytes_per_second is None else TokenBucket(bytes_per_second, burst_bytes)
+        self.requests = None if requests_per_second is None else TokenBucket(requests_per_second, burst_requests)
+
+    async def acquire_request(self):
+        """发送请求前调用，请求速率超限时等待。"""
+        if self.requests is not None:
+            await self.requests.consume(1)
+
+    def wrap_body(self, data):
+        """返回限速后的请求体。
+
+        :param data: :func:`_convert_request_body <asyncoss.http._convert_request_body>` 转换后的请求体
+        """
+        if self.bytes is None or data is None:
+            return data
+
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            return _ShapedBody(self.__iter_buffer(memoryview(data)), len(data))
+
+        if isinstance(data, _AsyncReadAdapter):
+            return _ShapedBody(self.__iter_async(data), data.len)
+
+        return data
+
+    def wrap_response(self, response):
+        """返回限速后的aiohttp响应对象。"""
+        if self.bytes is None:
+            return response
+
+        return _ShapedClientResponse(response, self.bytes)
+
+    async def __iter_buffer(self, view):
+        for offset in range(0, len(view), _READ_CHUNK_SIZE):
+            chunk = view[offset:offset + _READ_CHUNK_SIZE]
+            await self.bytes.consume(len(chunk))
+            yield chunk
+
+    async def __iter_async(self, data):
+        async for chunk in data:
+            await self.bytes.consume(len(chunk))
+            yield chunk
+
+
+class _ShapedBody(object):
+    def __init__(self, chunks, size):
+        self.len = size
+        self.__chunks = chunks
+
+    def __aiter__(self):
+        return self.__chunks
+
+
+class _ShapedClientResponse(object):
+    """只替换了 `content` 的aiohttp响应对象。"""
+    def __init__(self, response, bucket):
+        self.__response = response
+        self.content = _ShapedStreamReader(response.content, bucket)
+
+    def __getattr__(self, name):
+        return getattr(self.__response, name)
+
+
+class _ShapedStreamReader(object):
+    """限速的 `aiohttp.StreamReader` ，每读到一块数据后从令牌桶中取相应数目的令牌。"""
+    def __init__(self, content, bucket):
+        self.__content = content
+        self.__bucket = bucket
+
+    async def read(self, n=-1):
+        return await self.__consumed(await self.__content.read(n))
+
+    async def readany(self):
+        return await self.__consumed(await self.__content.readany())
+
+    async def readexactly(self, n):
+        return await self.__consumed(await self.__content.readexactly(n))
+
+    async def iter_chunked(self, n):
+        async for chunk in self.__content.iter_chunked(n):
+            yield await self.__consumed(chunk)
+
+    async def iter_any(self):
+        async for chunk in self.__content.iter_any():
+            yield await self.__consumed(chunk)
+
+    async def iter_chunks(self):
+        async for chunk, end_of_http_chunk in self.__content.iter_chunks():
+            yield await self.__consumed(chunk), end_of_http_chunk
+
+    def __aiter__(self):
+        return self.__iter_lines()
+
+    def __getattr__(self, name):
+        return getattr(self.__content, name)
+
+    async def __iter_lines(self):
+        async for line in self.__content:
+            yield await self.__consumed(line)
+
+    async def __consumed(self, chunk):
+        await self.__bucket.consume(len(chunk))
+        return chunk
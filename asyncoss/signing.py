@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+"""
+asyncoss.signing
+~~~~~~~~~~~~~~~~
+
+批量生成签名URL。
+"""
+
+import base64
+import functools
+import hashlib
+import hmac
+import re
+import time
+
+from oss2.auth import ProviderAuth
+from oss2.compat import to_bytes, urlquote
+
+from asyncoss import http
+
+
+# 签名版本1、2的URL中的过期时间（Unix时间戳）；签名版本4的x-oss-expires是相对x-oss-date的秒数，不在此列
+_EXPIRES_PATTERN = re.compile(r'[?&](?:Expires|x-oss-expires)=([0-9]+)(?:&|$)')
+
+
+def get_credentials(auth):
+    """返回 `auth` 当前使用的凭证（ :class:`Credentials <oss2.credentials.Credentials>` ），没有凭证时返回None。"""
+    provider = getattr(auth, 'credentials_provider', None)
+    if provider is None:
+        return None
+
+    return provider.get_credentials()
+
+
+def make_url_signer(auth, make_url, bucket_name, expiration, slash_safe=False, credentials=None):
+    """返回为GET请求生成签名URL的函数 `sign(key)` ，生成的URL都在 `expiration` 时过期。
+
+    对于签名版本1（ :class:`Auth <oss2.Auth>` ），待签名字符串中除文件名外的部分对所有文件都相同，这部分先用HMAC处理，
+    每个文件只需复制HMAC的中间状态、再处理文件名；其他签名方式逐个调用 `auth._sign_url` 。
+
+    :param auth: `Bucket` 的 `auth`
+    :param make_url: `Bucket` 的 `_make_url`
+    :param str bucket_name: Bucket名
+    :param int expiration: 过期时间，为Unix时间戳
+    :param bool slash_safe: 是否不转义文件名中的'/'
+    :param credentials: 签名版本1使用的凭证，为None表示从 `auth` 获取
+    """
+    if not isinstance(auth, ProviderAuth):
+        return functools.partial(_sign_url, auth, make_url, bucket_name, expiration, slash_safe)
+
+    if credentials is None:
+        credentials = auth.credentials_provider.get_credentials()
+    token = credentials.get_security_token()
+
+    expiration = str(expiration)
+    mac = hmac.new(to_bytes(credentials.get_access_key_secret()),
+                   to_bytes('GET\n\n\n{0}\n/{1}/'.format(expiration, bucket_name)),
+                   hashlib.sha1)
+
+    resource_suffix = to_bytes('?security-token=' + token) if token else b''
+
+    query = 'OSSAccessKeyId={0}&Expires={1}&Signature='.format(
+        urlquote(credentials.get_access_key_id(), ''), expiration)
+    if token:
+        query = 'security-token={0}&{1}'.format(urlquote(token, ''), query)
+
+    def sign(key):
+        h = mac.copy()
+        h.update(key.encode('utf-8') + resource_suffix)
+
+        signature = base64.b64encode(h.digest()).decode('ascii')
+        return make_url(bucket_name, key, slash_safe) + '?' + query + urlquote(signature, '')
+
+    return sign
+
+
+def _sign_url(auth, make_url, bucket_name, expiration, slash_safe, key):
+    # `auth._sign_url` 在当前时间上加上 `expires` ，两次读取时间之间时钟可能跨过一秒，此时过期时间不是 `expiration` ，重新签名
+    while True:
+        req = http.Request('GET', make_url(bucket_name, key, slash_safe))
+        url = auth._sign_url(req, bucket_name, key, expiration - int(time.time()))
+
+        if 'x-oss-date=' in url:
+            return url
+
+        m = _EXPIRES_PATTERN.search(url)
+        if m is None or int(m.group(1)) == expiration:
+            return url
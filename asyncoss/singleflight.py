@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+
+"""
+asyncoss.singleflight
+~~~~~~~~~~~~~~~~~~~~~
+
+合并同时发出的相同请求。
+"""
+
+import asyncio
+import collections
+import weakref
+
+from asyncoss import http
+from asyncoss.http import _LocalResponse, _CHUNK_SIZE
+
+
+#: `get_object` 默认可以共享的响应体的最大字节数
+_MAX_BODY_SIZE = 4 * 1024 * 1024
+
+
+class SingleFlight(object):
+    """合并同时发出的相同只读请求：第一个调用者发出请求，在它完成之前到来的相同调用都等待并共享同一个结果（或异常）。
+
+    供 :class:`Bucket <asyncoss.Bucket>` 的 `get_object` 、 `head_object` 、 `get_object_meta` 、 `get_object_acl` 、
+    `get_symlink` 使用，只合并不带额外HTTP头部、进度回调等参数的调用。同一个 `Bucket` 对象修改文件之后发出的调用，
+    不会与修改之前发出、尚未完成的请求合并。
+
+    对于 `get_object` ，只有确实有多个调用者在等待、且响应体不超过 `max_body_size` 字节时才共享响应体：响应体只从网络读取一次，
+    每个调用者独立地从头读取，所有调用者都读过的数据块随即被丢弃。只有一个调用者时直接返回原始响应；响应体较大或长度未知时，
+    其他调用者各自重新发出请求，以免为了共享而把大文件缓存在内存中。
+
+    用法 ::
+
+        >>> bucket = Bucket(auth, endpoint, bucket_name, single_flight=SingleFlight())
+        >>> results = await asyncio.gather(*[bucket.head_object('hot.txt') for i in range(50)])
+        >>> print(bucket.single_flight.shared)
+        49
+
+    :param int max_body_size: `get_object` 可以共享的响应体的最大字节数
+    """
+    def __init__(self, max_body_size=_MAX_BODY_SIZE):
+        self.max_body_size = max_body_size
+
+        #: 实际发出的请求数
+        self.calls = 0
+
+        #: 共享了其他调用者请求结果的调用数
+        self.shared = 0
+
+        self.__flights = {}
+
+    async def do(self, name, func):
+        """以 `name` 为键执行 `func()` ，同一时刻同名的调用只执行一次。
+
+        发起调用的协程被取消时，请求仍会继续，以免影响其他等待者。
+
+        :param name: 可哈希的键，相同的调用应有相同的键
+        :param func: 无参数的协程函数
+        """
+        flight, _ = self.__join(name, func)
+        try:
+            return await asyncio.shield(flight.future)
+        except asyncio.CancelledError:
+            flight.leave()
+            raise
+
+    async def do_body(self, name, func):
+        """与 :func:`do` 相同，但 `func()` 返回的是 :class:`Response <asyncoss.http.Response>` 等带响应体的对象，
+        每个调用者得到各自可以从头读取的响应。
+
+        :param name: 可哈希的键，相同的调用应有相同的键
+        :param func: 无参数的协程函数
+        """
+        flight, leader = self.__join(name, func)
+        try:
+            resp = await asyncio.shield(flight.future)
+        except asyncio.CancelledError:
+            flight.leave()
+            raise
+
+        if flight.body is not None:
+            return flight.body.reader()
+
+        if leader:
+            return resp
+
+        # 响应体太大，不共享
+        self.shared -= 1
+        self.calls += 1
+        return await func()
+
+    def __join(self, name, func):
+        flight = self.__flights.get(name)
+        leader = flight is None
+        if leader:
+            flight = _Flight(asyncio.ensure_future(func()))
+            self.__flights[name] = flight
+            flight.future.add_done_callback(lambda f: self.__land(name, flight))
+            self.calls += 1
+        else:
+            self.shared += 1
+
+        flight.waiting += 1
+        return flight, leader
+
+    def __land(self, name, flight):
+        if self.__flights.get(name) is flight:
+            del self.__flights[name]
+
+        future = flight.future
+        if future.cancelled():
+            return
+
+        # 所有等待者都被取消时，避免asyncio报告异常没有被获取
+        if future.exception() is not None:
+            return
+
+        # 此时等待者都还没有恢复执行，waiting就是将要读取响应体的调用者数
+        resp = future.result()
+        if flight.waiting > 1 and isinstance(resp, (http.Response, http._LocalResponse)):
+            size = _body_size(resp)
+            if size is not None and size <= self.max_body_size:
+                flight.body = SharedBody(resp, flight.waiting)
+
+
+class _Flight(object):
+    __slots__ = ('future', 'waiting', 'body')
+
+    def __init__(self, future):
+        self.future = future
+        self.waiting = 0
+        self.body = None
+
+    def leave(self):
+        """调用者被取消时调用。"""
+        if not self.future.done():
+            self.waiting -= 1
+        elif self.body is not None:
+            # 结果已经分配了该调用者的读者，释放它，以免其他读者读过的数据块无法丢弃
+            self.body.reader().release()
+
+
+def _body_size(resp):
+    if resp.headers.get('Content-Encoding', 'identity') != 'identity':
+        return None
+
+    length = resp.headers.get('Content-Length')
+    return int(length) if length is not None else None
+
+
+class SharedBody(object):
+    """把一个响应体共享给固定数目的读者。
+
+    响应体只在有读者需要更多数据时才从网络读取，读得快的读者不会让数据无限堆积；每个数据块在所有读者都读过之后被丢弃。
+    读者读完、调用 `release()` 或者被回收后不再参与计算；所有读者都不再读取而响应体还没有读完时，关闭响应。
+
+    :param resp: :class:`Response <asyncoss.http.Response>` 等支持 `read` 的对象
+    :param int readers: 读者数
+    """
+    def __init__(self, resp, readers):
+        self.resp = resp
+
+        self.done = False
+        self.error = None
+
+        self.__chunks = collections.deque()
+        self.__first = 0
+        self.__fetching = False
+        self.__changed = asyncio.Event()
+
+        # 已被取走的读者只保留弱引用，读者被释放时自动不再参与计算
+        self.__unclaimed = [_SharedBodyReader(self) for i in range(readers)]
+        self.__readers = weakref.WeakSet(self.__unclaimed)
+
+    def reader(self):
+        """取一个读者，从头读取响应体，接口与 :class:`Response <asyncoss.http.Response>` 相同。每个读者只能取一次。"""
+        return self.__unclaimed.pop()
+
+    async def chunk(self, index):
+        """返回第 `index` 个数据块，没有更多数据时返回None。"""
+        while True:
+            offset = index - self.__first
+            if offset < len(self.__chunks):
+                return self.__chunks[offset]
+
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return None
+
+            if self.__fetching:
+                await self.__changed.wait()
+                continue
+
+            self.__fetching = True
+            try:
+                chunk = await self.resp.read(_CHUNK_SIZE)
+                if chunk:
+                    self.__chunks.append(chunk)
+                else:
+                    self.done = True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.error = e
+                self.done = True
+            finally:
+                self.__fetching = False
+                self.__notify()
+
+    def trim(self):
+        """丢弃所有读者都已经读过的数据块。"""
+        active = [r.index for r in self.__readers if not r.released]
+        lowest = min(active) if active else self.__first + len(self.__chunks)
+
+        while self.__first < lowest and self.__chunks:
+            self.__chunks.popleft()
+            self.__first += 1
+
+        if not active and not self.done:
+            # 没有读者了，剩下的响应体不会再被读取，关闭连接而不是让它一直占着
+            self.done = True
+            self.resp.response.close()
+
+    def __notify(self):
+        self.__changed.set()
+        self.__changed = asyncio.Event()
+
+
+class _SharedBodyReader(_LocalResponse):
+    def __init__(self, body):
+        super(_SharedBodyReader, self).__init__(body.resp.status, body.resp.headers, body.resp.request_id)
+
+        #: 正在读取的数据块的序号
+        self.index = 0
+
+        #: 是否已经不再读取
+        self.released = False
+
+        self.__body = body
+        self.__offset = 0
+
+    async def read(self, amt=None):
+        if amt is None:
+            parts = []
+            while True:
+                chunk = await self.read(_CHUNK_SIZE)
+                if not chunk:
+                    return b''.join(parts)
+                parts.append(chunk)
+
+        if self.released:
+            return b''
+
+        chunk = await self.__body.chunk(self.index)
+        if chunk is None:
+            self.release()
+            return b''
+
+        if self.__offset == 0 and len(chunk) <= amt:
+            self.__advance()
+            return chunk
+
+        piece = chunk[self.__offset:self.__offset + amt]
+        self.__offset += len(piece)
+        if self.__offset >= len(chunk):
+            self.__advance()
+        return piece
+
+    def release(self):
+        """不再读取响应体，已读到的数据块不再为本读者保留。"""
+        if not self.released:
+            self.released = True
+            self.__body.trim()
+
+    def close(self):
+        self.release()
+
+    def __advance(self):
+        self.index += 1
+        self.__offset = 0
+        self.__body.trim()
+
+    def __del__(self):
+        self.release()
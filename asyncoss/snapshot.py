@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+
+"""
+asyncoss.snapshot
+~~~~~~~~~~~~~~~~~
+
+把罗列结果保存为本地快照文件，并把新的罗列结果与快照比较，找出新增、删除和修改的文件。
+
+快照文件中的记录按文件名（UTF-8字节序，与OSS罗列的顺序相同）有序保存，末尾带有稀疏索引。比较时对两个有序序列做归并，
+新的罗列结果和快照都是边读边比较的，内存占用与文件数无关。
+
+用法 ::
+
+    >>> await take_snapshot(ObjectIterator(bucket, prefix='data/', max_keys=1000), 'data.snap')
+    >>> # 第二天
+    >>> async for change in diff_snapshot('data.snap', ObjectIterator(bucket, prefix='data/', max_keys=1000),
+    >>>                                   new_snapshot='data.snap.new'):
+    >>>     print(change.type, change.key)
+"""
+
+import asyncio
+import json
+import os
+import struct
+
+from asyncoss.models import SimplifiedObjectInfo
+
+
+_MAGIC = b'AOSSSNP1'
+
+# 每条记录的头部：文件名长度、ETag长度、文件大小、最后修改时间
+_RECORD_HEADER = struct.Struct('<HBqq')
+
+# 文件末尾：索引的偏移、记录数、_MAGIC
+_FOOTER = struct.Struct('<QQ8s')
+
+#: 每隔多少条记录在索引中记录一次文件名和偏移
+_INDEX_INTERVAL = 1024
+
+#: 在线程池中每次读写的记录数
+_BATCH_SIZE = 1000
+
+CHANGE_ADDED = 'added'
+CHANGE_REMOVED = 'removed'
+CHANGE_MODIFIED = 'modified'
+
+
+class ObjectChange(object):
+    """:func:`diff_snapshot` 返回的单个变化。
+
+    :param str type: 变化类型，可以是 `CHANGE_ADDED` 、 `CHANGE_REMOVED` 、 `CHANGE_MODIFIED`
+    :param str key: 文件名
+    :param old: 快照中的文件，类型为 :class:`SimplifiedObjectInfo <asyncoss.models.SimplifiedObjectInfo>` ，新增的文件为None
+    :param new: 新罗列得到的文件，删除的文件为None
+    """
+    __slots__ = ('type', 'key', 'old', 'new')
+
+    def __init__(self, type, key, old, new):
+        self.type = type
+        self.key = key
+        self.old = old
+        self.new = new
+
+
+class SnapshotWriter(object):
+    """把有序的文件列表写入快照文件。该类的方法会阻塞，在事件循环中应通过 `run_in_executor` 调用。
+
+    先写入 `filename` 加上 '.tmp' 后缀的临时文件， :func:`close` 时才替换 `filename` ，写入失败时原有的快照不受影响。
+
+    :param str filename: 快照文件名
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.count = 0
+
+        self.__tmp_filename = filename + '.tmp'
+        self.__file = open(self.__tmp_filename, 'wb')
+        self.__file.write(_MAGIC)
+        self.__index = []
+        self.__last_key = None
+
+    def write(self, objs):
+        """追加多个文件。公共前缀会被忽略。
+
+        :param objs: :class:`SimplifiedObjectInfo <asyncoss.models.SimplifiedObjectInfo>` 列表，必须按文件名有序
+
+        :raises: 如果文件名无序，抛出ValueError
+        """
+        for obj in objs:
+            if obj.is_prefix():
+                continue
+
+            key = obj.key.encode('utf-8')
+            if self.__last_key is not None and key <= self.__last_key:
+                raise ValueError('snapshot entries must be sorted by key: {0!r} after {1!r}'.format(
+                    obj.key, self.__last_key.decode('utf-8')))
+            self.__last_key = key
+
+            if self.count % _INDEX_INTERVAL == 0:
+                self.__index.append((obj.key, self.__file.tell()))
+
+            etag = (obj.etag or '').encode('utf-8')
+            self.__file.write(_RECORD_HEADER.pack(len(key), len(etag), obj.size, obj.last_modified))
+            self.__file.write(key)
+            self.__file.write(etag)
+            self.count += 1
+
+    def close(self):
+        """写入索引，关闭文件并替换 `filename` 。"""
+        index_offset = self.__file.tell()
+        self.__file.write(json.dumps(self.__index).encode('utf-8'))
+        self.__file.write(_FOOTER.pack(index_offset, self.count, _MAGIC))
+        self.__file.close()
+
+        os.replace(self.__tmp_filename, self.filename)
+
+    def abort(self):
+        """关闭并删除临时文件， `filename` 保持不变。"""
+        self.__file.close()
+
+        try:
+            os.remove(self.__tmp_filename)
+        except FileNotFoundError:
+            pass
+
+
+class SnapshotReader(object):
+    """按文件名顺序读取快照文件。该类的方法会阻塞，在事件循环中应通过 `run_in_executor` 调用。
+
+    :param str filename: 快照文件名
+
+    :raises: 如果不是完整的快照文件，抛出ValueError
+    """
+    def __init__(self, filename):
+        self.filename = filename
+
+        self.__file = open(filename, 'rb')
+        try:
+            if self.__file.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError('{0} is not a snapshot file'.format(filename))
+
+            footer_offset = self.__file.seek(-_FOOTER.size, 2)
+            self.__end, self.count, magic = _FOOTER.unpack(self.__file.read(_FOOTER.size))
+            if magic != _MAGIC:
+                raise ValueError('{0} is an incomplete snapshot file'.format(filename))
+
+            self.__file.seek(self.__end)
+            self.__index = json.loads(self.__file.read(footer_offset - self.__end).decode('utf-8'))
+        except Exception:
+            self.__file.close()
+            raise
+
+        self.__file.seek(len(_MAGIC))
+
+    def seek(self, key):
+        """定位到第一个文件名不小于 `key` 的记录之前，之后的 :func:`read` 从该记录开始读。"""
+        key = key.encode('utf-8')
+        offset = len(_MAGIC)
+        for k, o in self.__index:
+            if k.encode('utf-8') > key:
+                break
+            offset = o
+
+        self.__file.seek(offset)
+        while True:
+            pos = self.__file.tell()
+            objs = self.read(1)
+            if not objs or objs[0].key.encode('utf-8') >= key:
+                self.__file.seek(pos)
+                return
+
+    def read(self, n=_BATCH_SIZE):
+        """读取最多 `n` 条记录，返回 :class:`SimplifiedObjectInfo <asyncoss.models.SimplifiedObjectInfo>` 列表，读完后返回空列表。"""
+        objs = []
+        f = self.__file
+
+        while len(objs) < n and f.tell() < self.__end:
+            key_len, etag_len, size, mtime = _RECORD_HEADER.unpack(f.read(_RECORD_HEADER.size))
+            key = f.read(key_len).decode('utf-8')
+            etag = f.read(etag_len).decode('utf-8')
+            objs.append(SimplifiedObjectInfo(key, mtime, etag, None, size, None))
+
+        return objs
+
+    def close(self):
+        self.__file.close()
+
+
+async def take_snapshot(iterator, filename):
+    """把罗列结果保存为快照文件。
+
+    :param iterator: 按文件名有序返回 `SimplifiedObjectInfo` 的异步迭代器，如 :class:`ObjectIterator <asyncoss.ObjectIterator>` 、
+        `ordered` 为True的 :class:`ShardedObjectIterator <asyncoss.ShardedObjectIterator>`
+    :param str filename: 快照文件名
+
+    :return: 保存的文件数
+    """
+    loop = asyncio.get_event_loop()
+    writer = await loop.run_in_executor(None, SnapshotWriter, filename)
+
+    try:
+        async for page in _iter_pages(iterator):
+            await loop.run_in_executor(None, writer.write, page)
+    except BaseException:
+        await loop.run_in_executor(None, writer.abort)
+        raise
+
+    await loop.run_in_executor(None, writer.close)
+    return writer.count
+
+
+async def diff_snapshot(filename, iterator, prefix='', new_snapshot=None):
+    """比较快照和新的罗列结果，按文件名顺序返回变化的文件。
+
+    大小、ETag、最后修改时间任一不同即认为文件被修改了。
+
+    :param str filename: 之前用 :func:`take_snapshot` 保存的快照文件名
+    :param iterator: 按文件名有序返回 `SimplifiedObjectInfo` 的异步迭代器，罗列范围应与快照相同
+    :param str prefix: 只比较快照中以 `prefix` 开头的文件，应与 `iterator` 罗列的前缀一致
+    :param str new_snapshot: 不为None时，同时把新的罗列结果保存为该快照文件，供下次比较使用
+
+    :return: 异步生成器，每次返回 :class:`ObjectChange`
+    :raises: 如果 `iterator` 返回的文件名无序，或者 `new_snapshot` 与 `filename` 是同一个文件，抛出ValueError
+    """
+    if new_snapshot is not None and os.path.realpath(new_snapshot) == os.path.realpath(filename):
+        raise ValueError('new_snapshot must differ from the snapshot being diffed: {0!r}'.format(filename))
+
+    loop = asyncio.get_event_loop()
+    reader = await loop.run_in_executor(None, SnapshotReader, filename)
+    writer = None
+
+    try:
+        if new_snapshot is not None:
+            writer = await loop.run_in_executor(None, SnapshotWriter, new_snapshot)
+
+        if prefix:
+            await loop.run_in_executor(None, reader.seek, prefix)
+
+        old_entries = _iter_snapshot(reader, prefix)
+        old = await _anext(old_entries)
+        last_key = None
+
+        async for page in _iter_pages(iterator):
+            if writer is not None:
+                await loop.run_in_executor(None, writer.write, page)
+
+            for new in page:
+                if new.is_prefix():
+                    continue
+
+                key = new.key.encode('utf-8')
+                if last_key is not None and key <= last_key:
+                    raise ValueError('listing is not sorted by key: {0!r}'.format(new.key))
+                last_key = key
+
+                while old is not None and old.key.encode('utf-8') < key:
+                    yield ObjectChange(CHANGE_REMOVED, old.key, old, None)
+                    old = await _anext(old_entries)
+
+                if old is not None and old.key == new.key:
+                    if (old.size, old.etag, old.last_modified) != (new.size, new.etag, new.last_modified):
+                        yield ObjectChange(CHANGE_MODIFIED, new.key, old, new)
+                    old = await _anext(old_entries)
+                else:
+                    yield ObjectChange(CHANGE_ADDED, new.key, None, new)
+
+        while old is not None:
+            yield ObjectChange(CHANGE_REMOVED, old.key, old, None)
+            old = await _anext(old_entries)
+    except BaseException:
+        if writer is not None:
+            await loop.run_in_executor(None, writer.abort)
+            writer = None
+        raise
+    finally:
+        if writer is not None:
+            await loop.run_in_executor(None, writer.close)
+        reader.close()
+
+
+async def _iter_pages(iterator):
+    if hasattr(iterator, 'pages'):
+        async for page in iterator.pages():
+            yield page
+    else:
+        page = []
+        async for obj in iterator:
+            page.append(obj)
+            if len(page) >= _BATCH_SIZE:
+                yield page
+                page = []
+        if page:
+            yield page
+
+
+async def _iter_snapshot(reader, prefix):
+    loop = asyncio.get_event_loop()
+
+    while True:
+        objs = await loop.run_in_executor(None, reader.read)
+        if not objs:
+            return
+
+        for obj in objs:
+            if not obj.key.startswith(prefix):
+                return
+            yield obj
+
+
+async def _anext(agen):
+    try:
+        return await agen.__anext__()
+    except StopAsyncIteration:
+        return None
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+
+"""
+asyncoss.sync
+~~~~~~~~~~~~~
+
+本地目录与OSS前缀之间的同步。
+
+先遍历本地目录，再边罗列OSS上的文件边与本地文件比较，只传输不同的文件：
+
+    #. 大小不同，认为不同；
+    #. 大小相同，且OSS上的文件是普通上传的（ETag就是内容的MD5），比较本地文件的MD5与ETag；
+    #. 否则（分片上传、追加上传的文件），比较本地文件的CRC64与 `head_object` 得到的 `server_crc` 。
+
+比较和传输由 `num_threads` 个协程并发进行；计算MD5、CRC64等读文件的操作在线程池中进行，不阻塞事件循环。
+单个文件比较、传输或删除失败时不会中断整个同步，该文件名记入结果的 `failed_keys` ，异常记入 `errors` 。
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+
+from oss2 import defaults, utils
+
+from asyncoss import models
+from asyncoss.iterators import ObjectIterator
+from asyncoss.resumable import resumable_upload, resumable_download
+from asyncoss.task_queue import TaskQueue
+
+logger = logging.getLogger(__name__)
+
+
+#: 默认同时比较、传输的文件数
+_SYNC_NUM_THREADS = 8
+
+#: 计算MD5、CRC64时，每次读取的字节数
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+_MD5_ETAG_PATTERN = re.compile(r'^[0-9A-F]{32}$')
+
+
+async def sync_to_bucket(bucket, local_dir, prefix='', delete=False, checksum=True, num_threads=None):
+    """把本地目录同步到OSS，即上传 `local_dir` 下新增、修改过的文件。
+
+    本地文件 `local_dir/a/b.txt` 对应的OSS文件名为 `prefix + 'a/b.txt'` ，因此 `prefix` 通常以'/'结尾。
+
+    :param bucket: :class:`Bucket <asyncoss.Bucket>` 对象
+    :param str local_dir: 本地目录
+    :param str prefix: OSS文件名前缀
+    :param bool delete: 为True时，删除OSS上 `prefix` 下本地没有的文件
+    :param bool checksum: 为False时，只比较大小，不比较MD5、CRC64
+    :param int num_threads: 同时比较、上传的文件数，缺省为 `_SYNC_NUM_THREADS` 。大文件通过 :func:`resumable_upload <asyncoss.resumable_upload>` 上传
+
+    :return: :class:`SyncResult <asyncoss.models.SyncResult>`
+    """
+    loop = asyncio.get_event_loop()
+    num_threads = _num_threads(num_threads)
+    result = models.SyncResult()
+
+    local_files = await loop.run_in_executor(None, _list_local_files, local_dir, prefix)
+    extra_keys = []
+
+    async def producer(q):
+        async for page in ObjectIterator(bucket, prefix=prefix, max_keys=1000).pages():
+            for obj in page:
+                filename = local_files.pop(obj.key, None)
+                if filename is not None:
+                    await q.put((obj.key, filename, obj))
+                elif not obj.key.endswith('/'):
+                    extra_keys.append(obj.key)
+
+        for key in sorted(local_files):
+            await q.put((key, local_files[key], None))
+
+    async def consumer(q):
+        while True:
+            task = await q.get()
+            if task is None:
+                break
+
+            key, filename, obj = task
+            try:
+                if obj is not None and await _is_same_file(bucket, filename, obj, checksum):
+                    result.skipped_count += 1
+                    continue
+
+                await resumable_upload(bucket, key, filename)
+            except Exception as e:
+                _add_failure(result, key, e)
+            else:
+                result.transferred_keys.append(key)
+
+    await TaskQueue(producer, [consumer] * num_threads, maxsize=num_threads * 2).run()
+
+    if delete and extra_keys:
+        delete_result = await bucket.bulk_delete_objects(extra_keys, num_threads=num_threads)
+        failed_keys = set(delete_result.failed_keys)
+
+        result.deleted_keys = [key for key in extra_keys if key not in failed_keys]
+        result.failed_keys.extend(delete_result.failed_keys)
+        result.errors.extend(delete_result.errors)
+
+    return result
+
+
+async def sync_from_bucket(bucket, prefix, local_dir, delete=False, checksum=True, num_threads=None):
+    """把OSS上的文件同步到本地目录，即下载 `prefix` 下新增、修改过的文件。
+
+    OSS文件 `prefix + 'a/b.txt'` 对应的本地文件为 `local_dir/a/b.txt` 。以'/'结尾的文件（目录）会被忽略；
+    对应的本地路径在 `local_dir` 之外的文件（如文件名中含有'..'）也会被忽略。
+
+    :param bucket: :class:`Bucket <asyncoss.Bucket>` 对象
+    :param str prefix: OSS文件名前缀
+    :param str local_dir: 本地目录，不存在会被创建
+    :param bool delete: 为True时，删除 `local_dir` 下OSS上没有的文件
+    :param bool checksum: 为False时，只比较大小，不比较MD5、CRC64
+    :param int num_threads: 同时比较、下载的文件数，缺省为 `_SYNC_NUM_THREADS` 。大文件通过 :func:`resumable_download <asyncoss.resumable_download>` 下载
+
+    :return: :class:`SyncResult <asyncoss.models.SyncResult>`
+    """
+    loop = asyncio.get_event_loop()
+    num_threads = _num_threads(num_threads)
+    result = models.SyncResult()
+
+    local_files = await loop.run_in_executor(None, _list_local_files, local_dir, prefix)
+    root = os.path.abspath(local_dir)
+
+    async def producer(q):
+        async for page in ObjectIterator(bucket, prefix=prefix, max_keys=1000).pages():
+            for obj in page:
+                if obj.key.endswith('/'):
+                    continue
+
+                filename = os.path.abspath(os.path.join(root, *obj.key[len(prefix):].split('/')))
+                if not filename.startswith(root + os.sep):
+                    logger.warning('Skip {0}: it maps to {1}, outside of {2}'.format(obj.key, filename, root))
+                    continue
+
+                exists = local_files.pop(obj.key, None) is not None
+                await q.put((obj.key, filename, obj if exists else None))
+
+    async def consumer(q):
+        while True:
+            task = await q.get()
+            if task is None:
+                break
+
+            key, filename, obj = task
+            try:
+                if obj is not None and await _is_same_file(bucket, filename, obj, checksum):
+                    result.skipped_count += 1
+                    continue
+
+                await loop.run_in_executor(None, _makedirs, os.path.dirname(filename))
+                await resumable_download(bucket, key, filename)
+            except Exception as e:
+                _add_failure(result, key, e)
+            else:
+                result.transferred_keys.append(key)
+
+    await TaskQueue(producer, [consumer] * num_threads, maxsize=num_threads * 2).run()
+
+    if delete:
+        for key in sorted(local_files):
+            try:
+                await loop.run_in_executor(None, os.remove, local_files[key])
+            except OSError as e:
+                _add_failure(result, key, e)
+            else:
+                result.deleted_keys.append(key)
+
+    return result
+
+
+def _num_threads(num_threads):
+    num_threads = defaults.get(num_threads, _SYNC_NUM_THREADS)
+    if num_threads < 1:
+        raise ValueError('num_threads should be at least 1, got {0}'.format(num_threads))
+    return num_threads
+
+
+def _add_failure(result, key, e):
+    logger.warning('Failed to sync {0}: {1!r}'.format(key, e))
+    result.failed_keys.append(key)
+    result.errors.append(e)
+
+
+async def _is_same_file(bucket, filename, obj, checksum):
+    loop = asyncio.get_event_loop()
+
+    size = await loop.run_in_executor(None, os.path.getsize, filename)
+    if size != obj.size:
+        return False
+
+    if not checksum:
+        return True
+
+    if obj.type == 'Normal' and _MD5_ETAG_PATTERN.match(obj.etag or ''):
+        return await loop.run_in_executor(None, _file_md5, filename) == obj.etag
+
+    server_crc = (await bucket.head_object(obj.key)).server_crc
+    if server_crc is None:
+        return False
+
+    return await loop.run_in_executor(None, _file_crc64, filename) == server_crc
+
+
+def _list_local_files(local_dir, prefix):
+    files = {}
+    if not os.path.isdir(local_dir):
+        return files
+
+    for dirpath, dirnames, filenames in os.walk(local_dir):
+        rel_dir = os.path.relpath(dirpath, local_dir)
+        for name in filenames:
+            rel_path = name if rel_dir == os.curdir else os.path.join(rel_dir, name)
+            files[prefix + rel_path.replace(os.sep, '/')] = os.path.join(dirpath, name)
+
+    return files
+
+
+def _makedirs(dirname):
+    if not os.path.isdir(dirname):
+        os.makedirs(dirname, exist_ok=True)
+
+
+def _file_md5(filename):
+    md5 = hashlib.md5()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            md5.update(chunk)
+    return md5.hexdigest().upper()
+
+
+def _file_crc64(filename):
+    crc = utils.Crc64()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            crc.update(chunk)
+    return crc.crc
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+"""
+asyncoss.task_queue
+~~~~~~~~~~~~~~~~~~~
+
+基于asyncio的生产者/消费者任务队列，用于并发执行分片上传、下载等操作。
+"""
+
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TaskQueue(object):
+    """一个生产者协程，多个消费者协程。
+
+    生产者通过 `put` 放入任务，消费者通过 `get` 取出任务；生产者结束后，每个消费者都会取到一个None，表示没有更多任务了。
+    任一协程抛出异常，其余协程会被取消，`run` 会抛出第一个异常。
+
+    :param producer: 生产者，形如 `async def producer(q)` 的协程函数
+    :param consumers: 消费者列表，每个元素都是形如 `async def consumer(q)` 的协程函数
+    :param int maxsize: 队列长度上限，0表示不限制
+    """
+
+    def __init__(self, producer, consumers, maxsize=0, loop=None):
+        self.__producer = producer
+        self.__consumers = consumers
+        self.__loop = loop or asyncio.get_event_loop()
+
+        self.__queue = asyncio.Queue(maxsize)
+
+    async def run(self):
+        tasks = [asyncio.ensure_future(self.__producer_func(), loop=self.__loop)]
+        for c in self.__consumers:
+            tasks.append(asyncio.ensure_future(c(self), loop=self.__loop))
+
+        try:
+            await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            # 被取消是正常的退出方式，不算错误
+            logger.debug('Producer or consumer was cancelled')
+            await self.__cancel(tasks)
+            raise
+        except BaseException as e:
+            logger.error('An exception was thrown by producer or consumer: {0!r}'.format(e))
+            await self.__cancel(tasks)
+            raise
+
+    async def __cancel(self, tasks):
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def put(self, data):
+        assert data is not None
+        await self.__queue.put(data)
+
+    async def get(self):
+        return await self.__queue.get()
+
+    async def __producer_func(self):
+        await self.__producer(self)
+
+        for i in range(len(self.__consumers)):
+            await self.__queue.put(None)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+"""
+asyncoss.utils
+~~~~~~~~~~~~~~
+
+工具函数模块。与 `oss2.utils` 中的同名函数对应，但不会阻塞事件循环。
+"""
+
+import asyncio
+
+from oss2.exceptions import InconsistentError
+
+from asyncoss.task_queue import TaskQueue
+
+
+#: 写文件时，等待写入的数据块个数上限
+_WRITE_QUEUE_DEPTH = 8
+
+#: 写文件时，攒够这么多字节才在线程池中写一次，以减少线程池的往返次数
+_WRITE_BATCH_SIZE = 1024 * 1024
+
+
+async def copyfileobj_and_verify(resp, fileobj, expected_len,
+                                 chunk_size=16*1024,
+                                 request_id='',
+                                 progress_callback=None,
+                                 crc=None):
+    """把HTTP响应体写入文件对象，并校验长度。
+
+    读取响应体在事件循环中进行，写文件在线程池中进行，每攒够 `_WRITE_BATCH_SIZE` 字节写一次；两者之间最多缓存
+    `_WRITE_QUEUE_DEPTH` 批数据，写得慢时读取会暂停，不会无限占用内存。
+
+    :param resp: :class:`Response <asyncoss.http.Response>` 对象
+    :param fileobj: 可写的file-like object
+    :param expected_len: 期望的长度，None表示不校验
+    :param progress_callback: 用户指定的进度回调函数。参考 :ref:`progress_callback`
+    :param crc: :class:`Crc64 <oss2.utils.Crc64>` 对象，非None时在写入线程中对数据计算CRC
+
+    :raises: 如果长度不一致，抛出 :class:`InconsistentError <oss2.exceptions.InconsistentError>`
+    """
+    loop = asyncio.get_event_loop()
+    num_read = 0
+
+    def write(bufs):
+        for buf in bufs:
+            fileobj.write(buf)
+            if crc is not None:
+                crc.update(buf)
+
+    async def producer(q):
+        nonlocal num_read
+
+        batch = []
+        batch_len = 0
+        async for buf in resp.iter_chunked(chunk_size):
+            num_read += len(buf)
+            batch.append(buf)
+            batch_len += len(buf)
+
+            if batch_len >= _WRITE_BATCH_SIZE:
+                await q.put(batch)
+                batch = []
+                batch_len = 0
+
+            if progress_callback:
+                progress_callback(num_read, expected_len)
+
+        if batch:
+            await q.put(batch)
+
+    async def consumer(q):
+        while True:
+            bufs = await q.get()
+            if bufs is None:
+                break
+
+            await loop.run_in_executor(None, write, bufs)
+
+    await TaskQueue(producer, [consumer], maxsize=_WRITE_QUEUE_DEPTH).run()
+
+    if expected_len is not None and num_read != expected_len:
+        raise InconsistentError('IncompleteRead from source', request_id)
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+
+"""
+asyncoss.xml_stream
+~~~~~~~~~~~~~~~~~~~
+
+罗列类接口响应体的流式解析。
+
+与 `oss2.xml_utils` 中的 `parse_list_objects` 等函数得到的结果相同，但不会先把整个响应体读入内存、再构造完整的ElementTree：
+响应体边下载边交给增量解析器，每解析出一个条目就立即返回，并从树中删除该条目，因此内存占用与单个条目的大小相当，
+第一个条目也不必等到整个响应体下载完成。
+
+`iter_xxx` 是异步生成器，按文档顺序返回条目；`is_truncated`、`next_marker` 等分页信息在遍历过程中写入 `result` ，
+遍历结束后才完整可用。`parse_xxx` 遍历全部条目并写入 `result` 的列表中。
+"""
+
+from xml.etree import ElementTree
+
+from oss2.compat import to_string
+from oss2.exceptions import InconsistentError
+from asyncoss.models import SimplifiedObjectInfo, SimplifiedBucketInfo, MultipartUploadInfo, PartInfo, Owner
+from oss2.utils import iso8601_to_unixtime
+from oss2.xml_utils import _find_tag, _find_tag_with_default, _find_bool, _find_int, _find_object
+
+
+#: 每次交给解析器的字节数
+_FEED_CHUNK_SIZE = 16 * 1024
+
+
+async def _iter_nodes(resp, paths):
+    """增量解析 `resp` 的响应体，每当 `paths` 中的某个节点解析完毕时，返回 (path, node, root)。
+
+    `path` 是相对根节点的路径，如 'Contents'、'Buckets/Bucket'。返回的节点在生成器恢复执行后会从树中删除，
+    因此根节点下只保留 `IsTruncated` 等分页信息。
+
+    读完后检查收到的字节数与Content-Length是否一致，不一致抛出 :class:`InconsistentError <oss2.exceptions.InconsistentError>` 。
+    解析出错、网络出错或者提前结束遍历时释放 `resp` 。
+    """
+    parser = ElementTree.XMLPullParser(events=('start', 'end'))
+    stack = []
+
+    def read_events():
+        for event, node in parser.read_events():
+            if event == 'start':
+                stack.append(node)
+                continue
+
+            path = '/'.join(n.tag for n in stack[1:])
+            stack.pop()
+
+            if path in paths:
+                yield path, node, stack[0]
+                stack[-1].remove(node)
+
+    received = 0
+    try:
+        async for chunk in resp.iter_chunked(_FEED_CHUNK_SIZE):
+            received += len(chunk)
+            parser.feed(chunk)
+            for item in read_events():
+                yield item
+
+        expected = _content_length(resp)
+        if expected is not None and received != expected:
+            raise InconsistentError('IncompleteRead from source', resp.request_id)
+
+        parser.close()
+        for item in read_events():
+            yield item
+    except BaseException:
+        resp.response.release()
+        raise
+
+
+def _content_length(resp):
+    # 压缩过的响应体解压后与Content-Length不一致
+    if resp.headers.get('Content-Encoding', 'identity') != 'identity':
+        return None
+
+    length = resp.headers.get('Content-Length')
+    return int(length) if length is not None else None
+
+
+def _is_url_encoding(root):
+    # OSS在条目之前返回EncodingType，因此解析到条目时已经可以判断
+    node = root.find('EncodingType')
+    return node is not None and to_string(node.text) == 'url'
+
+
+async def iter_list_objects(result, resp):
+    """流式解析 `list_objects` 的响应。
+
+    :param result: :class:`ListObjectsResult <asyncoss.models.ListObjectsResult>` 对象
+    :param resp: :class:`Response <asyncoss.http.Response>` 对象
+
+    :return: 异步生成器，返回 :class:`SimplifiedObjectInfo <oss2.models.SimplifiedObjectInfo>` 对象；
+        公共前缀也以 `SimplifiedObjectInfo` 表示，其 `is_prefix()` 为True
+    """
+    root = None
+
+    async for path, node, root in _iter_nodes(resp, ('Contents', 'CommonPrefixes')):
+        url_encoded = _is_url_encoding(root)
+
+        if path == 'CommonPrefixes':
+            yield SimplifiedObjectInfo(_find_object(node, 'Prefix', url_encoded), None, None, None, None, None)
+            continue
+
+        owner = None
+        if node.find('Owner') is not None:
+            owner = Owner(_find_tag(node, 'Owner/DisplayName'), _find_tag(node, 'Owner/ID'))
+
+        yield SimplifiedObjectInfo(
+            _find_object(node, 'Key', url_encoded),
+            iso8601_to_unixtime(_find_tag(node, 'LastModified')),
+            _find_tag(node, 'ETag').strip('"'),
+            _find_tag(node, 'Type'),
+            int(_find_tag(node, 'Size')),
+            _find_tag(node, 'StorageClass'),
+            owner,
+            _find_tag_with_default(node, 'RestoreInfo', None))
+
+    if root is not None:
+        result.is_truncated = _find_bool(root, 'IsTruncated')
+        if result.is_truncated:
+            result.next_marker = _find_object(root, 'NextMarker', _is_url_encoding(root))
+
+
+async def iter_list_multipart_uploads(result, resp):
+    """流式解析 `list_multipart_uploads` 的响应。
+
+    :param result: :class:`ListMultipartUploadsResult <asyncoss.models.ListMultipartUploadsResult>` 对象
+    :param resp: :class:`Response <asyncoss.http.Response>` 对象
+
+    :return: 异步生成器，返回 :class:`MultipartUploadInfo <oss2.models.MultipartUploadInfo>` 对象；
+        公共前缀也以 `MultipartUploadInfo` 表示，其 `is_prefix()` 为True
+    """
+    root = None
+
+    async for path, node, root in _iter_nodes(resp, ('Upload', 'CommonPrefixes')):
+        url_encoded = _is_url_encoding(root)
+
+        if path == 'CommonPrefixes':
+            yield MultipartUploadInfo(_find_object(node, 'Prefix', url_encoded), None, None)
+        else:
+            yield MultipartUploadInfo(
+                _find_object(node, 'Key', url_encoded),
+                _find_tag(node, 'UploadId'),
+                iso8601_to_unixtime(_find_tag(node, 'Initiated')))
+
+    if root is not None:
+        result.is_truncated = _find_bool(root, 'IsTruncated')
+        result.next_key_marker = _find_object(root, 'NextKeyMarker', _is_url_encoding(root))
+        result.next_upload_id_marker = _find_tag(root, 'NextUploadIdMarker')
+
+
+async def iter_list_parts(result, resp):
+    """流式解析 `list_parts` 的响应。
+
+    :param result: :class:`ListPartsResult <asyncoss.models.ListPartsResult>` 对象
+    :param resp: :class:`Response <asyncoss.http.Response>` 对象
+
+    :return: 异步生成器，返回 :class:`PartInfo <oss2.models.PartInfo>` 对象
+    """
+    root = None
+
+    async for path, node, root in _iter_nodes(resp, ('Part',)):
+        yield PartInfo(
+            _find_int(node, 'PartNumber'),
+            _find_tag(node, 'ETag').strip('"'),
+            size=_find_int(node, 'Size'),
+            last_modified=iso8601_to_unixtime(_find_tag(node, 'LastModified')))
+
+    if root is not None:
+        result.is_truncated = _find_bool(root, 'IsTruncated')
+        result.next_marker = _find_tag(root, 'NextPartNumberMarker')
+
+
+async def iter_list_buckets(result, resp):
+    """流式解析 `list_buckets` 的响应。
+
+    :param result: :class:`ListBucketsResult <asyncoss.models.ListBucketsResult>` 对象
+    :param resp: :class:`Response <asyncoss.http.Response>` 对象
+
+    :return: 异步生成器，返回 :class:`SimplifiedBucketInfo <oss2.models.SimplifiedBucketInfo>` 对象
+    """
+    root = None
+
+    async for path, node, root in _iter_nodes(resp, ('Buckets/Bucket',)):
+        yield SimplifiedBucketInfo(
+            _find_tag(node, 'Name'),
+            _find_tag(node, 'Location'),
+            iso8601_to_unixtime(_find_tag(node, 'CreationDate')),
+            _find_tag(node, 'ExtranetEndpoint'),
+            _find_tag(node, 'IntranetEndpoint'),
+            _find_tag(node, 'StorageClass'),
+            _find_tag_with_default(node, 'Region', None),
+            _find_tag_with_default(node, 'ResourceGroupId', None))
+
+    if root is not None:
+        if root.find('IsTruncated') is None:
+            result.is_truncated = False
+        else:
+            result.is_truncated = _find_bool(root, 'IsTruncated')
+
+        if result.is_truncated:
+            result.next_marker = _find_tag(root, 'NextMarker')
+
+        if root.find('Owner') is not None:
+            result.owner = Owner(_find_tag_with_default(root, 'Owner/DisplayName', None),
+                                 _find_tag_with_default(root, 'Owner/ID', None))
+
+
+async def parse_list_objects(result, resp):
+    async for entry in iter_list_objects(result, resp):
+        if entry.is_prefix():
+            result.prefix_list.append(entry.key)
+        else:
+            result.object_list.append(entry)
+
+    return result
+
+
+async def parse_list_multipart_uploads(result, resp):
+    async for entry in iter_list_multipart_uploads(result, resp):
+        if entry.is_prefix():
+            result.prefix_list.append(entry.key)
+        else:
+            result.upload_list.append(entry)
+
+    return result
+
+
+async def parse_list_parts(result, resp):
+    async for entry in iter_list_parts(result, resp):
+        result.parts.append(entry)
+
+    return result
+
+
+async def parse_list_buckets(result, resp):
+    async for entry in iter_list_buckets(result, resp):
+        result.buckets.append(entry)
+
+    return result
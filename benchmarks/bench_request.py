@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+"""
+构造请求的微基准：生成URL、构造 `Request` 、签名。不发出网络请求。
+
+用法 ::
+
+    $ python benchmarks/bench_request.py
+"""
+
+import asyncio
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncoss
+from asyncoss import http
+
+
+BUCKET_NAME = 'my-bucket'
+KEY = 'dir/sub/object-00001.json'
+
+
+def main(number=100000, repeat=5):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    bucket = asyncoss.Bucket(asyncoss.Auth('ak', 'sk'), 'http://oss-cn-hangzhou.aliyuncs.com', BUCKET_NAME)
+    make_url = bucket._make_url
+
+    def url():
+        make_url(BUCKET_NAME, KEY)
+
+    def request():
+        http.Request('GET', make_url(BUCKET_NAME, KEY), app_name='')
+
+    def request_with_headers():
+        http.Request('HEAD', make_url(BUCKET_NAME, KEY), headers={'Range': 'bytes=0-9'}, app_name='')
+
+    def request_with_body():
+        http.Request('PUT', make_url(BUCKET_NAME, 'k'), data=b'x' * 100, headers={'Content-Type': 'text/plain'})
+
+    def signed_request():
+        req = http.Request('GET', make_url(BUCKET_NAME, KEY), app_name='')
+        bucket.auth._sign_request(req, BUCKET_NAME, KEY)
+
+    for func in (url, request, request_with_headers, request_with_body, signed_request):
+        seconds = min(timeit.repeat(func, number=number, repeat=repeat))
+        print('{0:22s} {1:8.2f} us'.format(func.__name__, seconds / number * 1e6))
+
+    loop.run_until_complete(bucket.close())
+    loop.close()
+
+
+if __name__ == '__main__':
+    main()
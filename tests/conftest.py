@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import pytest
+
+import asyncoss
+from fake_oss import FakeOss
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+
+    loop.run_until_complete(loop.shutdown_asyncgens())
+    loop.close()
+    asyncio.set_event_loop(None)
+
+
+@pytest.fixture
+def run(loop):
+    """在测试的事件循环中运行协程并返回结果。"""
+    return loop.run_until_complete
+
+
+@pytest.fixture
+def oss(run):
+    server = FakeOss()
+    run(server.start())
+    yield server
+    run(server.stop())
+
+
+@pytest.fixture
+def make_bucket(run, oss):
+    """返回创建 `Bucket` 的函数，参数与 `Bucket` 相同；测试结束时关闭这些 `Bucket` 。"""
+    buckets = []
+
+    async def create(kwargs):
+        return asyncoss.Bucket(asyncoss.Auth('ak', 'sk'), oss.endpoint, 'bk', **kwargs)
+
+    def make(**kwargs):
+        bucket = run(create(kwargs))
+        buckets.append(bucket)
+        return bucket
+
+    yield make
+
+    for bucket in buckets:
+        run(bucket.close())
+
+
+@pytest.fixture
+def bucket(make_bucket):
+    return make_bucket()
@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+
+"""
+测试用的OSS服务端：在本地用aiohttp模拟一个Bucket，实现测试用到的接口。不校验签名。
+"""
+
+import asyncio
+import hashlib
+import re
+import time
+import uuid
+from email.utils import formatdate
+from urllib.parse import quote, unquote
+from xml.sax.saxutils import escape, unescape
+
+from aiohttp import web
+from oss2.utils import Crc64
+
+
+def etag_of(data):
+    return hashlib.md5(data).hexdigest().upper()
+
+
+def crc_of(data):
+    crc = Crc64()
+    crc.update(data)
+    return str(crc.crc)
+
+
+class FakeOss(object):
+    """本地OSS服务端。
+
+    `objects` 为 {文件名: (内容, ETag, 修改时间)}。 `failures` 是依次注入的故障，每个请求取出一个：
+
+        * None：正常处理
+        * int：返回该HTTP状态码的错误
+        * 'reset'：直接关闭连接
+        * ('stall', 秒数)：等待后再正常处理
+        * ('late', 秒数)：正常处理后等待再返回响应
+        * ('code', 状态码, 错误码)：返回指定错误码的错误
+
+    文件名（最后一级）以 'deny' 开头的文件在批量删除时被拒绝（作为 `<Error>` 返回）；以 'batchfail' 开头时整个批量删除请求返回403。
+    """
+    def __init__(self, list_delay=0, get_delay=0, chunk_delay=0):
+        self.objects = {}
+        self.uploads = {}
+        self.failures = []
+        self.requests = []
+        self.list_delay = list_delay
+        self.get_delay = get_delay
+
+        #: 下载时，响应体每发送一块后等待的秒数
+        self.chunk_delay = chunk_delay
+
+        #: 正在处理的请求数，以及其最大值
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        self.endpoint = None
+        self.__runner = None
+
+    async def start(self):
+        app = web.Application(client_max_size=1 << 30)
+        app.router.add_route('*', '/{tail:.*}', self.__handle)
+
+        self.__runner = web.AppRunner(app)
+        await self.__runner.setup()
+        site = web.TCPSite(self.__runner, '127.0.0.1', 0)
+        await site.start()
+
+        port = site._server.sockets[0].getsockname()[1]
+        self.endpoint = 'http://127.0.0.1:{0}'.format(port)
+
+    async def stop(self):
+        await self.__runner.cleanup()
+
+    def put(self, key, data, mtime=0):
+        self.objects[key] = (data, etag_of(data), mtime)
+
+    def data(self, key):
+        return self.objects[key][0]
+
+    def count(self, method=None, query=None):
+        """返回收到的请求数，可以按方法、查询参数过滤。"""
+        return len([r for r in self.requests
+                    if (method is None or r[0] == method) and (query is None or query in r[2])])
+
+    async def __handle(self, request):
+        self.requests.append((request.method, request.path, request.query_string))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return await self.__dispatch(request)
+        finally:
+            self.in_flight -= 1
+
+    async def __dispatch(self, request):
+        if self.failures:
+            failure = self.failures.pop(0)
+            if failure is None:
+                pass
+            elif isinstance(failure, tuple) and failure[0] == 'late':
+                resp = await self.__serve(request)
+                await asyncio.sleep(failure[1])
+                return resp
+            elif isinstance(failure, tuple) and failure[0] == 'stall':
+                await asyncio.sleep(failure[1])
+            elif isinstance(failure, tuple) and failure[0] == 'code':
+                return _error(failure[1], failure[2])
+            elif failure == 'reset':
+                request.transport.close()
+                await asyncio.sleep(0.05)
+                return web.Response()
+            else:
+                return _error(failure, 'InternalError')
+
+        return await self.__serve(request)
+
+    async def __serve(self, request):
+        query = request.query
+        key = _object_key(request)
+        method = request.method
+
+        if method == 'GET' and key == '' and 'uploads' not in query:
+            return await self.__list_objects(query)
+        if method == 'POST' and 'delete' in query:
+            return await self.__delete_objects(request)
+        if method == 'POST' and 'uploads' in query:
+            return self.__init_upload(key)
+        if method == 'PUT' and 'uploadId' in query:
+            return await self.__upload_part(request, query)
+        if method == 'GET' and 'uploadId' in query:
+            return self.__list_parts(key, query)
+        if method == 'POST' and 'uploadId' in query:
+            return await self.__complete_upload(request, key, query)
+        if method == 'DELETE' and 'uploadId' in query:
+            self.uploads.pop(query['uploadId'], None)
+            return web.Response(status=204, headers=_BASE_HEADERS)
+        if method == 'PUT':
+            return await self.__put_object(request, key)
+        if method in ('GET', 'HEAD'):
+            return await self.__get_object(request, key, query)
+        if method == 'DELETE':
+            self.objects.pop(key, None)
+            return web.Response(status=204, headers=_BASE_HEADERS)
+
+        return _error(400, 'InvalidRequest')
+
+    async def __list_objects(self, query):
+        prefix = query.get('prefix', '')
+        marker = query.get('marker', '')
+        max_keys = int(query.get('max-keys', '100'))
+        delimiter = query.get('delimiter', '')
+
+        keys = sorted(k for k in self.objects if k.startswith(prefix) and k > marker)
+        contents = []
+        prefixes = []
+        last = ''
+        for k in keys:
+            if len(contents) + len(prefixes) >= max_keys:
+                break
+
+            rest = k[len(prefix):]
+            if delimiter and delimiter in rest:
+                common_prefix = prefix + rest[:rest.index(delimiter) + len(delimiter)]
+                if common_prefix not in prefixes:
+                    prefixes.append(common_prefix)
+            else:
+                contents.append(k)
+            last = k
+
+        truncated = len(contents) + len(prefixes) >= max_keys and any(k > last for k in keys)
+        if truncated and prefixes and prefixes[-1] == last[:len(prefixes[-1])]:
+            # 与OSS相同：公共前缀之后从该前缀下最后一个文件继续
+            last = max(k for k in keys if k.startswith(prefixes[-1]))
+            truncated = any(k > last for k in keys)
+
+        parts = ['<?xml version="1.0" encoding="UTF-8"?><ListBucketResult><Name>bk</Name>',
+                 '<Prefix>{0}</Prefix><Marker>{1}</Marker><MaxKeys>{2}</MaxKeys>'.format(
+                     quote(prefix), quote(marker), max_keys),
+                 '<Delimiter>{0}</Delimiter><EncodingType>url</EncodingType>'.format(quote(delimiter)),
+                 '<IsTruncated>{0}</IsTruncated>'.format('true' if truncated else 'false')]
+        if truncated:
+            parts.append('<NextMarker>{0}</NextMarker>'.format(quote(last)))
+        for k in contents:
+            data, etag, mtime = self.objects[k]
+            parts.append('<Contents><Key>{0}</Key><LastModified>2020-01-01T00:00:00.000Z</LastModified>'
+                         '<ETag>"{1}"</ETag><Type>Normal</Type><Size>{2}</Size>'
+                         '<StorageClass>Standard</StorageClass></Contents>'.format(quote(k), etag, len(data)))
+        for p in prefixes:
+            parts.append('<CommonPrefixes><Prefix>{0}</Prefix></CommonPrefixes>'.format(quote(p)))
+        parts.append('</ListBucketResult>')
+
+        if self.list_delay:
+            await asyncio.sleep(self.list_delay)
+        return _xml(''.join(parts))
+
+    async def __delete_objects(self, request):
+        body = (await request.read()).decode('utf-8')
+        quiet = '<Quiet>true</Quiet>' in body
+
+        parts = ['<?xml version="1.0" encoding="UTF-8"?><DeleteResult><EncodingType>url</EncodingType>']
+        for key in re.findall(r'<Key>(.*?)</Key>', body):
+            key = unescape(key)
+            name = key.rsplit('/', 1)[-1]
+            if name.startswith('batchfail'):
+                return _error(403, 'AccessDenied')
+            if name.startswith('deny'):
+                parts.append('<Error><Key>{0}</Key><Code>AccessDenied</Code><Message>denied</Message></Error>'.format(
+                    quote(key)))
+                continue
+
+            self.objects.pop(key, None)
+            if not quiet:
+                parts.append('<Deleted><Key>{0}</Key></Deleted>'.format(quote(key)))
+        parts.append('</DeleteResult>')
+
+        return _xml(''.join(parts))
+
+    def __init_upload(self, key):
+        upload_id = uuid.uuid4().hex
+        self.uploads[upload_id] = (key, {})
+        return _xml('<InitiateMultipartUploadResult><Bucket>bk</Bucket><Key>{0}</Key><UploadId>{1}</UploadId>'
+                    '</InitiateMultipartUploadResult>'.format(escape(key), upload_id))
+
+    async def __upload_part(self, request, query):
+        upload_id = query['uploadId']
+        if upload_id not in self.uploads:
+            return _error(404, 'NoSuchUpload')
+
+        source = request.headers.get('x-oss-copy-source')
+        if source:
+            data, etag, mtime = self.objects[unquote(source.split('/', 2)[2])]
+            if_match = request.headers.get('x-oss-copy-source-if-match')
+            if if_match and if_match.strip('"') != etag:
+                return _error(412, 'PreconditionFailed')
+
+            source_range = request.headers.get('x-oss-copy-source-range')
+            if source_range:
+                start, end = source_range[len('bytes='):].split('-')
+                data = data[int(start):int(end) + 1]
+        else:
+            data = await request.read()
+
+        etag = etag_of(data)
+        self.uploads[upload_id][1][int(query['partNumber'])] = (data, etag)
+        return web.Response(headers=dict(_BASE_HEADERS, ETag='"{0}"'.format(etag)))
+
+    def __list_parts(self, key, query):
+        upload_id = query['uploadId']
+        if upload_id not in self.uploads:
+            return _error(404, 'NoSuchUpload')
+
+        marker = int(query.get('part-number-marker') or 0)
+        max_parts = int(query.get('max-parts', 1000))
+        numbers = sorted(n for n in self.uploads[upload_id][1] if n > marker)
+        selected = numbers[:max_parts]
+
+        parts = ['<ListPartsResult><Bucket>bk</Bucket><Key>{0}</Key><UploadId>{1}</UploadId>'.format(
+                     escape(key), upload_id),
+                 '<IsTruncated>{0}</IsTruncated>'.format('true' if len(numbers) > max_parts else 'false'),
+                 '<NextPartNumberMarker>{0}</NextPartNumberMarker>'.format(selected[-1] if selected else 0)]
+        for n in selected:
+            data, etag = self.uploads[upload_id][1][n]
+            parts.append('<Part><PartNumber>{0}</PartNumber><LastModified>2020-01-01T00:00:00.000Z</LastModified>'
+                         '<ETag>"{1}"</ETag><Size>{2}</Size></Part>'.format(n, etag, len(data)))
+        parts.append('</ListPartsResult>')
+
+        return _xml(''.join(parts))
+
+    async def __complete_upload(self, request, key, query):
+        upload_id = query['uploadId']
+        if upload_id not in self.uploads:
+            return _error(404, 'NoSuchUpload')
+
+        body = (await request.read()).decode('utf-8')
+        numbers = [int(n) for n in re.findall(r'<PartNumber>(\d+)</PartNumber>', body)]
+        data = b''.join(self.uploads[upload_id][1][n][0] for n in numbers)
+        etag = '{0}-{1}'.format(etag_of(data), len(numbers))
+
+        self.objects[key] = (data, etag, time.time())
+        del self.uploads[upload_id]
+
+        return web.Response(body=b'<CompleteMultipartUploadResult/>',
+                            headers=dict(_BASE_HEADERS, ETag='"{0}"'.format(etag)))
+
+    async def __put_object(self, request, key):
+        source = request.headers.get('x-oss-copy-source')
+        if source:
+            source_key = unquote(source.split('/', 2)[2])
+            if source_key not in self.objects:
+                return _error(404, 'NoSuchKey')
+            data = self.objects[source_key][0]
+        else:
+            data = await request.read()
+
+        etag = etag_of(data)
+        self.objects[key] = (data, etag, time.time())
+        return web.Response(headers=dict(_BASE_HEADERS, ETag='"{0}"'.format(etag),
+                                         **{'x-oss-hash-crc64ecma': crc_of(data)}))
+
+    async def __get_object(self, request, key, query):
+        # 与OSS一样，返回收到请求时的文件内容
+        current = self.objects.get(key)
+        if self.get_delay:
+            await asyncio.sleep(self.get_delay)
+
+        if current is None:
+            return _error(404, 'NoSuchKey')
+
+        data, etag, mtime = current
+        headers = dict(_BASE_HEADERS)
+        headers.update({'ETag': '"{0}"'.format(etag),
+                        'Last-Modified': formatdate(mtime, usegmt=True),
+                        'x-oss-hash-crc64ecma': crc_of(data),
+                        'x-oss-object-type': 'Normal'})
+
+        if 'objectMeta' in query:
+            headers['Content-Length'] = str(len(data))
+            return web.Response(headers=headers)
+
+        if_match = request.headers.get('If-Match')
+        if if_match and if_match.strip('"') != etag:
+            return _error(412, 'PreconditionFailed')
+
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and if_none_match.strip('"') == etag:
+            return web.Response(status=304, headers=headers)
+
+        status = 200
+        byte_range = request.headers.get('Range')
+        if byte_range:
+            start, end = byte_range[len('bytes='):].split('-')
+            start = int(start) if start else None
+            end = int(end) if end else None
+            if start is None:
+                start, end = len(data) - end, len(data) - 1
+            if end is None or end >= len(data):
+                end = len(data) - 1
+
+            headers['Content-Range'] = 'bytes {0}-{1}/{2}'.format(start, end, len(data))
+            data = data[start:end + 1]
+            status = 206
+
+        if request.method == 'HEAD':
+            headers['Content-Length'] = str(len(data))
+            return web.Response(status=status, headers=headers)
+
+        if not self.chunk_delay:
+            return web.Response(status=status, body=data, headers=headers)
+
+        resp = web.StreamResponse(status=status, headers=headers)
+        resp.content_length = len(data)
+        await resp.prepare(request)
+        for offset in range(0, len(data), _STREAM_CHUNK_SIZE):
+            await resp.write(data[offset:offset + _STREAM_CHUNK_SIZE])
+            await asyncio.sleep(self.chunk_delay)
+        await resp.write_eof()
+        return resp
+
+
+_BASE_HEADERS = {'x-oss-request-id': 'fake-request-id'}
+
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _object_key(request):
+    parts = request.path.lstrip('/').split('/', 1)
+    return parts[1] if len(parts) > 1 else ''
+
+
+def _xml(body):
+    return web.Response(body=body.encode('utf-8'), headers=_BASE_HEADERS, content_type='application/xml')
+
+
+def _error(status, code):
+    body = ('<?xml version="1.0" encoding="UTF-8"?><Error><Code>{0}</Code><Message>fake error</Message>'
+            '<RequestId>fake-request-id</RequestId></Error>').format(code)
+    return web.Response(status=status, body=body.encode('utf-8'), headers=_BASE_HEADERS,
+                        content_type='application/xml')
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from oss2 import models as oss2_models
+from oss2 import xml_utils
+
+import asyncoss
+from asyncoss import api, exceptions, models
+
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    monkeypatch.setattr(api, '_BATCH_DELETE_MAX_KEYS', 10)
+
+
+def put_keys(oss, keys):
+    for key in keys:
+        oss.put(key, b'x')
+
+
+def test_batch_delete_reports_errors(run, oss, bucket):
+    put_keys(oss, ['a', 'deny-b', 'c'])
+
+    result = run(bucket.batch_delete_objects(['a', 'deny-b', 'c']))
+
+    assert result.deleted_keys == ['a', 'c']
+    assert result.failed_objects == [('deny-b', 'AccessDenied', 'denied')]
+    assert sorted(oss.objects) == ['deny-b']
+
+
+BATCH_DELETE_BODY = b'''<?xml version="1.0" encoding="UTF-8"?>
+<DeleteResult>
+  <EncodingType>url</EncodingType>
+  <Deleted><Key>a%20b</Key></Deleted>
+  <Error><Key>deny%2Fc</Key><Code>AccessDenied</Code><Message>denied</Message></Error>
+  <Deleted><Key>d</Key><VersionId>v1</VersionId><DeleteMarker>true</DeleteMarker>
+    <DeleteMarkerVersionId>v2</DeleteMarkerVersionId></Deleted>
+</DeleteResult>'''
+
+
+class _Response(object):
+    status = 200
+    headers = {}
+    request_id = 'id'
+
+
+def test_parse_batch_delete_matches_xml_utils():
+    result = api._parse_batch_delete_objects(models.BatchDeleteObjectsResult(_Response()), BATCH_DELETE_BODY)
+    expected = xml_utils.parse_batch_delete_objects(oss2_models.BatchDeleteObjectsResult(_Response()),
+                                                    BATCH_DELETE_BODY)
+
+    names = ('key', 'versionid', 'delete_marker', 'delete_marker_versionid')
+    assert result.deleted_keys == expected.deleted_keys == ['a b', 'd']
+    assert [tuple(getattr(v, n) for n in names) for v in result.delete_versions] == \
+        [tuple(getattr(v, n) for n in names) for v in expected.delete_versions]
+    assert result.failed_objects == [('deny/c', 'AccessDenied', 'denied')]
+
+
+def test_batch_delete_requires_keys(run, bucket):
+    with pytest.raises(models.ClientError):
+        run(bucket.batch_delete_objects([]))
+
+
+def test_bulk_delete_in_batches(run, oss, bucket):
+    keys = ['k{0:03d}'.format(i) for i in range(35)]
+    put_keys(oss, keys)
+
+    result = run(bucket.bulk_delete_objects(keys, num_threads=2))
+
+    assert result.deleted_count == 35
+    assert result.failed_keys == []
+    assert oss.objects == {}
+    assert oss.count('POST', 'delete') == 4
+
+
+def test_bulk_delete_failures(run, oss, bucket):
+    refused = ['batchfail'] + ['n{0}'.format(i) for i in range(9)]
+    keys = ['k{0}'.format(i) for i in range(9)] + ['deny-0'] + refused + ['m']
+    put_keys(oss, keys)
+
+    result = run(bucket.bulk_delete_objects(keys, num_threads=1))
+
+    assert result.deleted_count == 10
+    assert sorted(result.failed_keys) == sorted(['deny-0'] + refused)
+    assert len(result.errors) == 1
+    assert isinstance(result.errors[0], exceptions.AccessDenied)
+    assert sorted(oss.objects) == sorted(['deny-0'] + refused)
+
+
+def test_bulk_delete_async_iterable(run, oss, bucket):
+    put_keys(oss, ['a', 'b'])
+
+    async def keys():
+        yield 'a'
+        yield 'b'
+
+    result = run(bucket.bulk_delete_objects(keys()))
+
+    assert result.deleted_count == 2
+    assert oss.objects == {}
+
+
+def test_delete_prefix(run, oss, bucket):
+    put_keys(oss, ['tmp/{0:02d}'.format(i) for i in range(25)] + ['tmp/sub/x', 'keep/a', 'tmp'])
+
+    result = run(bucket.delete_prefix('tmp/'))
+
+    assert result.deleted_count == 26
+    assert sorted(oss.objects) == ['keep/a', 'tmp']
+
+
+def test_bulk_delete_skips_common_prefixes(run, oss, bucket):
+    put_keys(oss, ['dir/a', 'top'])
+
+    result = run(bucket.bulk_delete_objects(asyncoss.ObjectIterator(bucket, delimiter='/')))
+
+    assert result.deleted_count == 1
+    assert sorted(oss.objects) == ['dir/a']
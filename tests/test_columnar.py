@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+import asyncoss
+from asyncoss.models import SimplifiedObjectInfo
+
+
+def entry(key, size=1, etag='0123456789ABCDEF0123456789ABCDEF', mtime=100, type='Normal', storage_class='Standard'):
+    return SimplifiedObjectInfo(key, mtime, etag, type, size, storage_class)
+
+
+def fields(obj):
+    return obj.key, obj.last_modified, obj.etag, obj.type, obj.size, obj.storage_class
+
+
+ENTRIES = [
+    entry('a', size=0),
+    entry('b/1', etag='0123456789ABCDEF0123456789ABCDEF-12', type='Multipart', storage_class='IA'),
+    entry('b/2', etag='"not-md5"', mtime=200),
+    entry('b/中文', size=1 << 40),
+    entry('c'),
+]
+
+
+@pytest.fixture
+def table():
+    table = asyncoss.ObjectTable()
+    table.extend(ENTRIES)
+    return table
+
+
+def test_entries_round_trip(table):
+    assert len(table) == len(ENTRIES)
+    assert [fields(obj) for obj in table] == [fields(obj) for obj in ENTRIES]
+    assert fields(table[-1]) == fields(ENTRIES[-1])
+
+    with pytest.raises(IndexError):
+        table[len(ENTRIES)]
+
+
+def test_prefixes_are_skipped():
+    table = asyncoss.ObjectTable()
+    table.append(SimplifiedObjectInfo('dir/', None, None, None, None, None))
+
+    assert len(table) == 0
+
+
+def test_prefix_range_and_find(table):
+    assert list(table.prefix_range('b/')) == [1, 2, 3]
+    assert list(table.prefix_range('b/中')) == [3]
+    assert list(table.prefix_range('')) == [0, 1, 2, 3, 4]
+    assert list(table.prefix_range('d')) == []
+    assert table.find('b/2') == 2
+    assert table.find('b') == -1
+
+
+def test_sort(table):
+    shuffled = table.take([3, 0, 4, 2, 1])
+    assert not shuffled.is_sorted()
+
+    with pytest.raises(ValueError):
+        shuffled.find('a')
+
+    shuffled.sort()
+    assert shuffled.is_sorted()
+    assert [fields(obj) for obj in shuffled] == [fields(obj) for obj in ENTRIES]
+
+
+def test_sort_merges_sorted_runs():
+    keys = ['k{0:03d}'.format(i) for i in range(100)]
+    table = asyncoss.ObjectTable()
+    for shard in (keys[50:], keys[:20], keys[20:50]):
+        table.extend(entry(key) for key in shard)
+
+    table.sort()
+
+    assert table.is_sorted()
+    assert [table.key(i) for i in range(len(table))] == keys
+
+
+def test_take(table):
+    taken = table.take([2, 4])
+
+    assert [fields(obj) for obj in taken] == [fields(ENTRIES[2]), fields(ENTRIES[4])]
+    assert taken.is_sorted()
+
+
+def test_save_and_load(table, tmp_path):
+    filename = str(tmp_path / 'table')
+    table.save(filename)
+
+    loaded = asyncoss.ObjectTable.load(filename)
+
+    assert [fields(obj) for obj in loaded] == [fields(obj) for obj in ENTRIES]
+    assert loaded.is_sorted()
+    assert list(loaded.sizes) == [obj.size for obj in ENTRIES]
+
+    loaded.append(entry('d', type='Appendable'))
+    assert loaded[-1].type == 'Appendable'
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / 'other'
+    path.write_bytes(b'not a table')
+
+    with pytest.raises(ValueError):
+        asyncoss.ObjectTable.load(str(path))
+
+
+def test_arrays_support_buffer_protocol(table):
+    assert memoryview(table.sizes).format == 'q'
+    assert memoryview(table.mtimes).tolist() == [obj.last_modified for obj in ENTRIES]
+
+
+def test_from_iterator(run, oss, bucket):
+    keys = ['k{0:03d}'.format(i) for i in range(25)] + ['dir/x']
+    for key in keys:
+        oss.put(key, key.encode('utf-8'))
+
+    table = run(asyncoss.ObjectTable.from_iterator(asyncoss.ObjectIterator(bucket, max_keys=10)))
+
+    assert [table.key(i) for i in range(len(table))] == sorted(keys)
+    assert [table.etag(i) for i in range(len(table))] == [oss.objects[k][1] for k in sorted(keys)]
+    assert table.sizes[table.find('dir/x')] == 5
+
+    table = run(asyncoss.ObjectTable.from_iterator(asyncoss.ShardedObjectIterator(bucket, max_keys=10)))
+    assert len(table) == len(keys)
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import socket
+
+import pytest
+
+import asyncoss
+
+
+POOL_OPTIONS = dict(limit=4, limit_per_host=2, keepalive_timeout=30)
+
+
+@pytest.fixture
+def pool(run):
+    async def get_pool():
+        return asyncoss.get_connection_pool(**POOL_OPTIONS)
+
+    pool = run(get_pool())
+    yield pool
+    run(asyncoss.close_connection_pools())
+
+
+def new_bucket(oss, pool):
+    return asyncoss.Bucket(asyncoss.Auth('ak', 'sk'), oss.endpoint, 'bk', connection_pool=pool)
+
+
+def test_shared_by_options(run, pool):
+    async def get_pools():
+        return (asyncoss.get_connection_pool(**POOL_OPTIONS),
+                asyncoss.get_connection_pool(limit=4, limit_per_host=2, keepalive_timeout=60))
+
+    same, other = run(get_pools())
+
+    assert same is pool
+    assert other is not pool
+    assert (pool.limit, pool.limit_per_host, pool.keepalive_timeout) == (4, 2, 30)
+
+
+def test_connections_reused_across_buckets(run, oss, pool):
+    oss.put('a', b'x')
+
+    async def heads():
+        for i in range(10):
+            async with new_bucket(oss, pool) as bucket:
+                await bucket.head_object('a')
+
+    run(heads())
+
+    assert pool.requests == 10
+    assert (pool.connections_created, pool.connections_reused) == (1, 9)
+    assert pool.reuse_rate() == 0.9
+    assert (pool.idle, pool.in_use) == (1, 0)
+    assert not pool.closed
+
+
+def test_limit_per_host_queues_requests(run, oss, pool):
+    oss.put('a', b'x')
+    oss.get_delay = 0.02
+
+    async def gets():
+        bucket = new_bucket(oss, pool)
+        try:
+            results = await asyncio.gather(*[bucket.get_object('a') for i in range(6)])
+            return [await result.read() for result in results]
+        finally:
+            await bucket.close()
+
+    assert run(gets()) == [b'x'] * 6
+    assert oss.max_in_flight == 2
+    assert pool.queued == 4
+    assert pool.queue_wait_time > 0
+    assert pool.connections_created == 2
+
+
+@pytest.mark.parametrize('tcp_nodelay', [True, False])
+def test_tcp_nodelay(run, oss, tcp_nodelay):
+    oss.put('a', b'x')
+
+    async def nodelay():
+        pool = asyncoss.get_connection_pool(tcp_nodelay=tcp_nodelay)
+        try:
+            async with new_bucket(oss, pool) as bucket:
+                await bucket.head_object('a')
+            conn = next(iter(pool.connector._conns.values()))[0][0]
+            return conn.transport.get_extra_info('socket').getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+        finally:
+            await asyncoss.close_connection_pools()
+
+    assert bool(run(nodelay())) == tcp_nodelay
+
+
+def test_close_connection_pools(run, oss, pool):
+    oss.put('a', b'x')
+
+    async def close_and_get():
+        async with new_bucket(oss, pool) as bucket:
+            await bucket.head_object('a')
+        await asyncoss.close_connection_pools()
+        return asyncoss.get_connection_pool(**POOL_OPTIONS)
+
+    new_pool = run(close_and_get())
+
+    assert pool.closed
+    assert new_pool is not pool
+    assert not new_pool.closed
+
+
+def test_pools_per_loop(run, pool):
+    loop = asyncio.new_event_loop()
+    try:
+        other = asyncoss.get_connection_pool(loop=loop, **POOL_OPTIONS)
+        assert other is not pool
+        loop.run_until_complete(asyncoss.close_connection_pools(loop=loop))
+    finally:
+        loop.close()
+
+    assert other.closed
+    assert not pool.closed
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import os
+
+import pytest
+
+import asyncoss
+from asyncoss import cache as cache_module
+from asyncoss import exceptions
+
+
+@pytest.fixture(params=['memory', 'disk'])
+def cache(request, tmp_path):
+    directory = str(tmp_path / 'cache') if request.param == 'disk' else None
+    return asyncoss.ContentCache(500000, directory=directory)
+
+
+@pytest.fixture
+def data(oss):
+    data = os.urandom(200000)
+    oss.put('k', data)
+    return data
+
+
+async def read_object(bucket, key, byte_range=None):
+    result = await bucket.get_object(key, byte_range=byte_range)
+    return result.status, await result.read()
+
+
+def test_revalidated_hit(run, oss, make_bucket, cache, data):
+    bucket = make_bucket(content_cache=cache)
+
+    assert run(read_object(bucket, 'k')) == (200, data)
+    assert run(read_object(bucket, 'k')) == (200, data)
+
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert oss.count('GET') == 2
+    assert cache.size == len(data)
+
+
+@pytest.mark.parametrize('byte_range, expected', [
+    ((10, 19), slice(10, 20)),
+    ((None, 5), slice(-5, None)),
+    ((199990, None), slice(199990, None)),
+    ((199990, 300000), slice(199990, None)),
+])
+def test_range_served_from_cache(run, make_bucket, cache, data, byte_range, expected):
+    bucket = make_bucket(content_cache=cache)
+    run(read_object(bucket, 'k'))
+
+    assert run(read_object(bucket, 'k', byte_range)) == (206, data[expected])
+    assert cache.hits == 1
+
+
+def test_chunked_read_from_cache(run, make_bucket, cache, data):
+    bucket = make_bucket(content_cache=cache)
+    run(read_object(bucket, 'k'))
+
+    async def read_chunks():
+        result = await bucket.get_object('k')
+        chunks = []
+        while True:
+            chunk = await result.read(7000)
+            if not chunk:
+                return chunks
+            chunks.append(chunk)
+
+    chunks = run(read_chunks())
+
+    assert b''.join(chunks) == data
+    assert max(len(c) for c in chunks) == 7000
+
+
+def test_changed_object_replaces_entry(run, oss, make_bucket, cache, data):
+    bucket = make_bucket(content_cache=cache)
+    run(read_object(bucket, 'k'))
+
+    oss.put('k', b'changed')
+    assert run(read_object(bucket, 'k')) == (200, b'changed')
+    assert run(read_object(bucket, 'k')) == (200, b'changed')
+
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert (len(cache), cache.size) == (1, len(b'changed'))
+
+
+def test_deleted_object(run, oss, make_bucket, cache, data):
+    bucket = make_bucket(content_cache=cache)
+    run(read_object(bucket, 'k'))
+
+    del oss.objects['k']
+    with pytest.raises(exceptions.NoSuchKey):
+        run(read_object(bucket, 'k'))
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_evicted_entry_counts_miss(run, make_bucket, cache, data):
+    bucket = make_bucket(content_cache=cache)
+    run(read_object(bucket, 'k'))
+
+    name = ('bk', 'k')
+    entry = cache.get(name)
+    cache.invalidate(name)
+
+    assert run(cache.open(name, entry)) is None
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_whole_body_read_not_copied(run, make_bucket, data):
+    cache = asyncoss.ContentCache(500000)
+    bucket = make_bucket(content_cache=cache)
+    run(read_object(bucket, 'k'))
+
+    async def read():
+        result = await bucket.get_object('k')
+        return await result.read()
+
+    assert run(read()) is cache.get(('bk', 'k')).data
+
+
+def test_eviction(run, oss, make_bucket, cache, data):
+    bucket = make_bucket(content_cache=cache)
+    oss.put('k2', os.urandom(200000))
+    oss.put('k3', os.urandom(200000))
+    oss.put('huge', os.urandom(600000))
+
+    for key in ['k', 'k2', 'k3', 'huge']:
+        assert run(read_object(bucket, key))[1] == oss.data(key)
+
+    assert cache.evictions == 1
+    assert cache.size == 400000
+    if cache.directory is not None:
+        assert len(os.listdir(cache.directory)) == 4
+
+
+def test_get_object_to_file(run, make_bucket, cache, data, tmp_path):
+    bucket = make_bucket(content_cache=cache)
+    filename = str(tmp_path / 'out')
+
+    for i in range(2):
+        run(bucket.get_object_to_file('k', filename))
+        with open(filename, 'rb') as f:
+            assert f.read() == data
+
+    assert cache.hits == 1
+
+
+def test_directory_reloaded(run, oss, make_bucket, tmp_path, data):
+    directory = str(tmp_path / 'cache')
+    bucket = make_bucket(content_cache=asyncoss.ContentCache(10 ** 7, directory=directory))
+    run(read_object(bucket, 'k'))
+
+    cache = asyncoss.ContentCache(10 ** 7, directory=directory)
+    assert (len(cache), cache.size) == (1, len(data))
+
+    bucket = make_bucket(content_cache=cache)
+    assert run(read_object(bucket, 'k')) == (200, data)
+    assert cache.hits == 1
+
+    cache = asyncoss.ContentCache(1000, directory=directory)
+    assert len(cache) == 0
+    assert os.listdir(directory) == []
+
+
+def test_leftover_files_swept(run, make_bucket, tmp_path, data):
+    directory = str(tmp_path / 'cache')
+    bucket = make_bucket(content_cache=asyncoss.ContentCache(10 ** 7, directory=directory))
+    run(read_object(bucket, 'k'))
+    entries = sorted(os.listdir(directory))
+
+    for name in ['x.tmp-1234', 'a' * 40 + '.json.tmp', 'b' * 40, 'c' * 40 + '.json.tmp-99']:
+        with open(os.path.join(directory, name), 'w') as f:
+            f.write('junk')
+
+    cache = asyncoss.ContentCache(10 ** 7, directory=directory)
+
+    assert len(cache) == 1
+    assert sorted(os.listdir(directory)) == entries
+
+
+def test_cancelled_store_leaves_no_files(run, oss, make_bucket, tmp_path):
+    directory = str(tmp_path / 'cache')
+    bucket = make_bucket(content_cache=asyncoss.ContentCache(10 ** 7, directory=directory))
+    oss.put('big', os.urandom(1 << 20))
+    oss.chunk_delay = 0.01
+
+    def temp_files():
+        return [name for name in os.listdir(directory) if cache_module._TMP_SUFFIX in name]
+
+    async def cancel_store():
+        task = asyncio.ensure_future(bucket.get_object('big'))
+        await asyncio.sleep(0.05)
+        assert len(temp_files()) == 1
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    run(cancel_store())
+
+    assert temp_files() == []
+    assert len(bucket.content_cache) == 0
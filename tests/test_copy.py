@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import os
+
+import pytest
+
+from asyncoss import exceptions
+
+
+PART_SIZE = 100 * 1024
+
+
+@pytest.fixture
+def data(oss):
+    data = os.urandom(PART_SIZE * 4 + 17)
+    oss.put('src key', data)
+    return data
+
+
+def test_multipart_copy(run, oss, bucket, data):
+    upload_part_copy = bucket.upload_part_copy
+    state = {'running': 0, 'max': 0}
+
+    async def slow_upload_part_copy(*args, **kwargs):
+        state['running'] += 1
+        state['max'] = max(state['max'], state['running'])
+        try:
+            await asyncio.sleep(0.01)
+            return await upload_part_copy(*args, **kwargs)
+        finally:
+            state['running'] -= 1
+
+    bucket.upload_part_copy = slow_upload_part_copy
+    run(bucket.copy_object_multipart('bk', 'src key', 'dst', multipart_threshold=1, part_size=PART_SIZE,
+                                     num_threads=3))
+
+    assert oss.data('dst') == data
+    assert oss.count('PUT', 'partNumber') == 5
+    assert state['max'] == 3
+
+
+def test_small_object_uses_single_copy(run, oss, bucket, data):
+    run(bucket.copy_object_multipart('bk', 'src key', 'dst'))
+
+    assert oss.data('dst') == data
+    assert oss.count('POST', 'uploads') == 0
+    assert oss.count('PUT') == 1
+
+
+def test_failed_part_aborts_upload(run, oss, bucket, data):
+    oss.failures = [None, None, None, ('code', 403, 'AccessDenied')]
+
+    with pytest.raises(exceptions.AccessDenied):
+        run(bucket.copy_object_multipart('bk', 'src key', 'dst', multipart_threshold=1, part_size=PART_SIZE,
+                                         num_threads=1))
+
+    assert 'dst' not in oss.objects
+    assert oss.uploads == {}
+    assert oss.count('DELETE', 'uploadId') == 1
+
+
+def test_abort_failure_keeps_part_error(run, oss, bucket, data):
+    oss.failures = [None, None, None, ('code', 403, 'AccessDenied'), ('code', 404, 'NoSuchUpload')]
+
+    with pytest.raises(exceptions.AccessDenied):
+        run(bucket.copy_object_multipart('bk', 'src key', 'dst', multipart_threshold=1, part_size=PART_SIZE,
+                                         num_threads=1))
+
+    assert oss.count('DELETE', 'uploadId') == 1
+
+
+def test_parts_pinned_to_source_etag(run, oss, bucket, data):
+    upload_part_copy = bucket.upload_part_copy
+
+    async def overwriting_upload_part_copy(*args, **kwargs):
+        result = await upload_part_copy(*args, **kwargs)
+        oss.put('src key', os.urandom(len(data)))
+        return result
+
+    bucket.upload_part_copy = overwriting_upload_part_copy
+    with pytest.raises(exceptions.PreconditionFailed):
+        run(bucket.copy_object_multipart('bk', 'src key', 'dst', multipart_threshold=1, part_size=PART_SIZE,
+                                         num_threads=1))
+
+    assert 'dst' not in oss.objects
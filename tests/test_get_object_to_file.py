@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+import time
+
+import pytest
+from oss2.exceptions import InconsistentError
+from oss2.utils import Crc64
+
+import fake_oss
+from asyncoss import api, utils
+
+
+@pytest.fixture
+def data(oss):
+    data = os.urandom(300 * 1024 + 17)
+    oss.put('obj', data)
+    return data
+
+
+def test_download_with_progress_and_crc(run, make_bucket, tmp_path, data):
+    bucket = make_bucket(enable_crc=True)
+    filename = str(tmp_path / 'out')
+    progress = []
+
+    result = run(bucket.get_object_to_file('obj', filename,
+                                           progress_callback=lambda consumed, total: progress.append((consumed, total))))
+
+    with open(filename, 'rb') as f:
+        assert f.read() == data
+    assert result.content_length == len(data)
+    assert progress[-1] == (len(data), len(data))
+
+
+def test_download_range(run, bucket, tmp_path, data):
+    filename = str(tmp_path / 'out')
+
+    run(bucket.get_object_to_file('obj', filename, byte_range=(10, 20)))
+
+    with open(filename, 'rb') as f:
+        assert f.read() == data[10:21]
+
+
+def test_crc_mismatch(run, monkeypatch, make_bucket, tmp_path, data):
+    monkeypatch.setattr(fake_oss, 'crc_of', lambda data: '1')
+    bucket = make_bucket(enable_crc=True)
+
+    with pytest.raises(InconsistentError):
+        run(bucket.get_object_to_file('obj', str(tmp_path / 'out')))
+
+
+class _SlowFile(object):
+    def __init__(self):
+        self.chunks = []
+        self.threads = set()
+
+    def write(self, buf):
+        time.sleep(0.001)
+        self.threads.add(threading.get_ident())
+        self.chunks.append(bytes(buf))
+
+
+def test_writes_run_off_loop_with_bounded_queue(run, monkeypatch, bucket, data):
+    monkeypatch.setattr(utils, '_WRITE_BATCH_SIZE', 4096)
+    f = _SlowFile()
+    ahead = []
+
+    async def download():
+        result = await bucket.get_object('obj')
+        crc = Crc64()
+        await utils.copyfileobj_and_verify(result.resp, f, len(data), chunk_size=4096, crc=crc,
+                                           progress_callback=lambda consumed, total: ahead.append(
+                                               consumed // 4096 - len(f.chunks)))
+        return crc.crc
+
+    crc = run(download())
+
+    assert b''.join(f.chunks) == data
+    assert threading.get_ident() not in f.threads
+    assert max(ahead) <= utils._WRITE_QUEUE_DEPTH + 2
+    assert str(crc) == fake_oss.crc_of(data)
+
+
+def test_writes_batched(run, loop, bucket, data):
+    f = _SlowFile()
+    hops = []
+    run_in_executor = loop.run_in_executor
+
+    def spy(executor, func, *args):
+        hops.append(func)
+        return run_in_executor(executor, func, *args)
+
+    loop.run_in_executor = spy
+
+    async def download():
+        result = await bucket.get_object('obj')
+        await utils.copyfileobj_and_verify(result.resp, f, len(data), chunk_size=4096)
+
+    run(download())
+
+    assert b''.join(f.chunks) == data
+    assert len(hops) == 1
+
+
+def test_file_opened_off_loop(run, monkeypatch, bucket, tmp_path, data):
+    threads = []
+
+    def spy_open(*args):
+        threads.append(threading.get_ident())
+        return open(*args)
+
+    monkeypatch.setattr(api, 'open', spy_open, raising=False)
+    filename = str(tmp_path / 'out')
+
+    run(bucket.get_object_to_file('obj', filename))
+
+    with open(filename, 'rb') as f:
+        assert f.read() == data
+    assert threads and threading.get_ident() not in threads
+
+
+def test_range_header_skips_crc(run, make_bucket, tmp_path, data):
+    bucket = make_bucket(enable_crc=True)
+    filename = str(tmp_path / 'out')
+
+    run(bucket.get_object_to_file('obj', filename, headers={'range': 'bytes=10-20'}))
+
+    with open(filename, 'rb') as f:
+        assert f.read() == data[10:21]
+
+
+def test_response_closed_on_error(run, monkeypatch, oss, bucket, tmp_path, data):
+    oss.chunk_delay = 0.01
+    results = []
+    get_object = bucket.get_object
+
+    async def spy(*args, **kwargs):
+        result = await get_object(*args, **kwargs)
+        results.append(result)
+        return result
+
+    async def broken_copy(resp, fileobj, expected_len, **kwargs):
+        await resp.read(1000)
+        raise IOError('disk full')
+
+    monkeypatch.setattr(bucket, 'get_object', spy)
+    monkeypatch.setattr(api, 'copyfileobj_and_verify', broken_copy)
+
+    with pytest.raises(IOError):
+        run(bucket.get_object_to_file('obj', str(tmp_path / 'out')))
+
+    assert results[0].resp.response.closed
+
+
+def test_incomplete_read(run, bucket, data, tmp_path):
+    async def download():
+        result = await bucket.get_object('obj')
+        with open(str(tmp_path / 'out'), 'wb') as f:
+            await utils.copyfileobj_and_verify(result.resp, f, len(data) + 1)
+
+    with pytest.raises(InconsistentError):
+        run(download())
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import time
+
+import pytest
+
+import asyncoss
+from asyncoss import exceptions
+from asyncoss.hedging import HedgePolicy
+
+
+@pytest.fixture
+def policy():
+    return HedgePolicy(initial_delay=0.05, min_samples=5)
+
+
+@pytest.fixture
+def hedged_bucket(make_bucket, oss, policy):
+    oss.put('a', b'hello')
+    return make_bucket(hedge_policy=policy)
+
+
+def elapsed(run, coro):
+    started = time.monotonic()
+    result = run(coro)
+    return time.monotonic() - started, result
+
+
+async def read_object(bucket, key):
+    result = await bucket.get_object(key)
+    return await result.read()
+
+
+def test_delay_percentile():
+    policy = HedgePolicy(percentile=95, initial_delay=0.5, min_delay=0.001, min_samples=10)
+    assert policy.delay() == 0.5
+
+    for i in range(100):
+        policy.record((i + 1) / 1000.0)
+
+    assert policy.delay() == 0.096
+
+
+def test_delay_initial_until_min_samples():
+    policy = HedgePolicy(initial_delay=0.5, min_delay=0, min_samples=10)
+
+    for i in range(9):
+        policy.record(0.01)
+        assert policy.delay() == 0.5
+
+    policy.record(0.01)
+    assert policy.delay() == 0.01
+
+
+@pytest.mark.parametrize('latency, delay', [(0.0001, 0.005), (10, 2.0)])
+def test_delay_clamped(latency, delay):
+    policy = HedgePolicy(min_samples=1)
+    policy.record(latency)
+
+    assert policy.delay() == delay
+
+
+def test_delay_window():
+    policy = HedgePolicy(percentile=50, min_delay=0, window=64, min_samples=1)
+
+    for i in range(64):
+        policy.record(1.0)
+    for i in range(64):
+        policy.record(0.01)
+
+    assert policy.delay() == 0.01
+
+
+def test_samples_recorded(run, hedged_bucket, policy):
+    for i in range(10):
+        run(hedged_bucket.head_object('a'))
+
+    assert policy.delay() < 0.05
+    assert policy.hedged == 0
+
+
+@pytest.mark.parametrize('failure', [('stall', 0.5), ('late', 0.5)])
+def test_slow_get_hedged(run, oss, hedged_bucket, policy, failure):
+    oss.failures = [failure]
+
+    seconds, body = elapsed(run, read_object(hedged_bucket, 'a'))
+
+    assert body == b'hello'
+    assert seconds < 0.4
+    assert (policy.hedged, policy.hedge_wins) == (1, 1)
+    assert oss.count('GET') == 2
+
+
+def test_slow_head_hedged(run, oss, hedged_bucket, policy):
+    oss.failures = [('stall', 0.5)]
+
+    seconds, result = elapsed(run, hedged_bucket.head_object('a'))
+
+    assert result.content_length == 5
+    assert seconds < 0.4
+    assert policy.hedge_wins == 1
+
+
+def test_fast_error_not_hedged(run, oss, hedged_bucket, policy):
+    oss.failures = [404]
+
+    with pytest.raises(exceptions.ServerError):
+        run(hedged_bucket.get_object('a'))
+
+    assert policy.hedged == 0
+
+
+def test_original_wins_when_hedge_fails(run, oss, hedged_bucket, policy):
+    oss.failures = [('stall', 0.2), ('code', 503, 'ServiceUnavailable')]
+
+    assert run(read_object(hedged_bucket, 'a')) == b'hello'
+    assert (policy.hedged, policy.hedge_wins) == (1, 0)
+
+
+def test_definitive_error_wins(run, oss, hedged_bucket, policy):
+    oss.failures = [('stall', 0.5), ('code', 404, 'NoSuchKey')]
+
+    started = time.monotonic()
+    with pytest.raises(exceptions.NoSuchKey):
+        run(hedged_bucket.get_object('a'))
+
+    assert time.monotonic() - started < 0.4
+    assert (policy.hedged, policy.hedge_wins) == (1, 1)
+
+
+def test_cancelled_loser_recorded(run, oss, hedged_bucket, policy):
+    oss.failures = [('stall', 0.5)]
+
+    async def get_and_settle():
+        body = await read_object(hedged_bucket, 'a')
+        await asyncio.sleep(0)
+        return body
+
+    assert run(get_and_settle()) == b'hello'
+
+    samples = policy._HedgePolicy__samples
+    assert len(samples) == 2
+    assert max(samples) >= 0.05
+
+
+def test_both_fail(run, oss, make_bucket, policy):
+    bucket = make_bucket(hedge_policy=policy, retry_policy=asyncoss.RetryPolicy(max_retries=0))
+    oss.failures = [('stall', 0.2), ('code', 403, 'AccessDenied')]
+
+    with pytest.raises(exceptions.ServerError) as e:
+        run(bucket.get_object('missing'))
+
+    assert e.value.status == 403
+    assert policy.hedged == 1
+
+
+def test_writes_not_hedged(run, oss, hedged_bucket, policy):
+    oss.failures = [('stall', 0.2)]
+
+    run(hedged_bucket.put_object('p', b'x'))
+
+    assert oss.count('PUT') == 1
+    assert policy.hedged == 0
+
+
+def test_loser_released(run, oss, policy):
+    oss.put('a', b'hello')
+    oss.failures = [('late', 0.2)]
+
+    async def get():
+        pool = asyncoss.ConnectionPool()
+        try:
+            async with asyncoss.Bucket(asyncoss.Auth('ak', 'sk'), oss.endpoint, 'bk', connection_pool=pool,
+                                       hedge_policy=policy) as bucket:
+                body = await read_object(bucket, 'a')
+                await asyncio.sleep(0.3)
+                return body, pool.in_use
+        finally:
+            await pool.close()
+
+    assert run(get()) == (b'hello', 0)
+
+
+def test_cancelled(run, oss, hedged_bucket, policy):
+    oss.failures = [('stall', 0.5), ('stall', 0.5)]
+
+    async def cancel():
+        task = asyncio.ensure_future(hedged_bucket.get_object('a'))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        return policy.hedged, await read_object(hedged_bucket, 'a')
+
+    assert run(cancel()) == (1, b'hello')
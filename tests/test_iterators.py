@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import gc
+
+import pytest
+
+import asyncoss
+from asyncoss import exceptions
+
+
+@pytest.fixture
+def keys(oss):
+    keys = ['k{0:03d}'.format(i) for i in range(95)]
+    for key in keys:
+        oss.put(key, b'x')
+    return keys
+
+
+async def collect(iterator):
+    return [info.key async for info in iterator]
+
+
+def prefetch_task(iterator):
+    return iterator._BaseIterator__prefetch_task
+
+
+@pytest.mark.parametrize('prefetch', [0, 1, 3])
+def test_prefetch_returns_all_entries(run, bucket, keys, prefetch):
+    assert run(collect(asyncoss.ObjectIterator(bucket, max_keys=10, prefetch=prefetch))) == keys
+
+
+def test_next_page_fetched_while_consuming(run, oss, bucket, keys):
+    async def consume_first():
+        iterator = asyncoss.ObjectIterator(bucket, max_keys=10, prefetch=2)
+        await iterator.__anext__()
+        await asyncio.sleep(0.05)
+        iterator.close()
+
+    run(consume_first())
+
+    assert oss.count('GET') == 3
+
+
+def test_prefetch_parts(run, bucket):
+    async def upload_and_list():
+        upload_id = (await bucket.init_multipart_upload('obj')).upload_id
+        for n in range(1, 8):
+            await bucket.upload_part('obj', upload_id, n, b'x' * n)
+
+        return [part.size async for part in asyncoss.PartIterator(bucket, 'obj', upload_id, max_parts=2, prefetch=2)]
+
+    assert run(upload_and_list()) == list(range(1, 8))
+
+
+def test_prefetch_error_propagates(run, oss, bucket, keys):
+    oss.failures = [None, ('code', 403, 'AccessDenied')]
+
+    with pytest.raises(exceptions.AccessDenied):
+        run(collect(asyncoss.ObjectIterator(bucket, max_keys=10, prefetch=2)))
+
+
+def test_prefetch_resumes_after_error(run, oss, bucket, keys):
+    oss.failures = [None, ('code', 403, 'AccessDenied')]
+
+    async def collect_after_error():
+        iterator = asyncoss.ObjectIterator(bucket, max_keys=10, prefetch=2)
+        result = []
+        with pytest.raises(exceptions.AccessDenied):
+            async for info in iterator:
+                result.append(info.key)
+
+        result.append((await asyncio.wait_for(iterator.__anext__(), 1)).key)
+        return result + await collect(iterator)
+
+    assert run(collect_after_error()) == keys
+
+
+def test_aexit_cancels_prefetch(run, oss, bucket, keys):
+    async def break_early():
+        async with asyncoss.ObjectIterator(bucket, max_keys=10, prefetch=3) as iterator:
+            async for info in iterator:
+                break
+
+        await asyncio.sleep(0.01)
+        return prefetch_task(iterator)
+
+    task = run(break_early())
+
+    assert task.cancelled()
+    assert oss.count('GET') < 5
+
+
+def test_abandoned_iterator_cancels_prefetch(run, oss, bucket, keys):
+    async def abandon():
+        iterator = asyncoss.ObjectIterator(bucket, max_keys=10, prefetch=3)
+        async for info in iterator:
+            break
+
+        await asyncio.sleep(0.05)
+        task = prefetch_task(iterator)
+        assert not task.done()
+
+        del iterator
+        gc.collect()
+        await asyncio.sleep(0.01)
+        return task
+
+    task = run(abandon())
+
+    assert task.cancelled()
+    assert oss.count('GET') == 4
+
+
+@pytest.mark.parametrize('prefetch', [0, 2])
+def test_pages(run, bucket, keys, prefetch):
+    async def collect_pages():
+        return [[info.key for info in page]
+                async for page in asyncoss.ObjectIterator(bucket, max_keys=10, prefetch=prefetch).pages()]
+
+    pages = run(collect_pages())
+
+    assert [len(page) for page in pages] == [10] * 9 + [5]
+    assert sum(pages, []) == keys
+
+
+def test_pages_after_partial_iteration(run, bucket, keys):
+    async def collect_pages():
+        iterator = asyncoss.ObjectIterator(bucket, max_keys=10)
+        first = [(await iterator.__anext__()).key for i in range(3)]
+        return first, [[info.key for info in page] async for page in iterator.pages()]
+
+    first, pages = run(collect_pages())
+
+    assert first == keys[:3]
+    assert pages[0] == keys[3:10]
+    assert first + sum(pages, []) == keys
+
+
+def test_pages_skips_empty_pages(run, oss, bucket):
+    oss.put('a', b'x')
+
+    async def collect_pages():
+        return [page async for page in asyncoss.ObjectIterator(bucket, prefix='missing/').pages()]
+
+    assert run(collect_pages()) == []
+
+
+def test_aiter_is_synchronous(bucket):
+    iterator = asyncoss.ObjectIterator(bucket)
+
+    assert iterator.__aiter__() is iterator
+
+
+def test_max_retries_deprecated(run, bucket, keys):
+    with pytest.warns(DeprecationWarning, match='max_retries'):
+        it = asyncoss.ObjectIterator(bucket, max_keys=10, max_retries=3)
+    assert run(collect(it)) == keys
+
+    with pytest.warns(DeprecationWarning, match='max_retries'):
+        asyncoss.ShardedObjectIterator(bucket, max_retries=3)
+
+
+def test_fetch_with_retry_deprecated(run, bucket, keys):
+    it = asyncoss.ObjectIterator(bucket, max_keys=10)
+    with pytest.warns(DeprecationWarning, match='fetch_with_retry'):
+        run(it.fetch_with_retry())
+    assert [info.key for info in it.entries] == keys[:10]
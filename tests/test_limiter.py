@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import time
+
+import pytest
+
+import asyncoss
+from asyncoss import exceptions
+from asyncoss.limiter import AdaptiveLimiter, is_throttling_error
+
+
+def server_error(status, code=''):
+    return exceptions.ServerError(status, {}, b'', {'Code': code})
+
+
+def acquire_all(run, limiter, n):
+    return [run(limiter.acquire()) for i in range(n)]
+
+
+def test_additive_increase(run):
+    limiter = AdaptiveLimiter(initial_limit=4, max_limit=6, latency_tolerance=None)
+
+    for i in range(10):
+        for started in acquire_all(run, limiter, limiter.limit):
+            limiter.release(started)
+
+    assert limiter.limit == 6
+    assert limiter.in_flight == 0
+
+
+def test_no_increase_when_underused(run):
+    limiter = AdaptiveLimiter(initial_limit=8, latency_tolerance=None)
+
+    for i in range(100):
+        limiter.release(run(limiter.acquire()))
+
+    assert limiter.limit == 8
+
+
+@pytest.mark.parametrize('error', [
+    server_error(503),
+    server_error(429),
+    server_error(400, 'SlowDown'),
+    server_error(500, 'ServerBusy'),
+    exceptions.RequestError(asyncio.TimeoutError()),
+])
+def test_multiplicative_decrease(run, error):
+    limiter = AdaptiveLimiter(initial_limit=10, backoff_ratio=0.5)
+
+    limiter.release(run(limiter.acquire()), error)
+
+    assert limiter.limit == 5
+    assert limiter.throttled == 1
+
+
+def test_decrease_once_per_congestion(run):
+    limiter = AdaptiveLimiter(initial_limit=16, backoff_ratio=0.5)
+    started = acquire_all(run, limiter, 3)
+
+    for s in started:
+        limiter.release(s, server_error(503))
+    assert limiter.limit == 8
+
+    limiter.release(run(limiter.acquire()), server_error(503))
+    assert limiter.limit == 4
+    assert limiter.throttled == 4
+
+
+def test_min_limit(run):
+    limiter = AdaptiveLimiter(initial_limit=2, min_limit=2, backoff_ratio=0.5)
+
+    limiter.release(run(limiter.acquire()), server_error(503))
+
+    assert limiter.limit == 2
+
+
+def test_other_errors_ignored(run):
+    limiter = AdaptiveLimiter(initial_limit=10)
+
+    for error in [server_error(404), server_error(500), exceptions.RequestError(OSError())]:
+        limiter.release(run(limiter.acquire()), error)
+
+    assert (limiter.limit, limiter.throttled) == (10, 0)
+
+
+def test_latency_congestion():
+    limiter = AdaptiveLimiter(initial_limit=10, backoff_ratio=0.5, latency_tolerance=3.0)
+
+    limiter.release(time.monotonic() - 0.01)
+    assert limiter.base_latency == pytest.approx(0.01, abs=0.005)
+
+    limiter.release(time.monotonic() - 0.2, measure_latency=False)
+    assert limiter.limit == 10
+
+    limiter.release(time.monotonic() - 0.2)
+    assert limiter.limit == 5
+    assert limiter.throttled == 0
+
+
+def test_latency_ignored_without_tolerance():
+    limiter = AdaptiveLimiter(initial_limit=10, latency_tolerance=None)
+
+    limiter.release(time.monotonic() - 0.01)
+    limiter.release(time.monotonic() - 1)
+
+    assert limiter.limit == 10
+
+
+def test_waiters(run):
+    limiter = AdaptiveLimiter(initial_limit=1, max_limit=1)
+
+    async def queue():
+        first = await limiter.acquire()
+        waiters = [asyncio.ensure_future(limiter.acquire()) for i in range(3)]
+        await asyncio.sleep(0)
+        assert not any(w.done() for w in waiters)
+
+        # 排队中被取消的等待者不占用名额
+        waiters[0].cancel()
+        limiter.release(first)
+        await asyncio.sleep(0)
+        assert [w.done() for w in waiters] == [True, True, False]
+
+        # 已经分配到名额却被取消的等待者把名额交给下一个
+        limiter.release(waiters[1].result())
+        waiters[2].cancel()
+        await asyncio.sleep(0)
+        return limiter.in_flight
+
+    assert run(queue()) == 0
+
+
+def test_bucket_concurrency_bounded(run, oss, make_bucket):
+    limiter = AdaptiveLimiter(initial_limit=3, max_limit=3)
+    bucket = make_bucket(concurrency_limiter=limiter)
+    oss.put('a', b'x')
+    oss.get_delay = 0.01
+
+    async def gets():
+        results = await asyncio.gather(*[bucket.get_object('a') for i in range(12)])
+        return [await r.read() for r in results]
+
+    assert run(gets()) == [b'x'] * 12
+    assert oss.max_in_flight == 3
+    assert limiter.in_flight == 0
+
+
+def test_bucket_throttled(run, oss, make_bucket):
+    limiter = AdaptiveLimiter(initial_limit=10, backoff_ratio=0.5)
+    bucket = make_bucket(concurrency_limiter=limiter, retry_policy=asyncoss.RetryPolicy(max_retries=0))
+    oss.put('a', b'x')
+    oss.failures = [('code', 400, 'SlowDown')]
+
+    with pytest.raises(exceptions.ServerError):
+        run(bucket.get_object('a'))
+    run(bucket.head_object('a'))
+
+    assert (limiter.limit, limiter.throttled, limiter.in_flight) == (5, 1, 0)
+
+
+def test_bucket_cancelled_requests(run, oss, make_bucket):
+    limiter = AdaptiveLimiter(initial_limit=4)
+    bucket = make_bucket(concurrency_limiter=limiter)
+    oss.put('a', b'x')
+    oss.get_delay = 0.05
+
+    async def cancel():
+        task = asyncio.ensure_future(asyncio.gather(*[bucket.get_object('a') for i in range(20)]))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+
+        return limiter.in_flight, await (await bucket.get_object('a')).read()
+
+    assert run(cancel()) == (0, b'x')
+
+
+def test_is_throttling_error():
+    assert is_throttling_error(server_error(503))
+    assert is_throttling_error(server_error(403, 'RequestRateLimited'))
+    assert not is_throttling_error(server_error(500, 'InternalError'))
+    assert not is_throttling_error(exceptions.RequestError(ConnectionResetError()))
+    assert not is_throttling_error(None)
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import time
+
+import pytest
+
+import asyncoss
+from asyncoss import exceptions
+
+
+@pytest.fixture
+def cache():
+    return asyncoss.MetadataCache(max_entries=10, ttl=60)
+
+
+@pytest.fixture
+def cached_bucket(make_bucket, cache):
+    return make_bucket(metadata_cache=cache)
+
+
+def test_cache_hits(run, oss, cached_bucket, cache):
+    oss.put('a', b'hello')
+
+    for i in range(3):
+        assert run(cached_bucket.head_object('a')).content_length == 5
+        assert run(cached_bucket.object_exists('a'))
+
+    assert oss.count('HEAD') == 1
+    assert oss.count('GET') == 1
+    assert (cache.hits, cache.misses) == (4, 2)
+
+
+def test_negative_results_cached(run, oss, make_bucket):
+    bucket = make_bucket(metadata_cache=asyncoss.MetadataCache(negative_ttl=0.05))
+
+    assert not run(bucket.object_exists('missing'))
+    with pytest.raises(exceptions.NoSuchKey):
+        run(bucket.get_object_meta('missing'))
+    assert oss.count('GET') == 1
+
+    time.sleep(0.06)
+    oss.put('missing', b'x')
+    assert run(bucket.object_exists('missing'))
+
+
+def test_expiry(run, oss, make_bucket):
+    bucket = make_bucket(metadata_cache=asyncoss.MetadataCache(ttl=0.05))
+    oss.put('a', b'x')
+
+    run(bucket.head_object('a'))
+    time.sleep(0.06)
+    run(bucket.head_object('a'))
+
+    assert oss.count('HEAD') == 2
+
+
+def test_lru_eviction():
+    cache = asyncoss.MetadataCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (1, None, 3)
+    assert cache.evictions == 1
+
+
+@pytest.mark.parametrize('modify', [
+    lambda bucket: bucket.put_object('a', b'longer'),
+    lambda bucket: bucket.delete_object('a'),
+    lambda bucket: bucket.batch_delete_objects(['a']),
+    lambda bucket: bucket.copy_object('bk', 'b', 'a'),
+])
+def test_writes_invalidate(run, oss, cached_bucket, modify):
+    oss.put('a', b'x')
+    oss.put('b', b'source')
+    run(cached_bucket.object_exists('a'))
+    run(cached_bucket.head_object('a'))
+
+    run(modify(cached_bucket))
+
+    exists = 'a' in oss.objects
+    assert run(cached_bucket.object_exists('a')) == exists
+    if exists:
+        assert run(cached_bucket.head_object('a')).content_length == len(oss.data('a'))
+
+
+@pytest.mark.parametrize('single_flight', [None, asyncoss.SingleFlight])
+def test_stale_result_not_cached(run, oss, make_bucket, cache, single_flight):
+    bucket = make_bucket(metadata_cache=cache, single_flight=single_flight and single_flight())
+    oss.put('k', b'old')
+
+    async def race():
+        oss.failures = [('late', 0.2)]
+        stale = asyncio.ensure_future(bucket.head_object('k'))
+        await asyncio.sleep(0.05)
+
+        await bucket.put_object('k', b'newer')
+        fresh = asyncio.ensure_future(bucket.head_object('k'))
+
+        return (await stale).content_length, (await fresh).content_length, (await bucket.head_object('k')).content_length
+
+    assert run(race()) == (3, 5, 5)
+    assert cache._MetadataCache__generations == {}
+
+
+def test_generation():
+    cache = asyncoss.MetadataCache()
+
+    generation = cache.begin('a')
+    cache.invalidate('a')
+    cache.put('a', 1, generation=generation)
+    cache.end('a')
+    assert cache.get('a') is None
+
+    generation = cache.begin('a')
+    cache.put('a', 2, generation=generation)
+    cache.end('a')
+    assert cache.get('a') == 2
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from oss2.utils import http_to_unixtime
+
+from asyncoss import models
+
+
+class _Response(object):
+    def __init__(self, headers):
+        self.status = 200
+        self.headers = headers
+        self.request_id = 'id'
+
+
+class _RecordingHeaders(dict):
+    def __init__(self, *args, **kwargs):
+        super(_RecordingHeaders, self).__init__(*args, **kwargs)
+        self.accessed = []
+
+    def __getitem__(self, key):
+        self.accessed.append(key)
+        return super(_RecordingHeaders, self).__getitem__(key)
+
+
+HEADERS = {
+    'etag': '"ABC"',
+    'content-length': '10',
+    'content-type': 'text/plain',
+    'last-modified': 'Wed, 01 Jan 2020 00:00:00 GMT',
+    'x-oss-object-type': 'Normal',
+    'x-oss-hash-crc64ecma': '123',
+}
+
+
+@pytest.mark.parametrize('obj', [
+    models.PartInfo(1, 'etag', size=1),
+    models.SimplifiedObjectInfo('key', 0, 'etag', 'Normal', 1, 'Standard'),
+    models.SimplifiedBucketInfo('bk', 'oss-cn-hangzhou', 0, 'e', 'i', 'Standard'),
+    models.MultipartUploadInfo('key', 'id', 0),
+    models.Owner('name', 'id'),
+])
+def test_entries_use_slots(obj):
+    assert not hasattr(obj, '__dict__')
+    with pytest.raises(AttributeError):
+        obj.unknown = 1
+
+
+def test_header_fields_parsed_lazily():
+    headers = _RecordingHeaders(HEADERS)
+    result = models.HeadObjectResult(_Response(headers))
+
+    assert headers.accessed == []
+
+    assert result.last_modified == http_to_unixtime(HEADERS['last-modified'])
+    assert headers.accessed == ['last-modified']
+
+    assert result.last_modified == http_to_unixtime(HEADERS['last-modified'])
+    assert headers.accessed == ['last-modified']
+
+
+def test_header_fields():
+    result = models.HeadObjectResult(_Response(dict(HEADERS)))
+
+    assert result.etag == 'ABC'
+    assert result.content_length == 10
+    assert result.content_type == 'text/plain'
+    assert result.object_type == 'Normal'
+    assert result.server_crc == 123
+
+
+def test_missing_header_fields_are_none():
+    result = models.GetObjectMetaResult(_Response({}))
+
+    assert result.etag is None
+    assert result.content_length is None
+    assert result.last_modified is None
+
+
+def test_head_and_get_object(run, oss, bucket):
+    oss.put('obj', b'0123456789', mtime=1577836800)
+
+    head = run(bucket.head_object('obj'))
+    assert (head.content_length, head.last_modified, head.etag) == (10, 1577836800, oss.objects['obj'][1])
+
+    async def get():
+        result = await bucket.get_object('obj', byte_range=(2, 4))
+        return result.content_length, await result.read()
+
+    assert run(get()) == (3, b'234')
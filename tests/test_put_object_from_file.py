@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import threading
+
+import pytest
+from oss2.exceptions import InconsistentError
+
+import fake_oss
+from asyncoss import http
+
+
+@pytest.fixture
+def local_file(tmp_path):
+    data = os.urandom(300 * 1024 + 17)
+    path = tmp_path / 'local'
+    path.write_bytes(data)
+    return str(path), data
+
+
+def test_upload_file(run, oss, bucket, local_file):
+    filename, data = local_file
+
+    run(bucket.put_object_from_file('obj', filename))
+
+    assert oss.data('obj') == data
+
+
+def test_upload_empty_file(run, oss, bucket, tmp_path):
+    path = tmp_path / 'empty'
+    path.write_bytes(b'')
+
+    run(bucket.put_object_from_file('obj', str(path)))
+
+    assert oss.data('obj') == b''
+
+
+def test_upload_with_progress(run, oss, bucket, local_file):
+    filename, data = local_file
+    progress = []
+
+    run(bucket.put_object_from_file('obj', filename, progress_callback=lambda consumed, total: progress.append(consumed)))
+
+    assert oss.data('obj') == data
+    assert progress[-1] == len(data)
+
+
+def test_upload_with_crc(run, oss, make_bucket, local_file):
+    filename, data = local_file
+    bucket = make_bucket(enable_crc=True)
+
+    result = run(bucket.put_object_from_file('obj', filename))
+
+    assert oss.data('obj') == data
+    assert result.crc == int(fake_oss.crc_of(data))
+
+
+def test_crc_mismatch(run, monkeypatch, make_bucket, local_file):
+    filename, data = local_file
+    bucket = make_bucket(enable_crc=True)
+    monkeypatch.setattr(fake_oss, 'crc_of', lambda data: '1')
+
+    with pytest.raises(InconsistentError):
+        run(bucket.put_object_from_file('obj', filename))
+
+
+@pytest.mark.parametrize('body, expected', [
+    (io.BytesIO(b'file object'), b'file object'),
+    (iter([b'a', b'bc']), b'abc'),
+    ('str', b'str'),
+    (bytearray(b'bytearray'), b'bytearray'),
+])
+def test_put_object_bodies(run, oss, bucket, body, expected):
+    run(bucket.put_object('obj', body))
+
+    assert oss.data('obj') == expected
+
+
+def test_sync_body_read_in_executor(run):
+    threads = set()
+
+    class Reader(object):
+        def __init__(self):
+            self.chunks = [b'a' * http._READ_CHUNK_SIZE, b'b']
+
+        def read(self, n):
+            threads.add(threading.get_ident())
+            return self.chunks.pop(0) if self.chunks else b''
+
+    async def read_all(adapter):
+        return b''.join([chunk async for chunk in adapter])
+
+    adapter = http._convert_request_body(Reader())
+
+    assert isinstance(adapter, http._AsyncReadAdapter)
+    assert run(read_all(adapter)) == b'a' * http._READ_CHUNK_SIZE + b'b'
+    assert threading.get_ident() not in threads
+
+
+def test_adapter_rewind(run):
+    async def read_all(adapter):
+        return b''.join([chunk async for chunk in adapter])
+
+    f = io.BytesIO(b'0123456789')
+    f.seek(3)
+    adapter = http._AsyncReadAdapter(f)
+
+    assert run(read_all(adapter)) == b'3456789'
+    assert adapter.seekable()
+    adapter.rewind()
+    assert run(read_all(adapter)) == b'3456789'
+    assert not http._AsyncReadAdapter(iter([b'x'])).seekable()
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+import io
+
+import oss2
+import oss2.api
+import pytest
+from requests.structures import CaseInsensitiveDict
+
+from asyncoss import http
+from asyncoss.api import _UrlMaker
+
+
+ENDPOINTS = [
+    ('http://oss-cn-hangzhou.aliyuncs.com', False),
+    ('https://oss-cn-hangzhou.aliyuncs.com', False),
+    ('http://127.0.0.1:8080', False),
+    ('http://[::1]:8080', False),
+    ('http://static.example.com', True),
+]
+
+KEYS = ['', 'a.txt', 'dir/sub/x-1_2.json', 'a b+c', '中文/文件', '~tilde', 'q?x=1&y#z', 'pct%2F', '/lead//double']
+
+
+@pytest.mark.parametrize('endpoint, is_cname', ENDPOINTS)
+@pytest.mark.parametrize('bucket_name', ['my-bucket', ''])
+def test_url_same_as_oss2(endpoint, is_cname, bucket_name):
+    make_url = _UrlMaker(endpoint, is_cname)
+    expected = oss2.api._UrlMaker(endpoint, is_cname, False)
+
+    for key in KEYS:
+        if not bucket_name and key and not is_cname:
+            continue
+        for slash_safe in (False, True):
+            assert make_url(bucket_name, key, slash_safe) == expected(bucket_name, key, slash_safe)
+            assert make_url.type == expected.type
+
+
+def test_url_prefix_cached_per_bucket():
+    make_url = _UrlMaker('http://oss-cn-hangzhou.aliyuncs.com', False)
+
+    assert make_url('bucket-a', 'k') == 'http://bucket-a.oss-cn-hangzhou.aliyuncs.com/k'
+    assert make_url('bucket-b', 'x/y') == 'http://bucket-b.oss-cn-hangzhou.aliyuncs.com/x%2Fy'
+    assert make_url('bucket-a', 'x/y', slash_safe=True) == 'http://bucket-a.oss-cn-hangzhou.aliyuncs.com/x/y'
+
+    # 不合法的Bucket名按IP方式访问
+    assert make_url('a', 'k') == 'http://oss-cn-hangzhou.aliyuncs.com/a/k'
+
+
+def test_default_headers():
+    req = http.Request('GET', 'http://x/k', app_name='app')
+
+    assert req.headers['Accept-Encoding'] == ''
+    assert req.headers['User-Agent'].endswith('/app')
+    assert 'Content-Length' not in req.headers
+    assert req.data is None
+    assert req.params == {}
+
+
+def test_user_agent_cached():
+    first = http.Request('GET', 'http://x/k').headers['User-Agent']
+    second = http.Request('GET', 'http://x/k').headers['User-Agent']
+
+    assert first is second
+    assert first == http._USER_AGENT
+
+
+def test_given_headers_kept():
+    headers = CaseInsensitiveDict({'user-agent': 'mine', 'Range': 'bytes=0-9'})
+    req = http.Request('GET', 'http://x/k', headers=headers)
+
+    assert req.headers is headers
+    assert req.headers['User-Agent'] == 'mine'
+    assert req.headers['Accept-Encoding'] == ''
+
+    req = http.Request('GET', 'http://x/k', headers={'Range': 'bytes=0-9'})
+    assert isinstance(req.headers, CaseInsensitiveDict)
+    assert req.headers['range'] == 'bytes=0-9'
+
+
+@pytest.mark.parametrize('data', [b'abc', bytearray(b'abc'), memoryview(b'abc')])
+def test_buffer_body_not_converted(data):
+    req = http.Request('PUT', 'http://x/k', data=data)
+
+    assert req.data is data
+    assert req.can_rewind()
+
+
+def test_str_body_encoded():
+    req = http.Request('PUT', 'http://x/k', data='中文')
+
+    assert req.data == '中文'.encode('utf-8')
+
+
+def test_file_body():
+    f = io.BytesIO(b'xxabc')
+    f.seek(2)
+    req = http.Request('PUT', 'http://x/k', data=f)
+
+    assert isinstance(req.data, http._AsyncReadAdapter)
+    assert req.headers['Content-Length'] == '3'
+    assert req.can_rewind()
+
+
+def test_iterable_body():
+    req = http.Request('PUT', 'http://x/k', data=iter([b'a', b'b']))
+
+    assert 'Content-Length' not in req.headers
+    assert not req.can_rewind()
+    assert not req.rewind()
+
+
+def test_copy():
+    req = http.Request('GET', 'http://x/k', data=b'abc')
+    copied = req.copy()
+    copied.headers['Authorization'] = 'x'
+
+    assert 'Authorization' not in req.headers
+    assert copied.data is req.data
+    assert (copied.method, copied.url) == (req.method, req.url)
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+import array
+import os
+import tracemalloc
+
+import pytest
+
+import asyncoss
+from asyncoss import http
+
+
+SIZE = 4 * 1024 * 1024
+
+
+@pytest.fixture
+def data(oss):
+    data = os.urandom(SIZE)
+    oss.put('big', data)
+    return data
+
+
+def traced_peak(run, coro):
+    tracemalloc.start()
+    try:
+        result = run(coro)
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+async def raw_request(bucket, method, key, headers=None):
+    req = http.Request(method, bucket._make_url(bucket.bucket_name, key), headers=headers)
+    bucket.auth._sign_request(req, bucket.bucket_name, key)
+    return await bucket.session.do_request(req)
+
+
+def test_read_single_copy(run, bucket, data):
+    result = run(bucket.get_object('big'))
+
+    body, peak = traced_peak(run, result.read())
+
+    assert type(body) is bytes
+    assert body == data
+    assert peak < SIZE * 1.5
+    assert run(result.read()) == b''
+
+
+def test_readinto(run, bucket, data):
+    result = run(bucket.get_object('big'))
+    buf = bytearray(SIZE + 10)
+
+    n, peak = traced_peak(run, result.readinto(buf))
+
+    assert n == SIZE
+    assert buf[:n] == data
+    assert peak < SIZE * 0.5
+    assert run(result.readinto(buf)) == 0
+    assert run(result.read()) == b''
+
+
+def test_readinto_views(run, bucket, data):
+    result = run(bucket.get_object('big', byte_range=(0, 99)))
+    view = memoryview(bytearray(100))
+
+    assert run(result.readinto(view[10:60])) == 50
+    assert bytes(view[10:60]) == data[:50]
+
+    result = run(bucket.get_object('big', byte_range=(0, 15)))
+    buf = array.array('i', [0] * 4)
+    assert run(result.readinto(buf)) == 16
+    assert buf.tobytes() == data[:16]
+
+
+def test_partial_readinto_then_read(run, bucket, data):
+    result = run(bucket.get_object('big'))
+    buf = bytearray(1000)
+
+    assert run(result.readinto(buf)) == 1000
+    assert run(result.read(10)) == data[1000:1010]
+    assert run(result.read()) == data[1010:]
+
+
+def test_partial_read_then_read(run, bucket, data):
+    result = run(bucket.get_object('big'))
+
+    assert run(result.resp.read(10)) + run(result.resp.read()) == data
+
+
+@pytest.mark.parametrize('byte_range, expected', [((10, 20), slice(10, 21)), ((0, 0), slice(0, 1))])
+def test_range(run, bucket, data, byte_range, expected):
+    result = run(bucket.get_object('big', byte_range=byte_range))
+
+    assert run(result.read()) == data[expected]
+
+
+def test_empty_object(run, oss, bucket):
+    oss.put('empty', b'')
+
+    result = run(bucket.get_object('empty'))
+
+    assert run(result.read()) == b''
+    assert run(result.readinto(bytearray(10))) == 0
+
+
+@pytest.mark.parametrize('method, conditional, status', [
+    ('HEAD', False, 200),
+    ('GET', True, 304),
+])
+def test_no_body_not_preallocated(run, bucket, data, oss, method, conditional, status):
+    headers = {'If-None-Match': oss.objects['big'][1]} if conditional else None
+
+    resp = run(raw_request(bucket, method, 'big', headers))
+    try:
+        body, peak = traced_peak(run, resp.read())
+    finally:
+        resp.response.release()
+
+    assert (resp.status, body) == (status, b'')
+    assert peak < 100000
+
+
+@pytest.mark.parametrize('cached', [False, True])
+def test_readinto_content_cache(run, oss, make_bucket, cached):
+    oss.put('s', b'x' * 5000)
+    bucket = make_bucket(content_cache=asyncoss.ContentCache(10 ** 6))
+    if cached:
+        run(run(bucket.get_object('s')).read())
+
+    result = run(bucket.get_object('s'))
+    buf = bytearray(6000)
+
+    assert run(result.readinto(buf)) == 5000
+    assert bytes(buf[:5000]) == b'x' * 5000
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+
+import asyncoss
+from asyncoss import exceptions
+
+
+PART_SIZE = 100 * 1024
+
+
+@pytest.fixture
+def data(oss):
+    data = os.urandom(PART_SIZE * 5 + 17)
+    oss.put('obj', data)
+    return data
+
+
+@pytest.fixture
+def store(tmp_path):
+    return asyncoss.make_download_store(str(tmp_path), 'store')
+
+
+def download(bucket, filename, store, **kwargs):
+    return asyncoss.resumable_download(bucket, 'obj', filename, multiget_threshold=PART_SIZE, part_size=PART_SIZE,
+                                       store=store, **kwargs)
+
+
+def test_parallel_range_download(run, oss, make_bucket, tmp_path, data, store):
+    bucket = make_bucket(enable_crc=True)
+    filename = str(tmp_path / 'out')
+
+    run(download(bucket, filename, store, num_threads=3))
+
+    with open(filename, 'rb') as f:
+        assert f.read() == data
+    assert oss.count('GET') == 6
+    assert sorted(os.listdir(str(tmp_path))) == ['out', 'store']
+    assert os.listdir(store.dir) == []
+
+
+def test_resume_downloads_only_missing_parts(run, oss, bucket, tmp_path, data, store):
+    filename = str(tmp_path / 'out')
+    get_object = bucket.get_object
+    ranges = []
+
+    async def crashing_get_object(key, byte_range=None, **kwargs):
+        ranges.append(byte_range)
+        if len(ranges) > 2:
+            raise RuntimeError('crash')
+        return await get_object(key, byte_range=byte_range, **kwargs)
+
+    bucket.get_object = crashing_get_object
+    with pytest.raises(RuntimeError):
+        run(download(bucket, filename, store, num_threads=1))
+
+    assert not os.path.exists(filename)
+
+    ranges[:] = []
+
+    async def counting_get_object(key, byte_range=None, **kwargs):
+        ranges.append(byte_range)
+        return await get_object(key, byte_range=byte_range, **kwargs)
+
+    bucket.get_object = counting_get_object
+    run(download(bucket, filename, store, num_threads=2))
+
+    assert sorted(r[0] for r in ranges) == [PART_SIZE * 2, PART_SIZE * 3, PART_SIZE * 4, PART_SIZE * 5]
+    with open(filename, 'rb') as f:
+        assert f.read() == data
+    assert os.listdir(store.dir) == []
+
+
+def test_ranges_pinned_to_etag(run, oss, bucket, tmp_path, data, store):
+    get_object = bucket.get_object
+
+    async def overwriting_get_object(key, **kwargs):
+        oss.put('obj', os.urandom(len(data)))
+        return await get_object(key, **kwargs)
+
+    bucket.get_object = overwriting_get_object
+    with pytest.raises(exceptions.PreconditionFailed):
+        run(download(bucket, str(tmp_path / 'out'), store, num_threads=1))
+
+
+def test_small_object_uses_single_get(run, oss, bucket, tmp_path, store):
+    oss.put('obj', b'small')
+    filename = str(tmp_path / 'out')
+
+    run(download(bucket, filename, store))
+
+    with open(filename, 'rb') as f:
+        assert f.read() == b'small'
+    assert oss.count('GET') == 1
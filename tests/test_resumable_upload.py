@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import os
+
+import pytest
+
+import asyncoss
+
+
+PART_SIZE = 100 * 1024
+
+
+@pytest.fixture
+def local_file(tmp_path):
+    data = os.urandom(PART_SIZE * 7 + 17)
+    path = tmp_path / 'local'
+    path.write_bytes(data)
+    return str(path), data
+
+
+@pytest.fixture
+def store(tmp_path):
+    return asyncoss.make_upload_store(str(tmp_path), 'store')
+
+
+def upload(bucket, key, filename, store, **kwargs):
+    kwargs.setdefault('multipart_threshold', PART_SIZE)
+    kwargs.setdefault('part_size', PART_SIZE)
+    return asyncoss.resumable_upload(bucket, key, filename, store=store, **kwargs)
+
+
+def test_multipart_upload(run, oss, bucket, local_file, store):
+    filename, data = local_file
+
+    run(upload(bucket, 'obj', filename, store, num_threads=3))
+
+    assert oss.data('obj') == data
+    assert oss.count('PUT', 'partNumber') == 8
+    assert os.listdir(store.dir) == []
+
+
+def test_parts_uploaded_concurrently(run, oss, bucket, local_file, store):
+    filename, data = local_file
+    upload_part = bucket.upload_part
+    state = {'running': 0, 'max': 0}
+
+    async def slow_upload_part(*args, **kwargs):
+        state['running'] += 1
+        state['max'] = max(state['max'], state['running'])
+        try:
+            await asyncio.sleep(0.01)
+            return await upload_part(*args, **kwargs)
+        finally:
+            state['running'] -= 1
+
+    bucket.upload_part = slow_upload_part
+    run(upload(bucket, 'obj', filename, store, num_threads=4))
+
+    assert state['max'] == 4
+    assert oss.data('obj') == data
+
+
+def test_resume_uploads_only_missing_parts(run, oss, bucket, local_file, store):
+    filename, data = local_file
+    upload_part = bucket.upload_part
+    calls = []
+
+    async def crashing_upload_part(*args, **kwargs):
+        calls.append(args[2])
+        if len(calls) > 3:
+            raise RuntimeError('crash')
+        return await upload_part(*args, **kwargs)
+
+    bucket.upload_part = crashing_upload_part
+    with pytest.raises(RuntimeError):
+        run(upload(bucket, 'obj', filename, store, num_threads=1))
+
+    assert 'obj' not in oss.objects
+    assert len(os.listdir(store.dir)) == 1
+
+    uploaded = []
+
+    async def counting_upload_part(*args, **kwargs):
+        uploaded.append(args[2])
+        return await upload_part(*args, **kwargs)
+
+    bucket.upload_part = counting_upload_part
+    run(upload(bucket, 'obj', filename, store, num_threads=2))
+
+    assert sorted(uploaded) == [4, 5, 6, 7, 8]
+    assert oss.data('obj') == data
+    assert os.listdir(store.dir) == []
+
+
+def test_restart_when_upload_is_gone(run, oss, bucket, local_file, store):
+    filename, data = local_file
+    upload_part = bucket.upload_part
+
+    async def crashing_upload_part(*args, **kwargs):
+        raise RuntimeError('crash')
+
+    bucket.upload_part = crashing_upload_part
+    with pytest.raises(RuntimeError):
+        run(upload(bucket, 'obj', filename, store, num_threads=1))
+
+    oss.uploads.clear()
+    bucket.upload_part = upload_part
+    run(upload(bucket, 'obj', filename, store))
+
+    assert oss.data('obj') == data
+
+
+def test_small_file_uses_put_object(run, oss, bucket, tmp_path, store):
+    path = tmp_path / 'small'
+    path.write_bytes(b'hello')
+
+    run(upload(bucket, 'small', str(path), store))
+
+    assert oss.data('small') == b'hello'
+    assert oss.count('POST', 'uploads') == 0
+
+
+def test_progress_reaches_total(run, bucket, local_file, store):
+    filename, data = local_file
+    progress = []
+
+    run(upload(bucket, 'obj', filename, store, progress_callback=lambda consumed, total: progress.append(consumed)))
+
+    assert progress[-1] == len(data)
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import io
+
+import pytest
+
+import asyncoss
+from asyncoss import exceptions
+from asyncoss.retry import RetryPolicy, backoff_delay, is_retryable_error
+
+
+def server_error(status):
+    return exceptions.ServerError(status, {}, b'', {})
+
+
+@pytest.fixture
+def policy():
+    return RetryPolicy(max_retries=3, base_delay=0.001)
+
+
+@pytest.fixture
+def retry_bucket(make_bucket, policy):
+    return make_bucket(retry_policy=policy)
+
+
+def test_get_retried(run, oss, retry_bucket, policy):
+    oss.put('a', b'hello')
+    oss.failures = [503, 502, 500]
+
+    async def get():
+        result = await retry_bucket.get_object('a')
+        return await result.read()
+
+    assert run(get()) == b'hello'
+    assert oss.count('GET') == 4
+    assert policy.retries == 3
+
+
+def test_max_retries(run, oss, retry_bucket, policy):
+    oss.put('a', b'hello')
+    oss.failures = [503] * 5
+
+    with pytest.raises(exceptions.ServerError) as e:
+        run(retry_bucket.head_object('a'))
+
+    assert e.value.status == 503
+    assert oss.count('HEAD') == 4
+
+
+@pytest.mark.parametrize('failure', [404, 403, 501])
+def test_client_errors_not_retried(run, oss, retry_bucket, policy, failure):
+    oss.put('a', b'hello')
+    oss.failures = [failure]
+
+    with pytest.raises(exceptions.ServerError):
+        run(retry_bucket.get_object('a'))
+
+    assert oss.count('GET') == 1
+    assert policy.retries == 0
+
+
+def test_post_not_retried(run, oss, retry_bucket):
+    oss.failures = [500]
+
+    with pytest.raises(exceptions.ServerError):
+        run(retry_bucket.append_object('ap', 0, b'x'))
+
+    assert oss.count('POST') == 1
+
+
+def test_file_body_rewound(run, oss, retry_bucket):
+    f = io.BytesIO(b'xxxfile body')
+    f.seek(3)
+    oss.failures = ['reset', 502]
+
+    run(retry_bucket.put_object('f', f))
+
+    assert oss.data('f') == b'file body'
+    assert oss.count('PUT') == 3
+
+
+def test_iterable_body_not_retried(run, oss, retry_bucket):
+    def body():
+        yield b'abc'
+
+    oss.failures = [500]
+
+    with pytest.raises(exceptions.ServerError):
+        run(retry_bucket.put_object('g', body()))
+
+    assert oss.count('PUT') == 1
+
+
+def test_budget(run, oss, make_bucket):
+    policy = RetryPolicy(max_retries=5, base_delay=0.001, budget_burst=2, budget_ratio=0.5)
+    bucket = make_bucket(retry_policy=policy)
+    oss.put('a', b'hello')
+    oss.failures = [500] * 10
+
+    with pytest.raises(exceptions.ServerError):
+        run(bucket.get_object('a'))
+
+    # 预算初始为上限2，只够重试两次
+    assert (policy.retries, policy.budget_exhausted) == (2, 1)
+    assert oss.count('GET') == 3
+
+    oss.failures = []
+    for i in range(3):
+        run(bucket.head_object('a'))
+    assert policy.budget == 1.5
+
+
+def test_budget_shared_by_buckets(run, oss, make_bucket):
+    policy = RetryPolicy(max_retries=5, base_delay=0.001, budget_burst=1, budget_ratio=0)
+    buckets = [make_bucket(retry_policy=policy) for i in range(2)]
+    oss.put('a', b'hello')
+
+    oss.failures = [500]
+    run(buckets[0].head_object('a'))
+
+    oss.failures = [500]
+    with pytest.raises(exceptions.ServerError):
+        run(buckets[1].head_object('a'))
+
+    assert (policy.retries, policy.budget_exhausted) == (1, 1)
+
+
+def test_connection_refused(run):
+    policy = RetryPolicy(max_retries=2, base_delay=0.001)
+
+    async def get():
+        async with asyncoss.Bucket(asyncoss.Auth('ak', 'sk'), 'http://127.0.0.1:1', 'bk',
+                                   retry_policy=policy) as bucket:
+            await bucket.get_object('a')
+
+    with pytest.raises(exceptions.RequestError):
+        run(get())
+
+    assert policy.retries == 2
+
+
+def test_iterator_not_retried_again(run, oss, make_bucket):
+    bucket = make_bucket(retry_policy=RetryPolicy(max_retries=1, base_delay=0.001))
+    oss.put('a', b'x')
+    oss.failures = [500, 500, 500]
+
+    async def list_all():
+        return [obj.key async for obj in asyncoss.ObjectIterator(bucket, max_retries=3)]
+
+    with pytest.raises(exceptions.ServerError), pytest.warns(DeprecationWarning):
+        run(list_all())
+
+    assert oss.count('GET') == 2
+
+
+def test_failed_responses_released(run, oss):
+    oss.put('a', b'hello')
+    oss.failures = [503] * 5
+
+    async def get():
+        pool = asyncoss.ConnectionPool(limit=1)
+        try:
+            async with asyncoss.Bucket(asyncoss.Auth('ak', 'sk'), oss.endpoint, 'bk', connection_pool=pool,
+                                       retry_policy=RetryPolicy(max_retries=5, base_delay=0.001)) as bucket:
+                result = await asyncio.wait_for(bucket.get_object('a'), 5)
+                return await result.read(), pool.in_use
+        finally:
+            await pool.close()
+
+    assert run(get()) == (b'hello', 0)
+
+
+def test_is_retryable_error():
+    assert is_retryable_error(exceptions.RequestError(OSError('reset')))
+    assert is_retryable_error(server_error(500))
+    assert is_retryable_error(server_error(503))
+    assert not is_retryable_error(server_error(501))
+    assert not is_retryable_error(server_error(404))
+    assert not is_retryable_error(ValueError())
+
+
+def test_should_retry():
+    policy = RetryPolicy(max_retries=2)
+
+    assert policy.should_retry('get', server_error(500), 0)
+    assert policy.should_retry('PUT', server_error(500), 1)
+    assert not policy.should_retry('GET', server_error(500), 2)
+    assert not policy.should_retry('POST', server_error(500), 0)
+    assert policy.retries == 2
+
+
+def test_backoff_delay():
+    for attempt in range(10):
+        delays = [backoff_delay(attempt, 0.1, 1.0) for i in range(50)]
+        assert all(0 <= d <= min(1.0, 0.1 * 2 ** attempt) for d in delays)
+
+    assert RetryPolicy(max_retries=0).max_retries == 0
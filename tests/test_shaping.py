@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import io
+import os
+import time
+
+import pytest
+
+import asyncoss
+from asyncoss.shaping import TokenBucket
+
+
+RATE = 1024 * 1024
+
+
+@pytest.fixture
+def data():
+    return os.urandom(256 * 1024)
+
+
+@pytest.fixture
+def shaped_bucket(make_bucket):
+    return make_bucket(traffic_shaper=asyncoss.TrafficShaper(bytes_per_second=RATE, burst_bytes=64 * 1024))
+
+
+def elapsed(run, coro):
+    started = time.monotonic()
+    result = run(coro)
+    return time.monotonic() - started, result
+
+
+def record_headers(bucket):
+    session = bucket.session._aio_session
+    request = session.request
+    headers = []
+
+    async def recording_request(method, **kwargs):
+        headers.append(kwargs['headers'])
+        return await request(method, **kwargs)
+
+    session.request = recording_request
+    return headers
+
+
+def test_token_bucket(run):
+    bucket = TokenBucket(100, burst=10)
+
+    assert elapsed(run, bucket.consume(10))[0] < 0.05
+    assert elapsed(run, bucket.consume(10))[0] >= 0.08
+
+    # 一次取的令牌可以多于burst
+    assert elapsed(run, bucket.consume(20))[0] >= 0.18
+
+
+def test_token_bucket_shared(run):
+    bucket = TokenBucket(100, burst=1)
+
+    async def consume_all():
+        await asyncio.gather(*[bucket.consume(1) for i in range(21)])
+
+    assert elapsed(run, consume_all())[0] >= 0.18
+
+
+@pytest.mark.parametrize('body', [bytes, bytearray, io.BytesIO])
+def test_upload_shaped(run, oss, shaped_bucket, data, body):
+    seconds, result = elapsed(run, shaped_bucket.put_object('x', body(data)))
+
+    assert seconds >= 0.15
+    assert oss.data('x') == data
+
+
+def test_download_shaped(run, oss, shaped_bucket, data):
+    oss.put('x', data)
+
+    async def read():
+        result = await shaped_bucket.get_object('x')
+        return await result.read()
+
+    async def iterate():
+        result = await shaped_bucket.get_object('x')
+        return b''.join([chunk async for chunk, end in result])
+
+    for coro in [read(), iterate()]:
+        seconds, body = elapsed(run, coro)
+        assert seconds >= 0.15
+        assert body == data
+
+
+def test_download_to_file_shaped(run, oss, shaped_bucket, data, tmp_path):
+    oss.put('x', data)
+    filename = str(tmp_path / 'x')
+
+    seconds, result = elapsed(run, shaped_bucket.get_object_to_file('x', filename))
+
+    assert seconds >= 0.15
+    with open(filename, 'rb') as f:
+        assert f.read() == data
+
+
+def test_request_rate(run, oss, make_bucket):
+    shaper = asyncoss.TrafficShaper(requests_per_second=100, burst_requests=5)
+    oss.put('a', b'x')
+
+    async def heads():
+        async with asyncoss.Bucket(asyncoss.Auth('ak', 'sk'), oss.endpoint, 'bk',
+                                   session=asyncoss.Session(shaper=shaper)) as bucket:
+            await asyncio.gather(*[bucket.head_object('a') for i in range(25)])
+
+    assert elapsed(run, heads())[0] >= 0.15
+    assert oss.count('HEAD') == 25
+
+
+def test_sized_body_keeps_content_length(run, oss, shaped_bucket, data):
+    headers = record_headers(shaped_bucket)
+
+    run(shaped_bucket.put_object('x', data))
+    run(shaped_bucket.put_object('y', io.BytesIO(data)))
+
+    assert [h['Content-Length'] for h in headers] == [str(len(data))] * 2
+
+
+def test_unsized_body_streamed(run, oss, shaped_bucket):
+    def body():
+        yield b'abc'
+        yield b'def'
+
+    headers = record_headers(shaped_bucket)
+
+    run(shaped_bucket.put_object('g', body()))
+
+    assert oss.data('g') == b'abcdef'
+    assert 'Content-Length' not in headers[0]
+
+
+def test_shaper_without_limits():
+    shaper = asyncoss.TrafficShaper()
+    body = b'abc'
+
+    assert shaper.wrap_body(body) is body
+    assert shaper.wrap_body(None) is None
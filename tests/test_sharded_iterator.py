@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import pytest
+
+import asyncoss
+from asyncoss import exceptions
+
+
+def make_keys():
+    keys = ['top{0}'.format(i) for i in range(5)]
+    keys += ['a/{0:02d}'.format(i) for i in range(12)]
+    keys += ['a/b/c/d/{0:02d}'.format(i) for i in range(30)]
+    keys += ['a/b/c/e{0}'.format(i) for i in range(3)]
+    keys += ['b/{0}/x'.format(i) for i in range(8)]
+    keys += ['b/', 'b0', 'c/only']
+    return keys
+
+
+@pytest.fixture
+def keys(oss):
+    keys = make_keys()
+    for key in keys:
+        oss.put(key, b'x')
+    return sorted(keys)
+
+
+async def collect(iterator):
+    return [info.key async for info in iterator]
+
+
+@pytest.mark.parametrize('max_keys', [1, 4, 1000])
+def test_ordered(run, bucket, keys, max_keys):
+    iterator = asyncoss.ShardedObjectIterator(bucket, num_threads=3, ordered=True, max_keys=max_keys)
+
+    assert run(collect(iterator)) == keys
+
+
+@pytest.mark.parametrize('max_keys', [1, 4, 1000])
+def test_unordered(run, bucket, keys, max_keys):
+    iterator = asyncoss.ShardedObjectIterator(bucket, num_threads=3, max_keys=max_keys)
+
+    result = run(collect(iterator))
+
+    assert len(result) == len(keys)
+    assert sorted(result) == keys
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_prefix(run, bucket, keys, ordered):
+    iterator = asyncoss.ShardedObjectIterator(bucket, prefix='a/b/', ordered=ordered, max_keys=5)
+
+    assert sorted(run(collect(iterator))) == [k for k in keys if k.startswith('a/b/')]
+
+
+def test_deep_directory_is_split(run, oss, bucket):
+    for i in range(20):
+        oss.put('x/y/z/{0:02d}/f'.format(i), b'x')
+
+    iterator = asyncoss.ShardedObjectIterator(bucket, num_threads=4, ordered=True, max_keys=3)
+
+    assert run(collect(iterator)) == sorted(oss.objects)
+    assert oss.count('GET', 'prefix=x/y/z/&delimiter=/&') > 0
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_split_markers(run, oss, bucket, keys, ordered):
+    iterator = asyncoss.ShardedObjectIterator(bucket, delimiter='', split_markers=['a/05', 'b/'], ordered=ordered,
+                                              max_keys=7)
+
+    result = run(collect(iterator))
+
+    assert sorted(result) == keys
+    if ordered:
+        assert result == keys
+    assert oss.count('GET', 'delimiter=/') == 0
+
+
+def test_no_delimiter_lists_sequentially(run, oss, bucket, keys):
+    iterator = asyncoss.ShardedObjectIterator(bucket, delimiter='', ordered=True, max_keys=10)
+
+    assert run(collect(iterator)) == keys
+    assert oss.count('GET') == (len(keys) + 9) // 10
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_requests_run_concurrently_within_limit(run, oss, bucket, keys, ordered):
+    oss.list_delay = 0.01
+    iterator = asyncoss.ShardedObjectIterator(bucket, num_threads=3, ordered=ordered, max_keys=4)
+
+    run(collect(iterator))
+
+    assert oss.max_in_flight == 3
+
+
+def test_error_propagates(run, oss, bucket, keys):
+    oss.failures = [None, ('code', 403, 'AccessDenied')]
+    iterator = asyncoss.ShardedObjectIterator(bucket, num_threads=1, max_keys=4)
+
+    with pytest.raises(exceptions.AccessDenied):
+        run(collect(iterator))
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_slow_consumer_with_one_thread(run, bucket, keys, ordered):
+    async def consume():
+        result = []
+        async for info in asyncoss.ShardedObjectIterator(bucket, num_threads=1, ordered=ordered, max_keys=2):
+            await asyncio.sleep(0.001)
+            result.append(info.key)
+        return result
+
+    assert sorted(run(asyncio.wait_for(consume(), 10))) == keys
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+import oss2
+import pytest
+from oss2.credentials import Credentials, CredentialsProvider
+
+import asyncoss
+from asyncoss import signing
+
+
+ENDPOINT = 'http://oss-cn-hangzhou.aliyuncs.com'
+KEYS = ['a.txt', 'dir/b c.jpg', '中文/文件', '~x+y=z&w', u'é']
+
+
+class RotatingProvider(CredentialsProvider):
+    def __init__(self):
+        self.credentials = Credentials('id1', 'secret1', 'token1')
+
+    def get_credentials(self):
+        return self.credentials
+
+
+@pytest.fixture(autouse=True)
+def frozen_time(monkeypatch):
+    now = [1700000000.25]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    return now
+
+
+def new_bucket(auth):
+    return asyncoss.Bucket(auth, ENDPOINT, 'my-bucket')
+
+
+@pytest.mark.parametrize('auth', [
+    oss2.Auth('id', 'secret'),
+    oss2.ProviderAuth(RotatingProvider()),
+    oss2.StsAuth('id', 'secret', 'token'),
+    oss2.StsAuth('id', 'secret', 'token', auth_version=oss2.AUTH_VERSION_2),
+    oss2.AuthV2('id', 'secret'),
+], ids=['v1', 'provider', 'sts', 'sts-v2', 'v2'])
+@pytest.mark.parametrize('slash_safe', [False, True])
+def test_same_as_sign_url(run, auth, slash_safe):
+    async def sign():
+        bucket = new_bucket(auth)
+        try:
+            return (bucket.sign_urls(KEYS, 600, slash_safe=slash_safe),
+                    [bucket.sign_url('GET', key, 600, slash_safe=slash_safe) for key in KEYS])
+        finally:
+            await bucket.close()
+
+    urls, expected = run(sign())
+
+    assert urls == expected
+
+
+def test_expiry_window(run, frozen_time):
+    async def sign():
+        bucket = new_bucket(oss2.Auth('id', 'secret'))
+        try:
+            first = bucket.sign_urls(['a'], 600, expiry_window=600)
+            frozen_time[0] += 100
+            second = bucket.sign_urls(['a'], 600, expiry_window=600)
+            frozen_time[0] += 500
+            third = bucket.sign_urls(['a'], 600, expiry_window=600)
+            return first, second, third, len(bucket.signed_url_cache)
+        finally:
+            await bucket.close()
+
+    first, second, third, cached = run(sign())
+
+    assert first == second
+    assert 'Expires=1700001000' in first[0]
+    assert 'Expires=1700001600' in third[0]
+    assert cached == 2
+
+
+@pytest.mark.parametrize('auth', [
+    oss2.StsAuth('id', 'secret', 'token'),
+    oss2.AuthV2('id', 'secret'),
+], ids=['sts', 'v2'])
+def test_clock_ticks_while_signing(run, monkeypatch, frozen_time, auth):
+    # 每次读取时间都前进0.5秒，计算过期时间与签名时读到的时间不在同一秒
+    def ticking_time():
+        frozen_time[0] += 0.5
+        return frozen_time[0]
+
+    monkeypatch.setattr(time, 'time', ticking_time)
+
+    async def sign():
+        bucket = new_bucket(auth)
+        try:
+            return bucket.sign_urls(['a', 'b'], 600, expiry_window=600)
+        finally:
+            await bucket.close()
+
+    urls = run(sign())
+
+    assert all(signing._EXPIRES_PATTERN.search(url).group(1) == '1700001000' for url in urls)
+
+
+def test_cache_follows_credentials(run):
+    provider = RotatingProvider()
+
+    async def sign():
+        bucket = new_bucket(oss2.ProviderAuth(provider))
+        try:
+            first = bucket.sign_urls(['a'], 600, expiry_window=600)
+            provider.credentials = Credentials('id2', 'secret2', 'token2')
+            second = bucket.sign_urls(['a'], 600, expiry_window=600)
+            return first[0], second[0], bucket.sign_url('GET', 'a', 1000)
+        finally:
+            await bucket.close()
+
+    first, second, expected = run(sign())
+
+    assert 'OSSAccessKeyId=id1' in first and 'token1' in first
+    assert second == expected
+
+
+def test_not_cached_without_credentials(run):
+    async def sign():
+        bucket = new_bucket(oss2.StsAuth('id', 'secret', 'token'))
+        try:
+            return bucket.sign_urls(['a'], 60, expiry_window=60), bucket.signed_url_cache
+        finally:
+            await bucket.close()
+
+    urls, cache = run(sign())
+
+    assert len(urls) == 1
+    assert cache is None
+
+
+def test_get_credentials():
+    provider = RotatingProvider()
+
+    assert signing.get_credentials(oss2.ProviderAuth(provider)) is provider.credentials
+    assert signing.get_credentials(oss2.StsAuth('id', 'secret', 'token')) is None
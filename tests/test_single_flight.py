@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import gc
+import os
+
+import pytest
+
+import asyncoss
+from asyncoss import exceptions, http
+from asyncoss.singleflight import SharedBody
+
+
+@pytest.fixture
+def data(oss):
+    data = os.urandom(300000)
+    oss.put('hot', data)
+    return data
+
+
+@pytest.fixture
+def single_flight():
+    return asyncoss.SingleFlight()
+
+
+@pytest.fixture
+def coalescing_bucket(make_bucket, single_flight):
+    return make_bucket(single_flight=single_flight)
+
+
+def shared_body(result):
+    return result.resp._SharedBodyReader__body
+
+
+def test_head_object_coalesced(run, oss, coalescing_bucket, single_flight, data):
+    async def heads():
+        return await asyncio.gather(*[coalescing_bucket.head_object('hot') for i in range(50)])
+
+    results = run(heads())
+
+    assert all(r.content_length == len(data) for r in results)
+    assert oss.count('HEAD') == 1
+    assert (single_flight.calls, single_flight.shared) == (1, 49)
+
+
+def test_errors_shared(run, oss, coalescing_bucket):
+    async def heads():
+        return await asyncio.gather(*[coalescing_bucket.get_object('missing') for i in range(10)],
+                                    return_exceptions=True)
+
+    results = run(heads())
+
+    assert all(isinstance(e, exceptions.NoSuchKey) for e in results)
+    assert oss.count('GET') == 1
+
+
+def test_get_object_body_shared(run, oss, coalescing_bucket, data):
+    async def get(n):
+        result = await coalescing_bucket.get_object('hot')
+        if n % 3 == 0:
+            return await result.read()
+        if n % 3 == 1:
+            return b''.join([chunk async for chunk, end in result])
+
+        chunks = []
+        while True:
+            chunk = await result.read(3333)
+            if not chunk:
+                return b''.join(chunks)
+            chunks.append(chunk)
+
+    async def gets():
+        return await asyncio.gather(*[get(i) for i in range(20)])
+
+    assert all(body == data for body in run(gets()))
+    assert oss.count('GET') == 1
+
+
+def test_lone_caller_gets_raw_response(run, coalescing_bucket, data):
+    async def get():
+        result = await coalescing_bucket.get_object('hot')
+        return result.resp, await result.read()
+
+    resp, body = run(get())
+
+    assert type(resp) is http.Response
+    assert body == data
+
+
+def test_large_body_not_shared(run, oss, make_bucket, data):
+    single_flight = asyncoss.SingleFlight(max_body_size=1000)
+    bucket = make_bucket(single_flight=single_flight)
+
+    async def gets():
+        results = await asyncio.gather(*[bucket.get_object('hot') for i in range(5)])
+        return [(type(r.resp), await r.read()) for r in results]
+
+    assert run(gets()) == [(http.Response, data)] * 5
+    assert oss.count('GET') == 5
+    assert (single_flight.calls, single_flight.shared) == (5, 0)
+
+
+def test_body_read_on_demand_and_trimmed(run, coalescing_bucket, data):
+    async def read_heads():
+        results = await asyncio.gather(*[coalescing_bucket.get_object('hot') for i in range(5)])
+        body = shared_body(results[0])
+        before = len(body._SharedBody__chunks)
+
+        for r in results:
+            assert await r.read(1000) == data[:1000]
+        return results, body, before
+
+    results, body, before = run(read_heads())
+
+    assert before == 0
+    assert len(body._SharedBody__chunks) == 1
+
+    async def read_rest():
+        # 其他读者被回收后，剩下的读者读过的数据块随即被丢弃
+        del results[1:]
+        await asyncio.sleep(0)
+        gc.collect()
+
+        rest = b''
+        while True:
+            chunk = await results[0].read(http._CHUNK_SIZE)
+            if not chunk:
+                return rest
+            rest += chunk
+            assert len(body._SharedBody__chunks) <= 1
+
+    assert data[:1000] + run(read_rest()) == data
+    assert body.done
+
+
+def test_cancelled_waiter(run, oss, coalescing_bucket, data):
+    async def gets():
+        task = asyncio.ensure_future(asyncio.gather(*[coalescing_bucket.get_object('hot') for i in range(3)]))
+        cancelled = asyncio.ensure_future(coalescing_bucket.get_object('hot'))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+
+        return [await r.read() for r in await task]
+
+    assert run(gets()) == [data] * 3
+    assert oss.count('GET') == 1
+
+
+def test_read_after_write_not_coalesced(run, oss, coalescing_bucket):
+    oss.put('obj', b'old')
+    oss.get_delay = 0.2
+
+    async def read_after_write():
+        slow = asyncio.ensure_future(coalescing_bucket.get_object('obj'))
+        await asyncio.sleep(0.05)
+
+        await coalescing_bucket.put_object('obj', b'new')
+        fresh = await coalescing_bucket.get_object('obj')
+        return await (await slow).read(), await fresh.read()
+
+    assert run(read_after_write()) == (b'old', b'new')
+    assert oss.count('GET') == 2
+
+
+def test_write_generations_released(run, coalescing_bucket, data):
+    async def read():
+        await asyncio.gather(*[coalescing_bucket.head_object('hot') for i in range(3)])
+        await coalescing_bucket.put_object('hot', b'new')
+
+    run(read())
+
+    assert coalescing_bucket._Bucket__write_generations == {}
+
+
+class _ChunkedResponse(object):
+    def __init__(self, chunks, error=None):
+        self.status = 200
+        self.headers = {}
+        self.request_id = 'id'
+
+        self.chunks = list(chunks)
+        self.error = error
+        self.reads = 0
+        self.response = self
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    async def read(self, amt):
+        self.reads += 1
+        await asyncio.sleep(0)
+        if self.chunks:
+            return self.chunks.pop(0)
+        if self.error is not None:
+            raise self.error
+        return b''
+
+
+def test_shared_body_readers(run):
+    resp = _ChunkedResponse([b'ab', b'cd', b'ef'])
+    body = SharedBody(resp, 3)
+    readers = [body.reader() for i in range(3)]
+
+    async def read_all():
+        return await asyncio.gather(*[r.read() for r in readers])
+
+    assert run(read_all()) == [b'abcdef'] * 3
+    assert resp.reads == 4
+
+
+def test_shared_body_closed_when_readers_leave(run):
+    resp = _ChunkedResponse([b'ab', b'cd', b'ef'])
+    body = SharedBody(resp, 2)
+    readers = [body.reader() for i in range(2)]
+
+    async def read_first():
+        return await readers[0].read(2)
+
+    assert run(read_first()) == b'ab'
+
+    readers[0].release()
+    assert not resp.closed
+
+    del readers[1]
+    gc.collect()
+    assert resp.closed
+
+
+def test_connection_released_when_readers_leave(run, oss, data):
+    oss.chunk_delay = 0.01
+
+    async def get():
+        pool = asyncoss.ConnectionPool()
+        try:
+            async with asyncoss.Bucket(asyncoss.Auth('ak', 'sk'), oss.endpoint, 'bk', connection_pool=pool,
+                                       single_flight=asyncoss.SingleFlight()) as bucket:
+                results = await asyncio.gather(*[bucket.get_object('hot') for i in range(3)])
+                assert await results[0].read(1000) == data[:1000]
+                for r in results:
+                    r.resp.release()
+                return pool.in_use
+        finally:
+            await pool.close()
+
+    assert run(get()) == 0
+
+
+def test_shared_body_not_closed_after_eof(run):
+    resp = _ChunkedResponse([b'ab'])
+    body = SharedBody(resp, 1)
+    reader = body.reader()
+
+    run(reader.read())
+    reader.release()
+
+    assert body.done
+    assert not resp.closed
+
+
+def test_shared_body_error(run):
+    resp = _ChunkedResponse([b'ab'], error=ValueError('broken'))
+    body = SharedBody(resp, 2)
+    readers = [body.reader() for i in range(2)]
+
+    async def read_all():
+        return await asyncio.gather(*[r.read() for r in readers], return_exceptions=True)
+
+    results = run(read_all())
+
+    assert all(isinstance(e, ValueError) for e in results)
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+
+import asyncoss
+from asyncoss import exceptions, snapshot
+from asyncoss.models import SimplifiedObjectInfo
+
+
+@pytest.fixture(autouse=True)
+def small_index(monkeypatch):
+    monkeypatch.setattr(snapshot, '_INDEX_INTERVAL', 4)
+    monkeypatch.setattr(snapshot, '_BATCH_SIZE', 3)
+
+
+def entry(key, size=1, etag='E', mtime=1):
+    return SimplifiedObjectInfo(key, mtime, etag, 'Normal', size, 'Standard')
+
+
+def put_keys(oss, keys):
+    for key in keys:
+        oss.put(key, key.encode('utf-8'), mtime=1)
+
+
+async def collect_changes(changes):
+    return [(change.type, change.key) async for change in changes]
+
+
+def test_take_snapshot_and_read(run, oss, bucket, tmp_path):
+    keys = ['k{0:02d}'.format(i) for i in range(20)] + ['中文']
+    put_keys(oss, keys)
+    filename = str(tmp_path / 'snap')
+
+    count = run(snapshot.take_snapshot(asyncoss.ObjectIterator(bucket, max_keys=7), filename))
+
+    reader = snapshot.SnapshotReader(filename)
+    try:
+        entries = []
+        while True:
+            objs = reader.read()
+            if not objs:
+                break
+            entries.extend(objs)
+    finally:
+        reader.close()
+
+    assert count == reader.count == len(keys)
+    assert [(o.key, o.size, o.etag) for o in entries] == [(k, len(k.encode('utf-8')), oss.objects[k][1])
+                                                          for k in sorted(keys)]
+
+
+def test_diff(run, oss, bucket, tmp_path):
+    put_keys(oss, ['a', 'b', 'c', 'd', 'e'])
+    old = str(tmp_path / 'old')
+    new = str(tmp_path / 'new')
+    run(snapshot.take_snapshot(asyncoss.ObjectIterator(bucket), old))
+
+    del oss.objects['a']
+    del oss.objects['d']
+    oss.put('c', b'changed', mtime=2)
+    put_keys(oss, ['bb', 'f'])
+
+    changes = run(collect_changes(snapshot.diff_snapshot(old, asyncoss.ObjectIterator(bucket, max_keys=2),
+                                                         new_snapshot=new)))
+
+    assert changes == [('removed', 'a'), ('added', 'bb'), ('modified', 'c'), ('removed', 'd'), ('added', 'f')]
+    assert run(collect_changes(snapshot.diff_snapshot(new, asyncoss.ObjectIterator(bucket)))) == []
+
+
+def test_diff_with_prefix(run, oss, bucket, tmp_path):
+    keys = ['a{0:02d}'.format(i) for i in range(10)] + ['b{0:02d}'.format(i) for i in range(10)] + ['c']
+    put_keys(oss, keys)
+    filename = str(tmp_path / 'snap')
+    run(snapshot.take_snapshot(asyncoss.ObjectIterator(bucket), filename))
+
+    del oss.objects['b03']
+    del oss.objects['b09']
+    del oss.objects['c']
+    put_keys(oss, ['b05x'])
+
+    changes = run(collect_changes(snapshot.diff_snapshot(filename, asyncoss.ObjectIterator(bucket, prefix='b'),
+                                                         prefix='b')))
+
+    assert changes == [('removed', 'b03'), ('added', 'b05x'), ('removed', 'b09')]
+
+
+def test_seek(tmp_path):
+    filename = str(tmp_path / 'snap')
+    writer = snapshot.SnapshotWriter(filename)
+    writer.write([entry('k{0:02d}'.format(i)) for i in range(0, 30, 2)])
+    writer.close()
+
+    reader = snapshot.SnapshotReader(filename)
+    try:
+        reader.seek('k13')
+        assert [o.key for o in reader.read(2)] == ['k14', 'k16']
+
+        reader.seek('k99')
+        assert reader.read() == []
+
+        reader.seek('')
+        assert reader.read(1)[0].key == 'k00'
+    finally:
+        reader.close()
+
+
+def test_writer_requires_sorted_keys(tmp_path):
+    writer = snapshot.SnapshotWriter(str(tmp_path / 'snap'))
+    try:
+        with pytest.raises(ValueError):
+            writer.write([entry('b'), entry('a')])
+    finally:
+        writer.abort()
+
+
+def test_incomplete_snapshot_is_rejected(tmp_path):
+    filename = str(tmp_path / 'snap')
+    writer = snapshot.SnapshotWriter(filename)
+    writer.write([entry('a')])
+    writer.close()
+
+    with open(filename, 'r+b') as f:
+        f.truncate(os.path.getsize(filename) - 1)
+
+    with pytest.raises(ValueError):
+        snapshot.SnapshotReader(filename)
+
+
+def test_abort_keeps_previous_snapshot(tmp_path):
+    filename = str(tmp_path / 'snap')
+    writer = snapshot.SnapshotWriter(filename)
+    writer.write([entry('a')])
+    writer.close()
+
+    writer = snapshot.SnapshotWriter(filename)
+    writer.write([entry('b')])
+    writer.abort()
+
+    reader = snapshot.SnapshotReader(filename)
+    try:
+        assert [o.key for o in reader.read()] == ['a']
+    finally:
+        reader.close()
+    assert os.listdir(str(tmp_path)) == ['snap']
+
+
+def test_failed_listing_keeps_previous_snapshot(run, oss, bucket, tmp_path):
+    put_keys(oss, ['a', 'b'])
+    filename = str(tmp_path / 'snap')
+    run(snapshot.take_snapshot(asyncoss.ObjectIterator(bucket), filename))
+
+    oss.failures = [('code', 403, 'AccessDenied')]
+    with pytest.raises(exceptions.AccessDenied):
+        run(snapshot.take_snapshot(asyncoss.ObjectIterator(bucket), filename))
+
+    assert run(collect_changes(snapshot.diff_snapshot(filename, asyncoss.ObjectIterator(bucket)))) == []
+    assert os.listdir(str(tmp_path)) == ['snap']
+
+
+def test_diff_rejects_same_new_snapshot(run, oss, bucket, tmp_path):
+    put_keys(oss, ['a'])
+    filename = str(tmp_path / 'snap')
+    run(snapshot.take_snapshot(asyncoss.ObjectIterator(bucket), filename))
+
+    with pytest.raises(ValueError):
+        run(collect_changes(snapshot.diff_snapshot(filename, asyncoss.ObjectIterator(bucket),
+                                                   new_snapshot=str(tmp_path / '.' / 'snap'))))
+
+    assert run(collect_changes(snapshot.diff_snapshot(filename, asyncoss.ObjectIterator(bucket)))) == []
+
+
+def test_diff_rejects_unsorted_listing(run, tmp_path):
+    filename = str(tmp_path / 'snap')
+    writer = snapshot.SnapshotWriter(filename)
+    writer.close()
+
+    async def unsorted():
+        yield entry('b')
+        yield entry('a')
+
+    with pytest.raises(ValueError):
+        run(collect_changes(snapshot.diff_snapshot(filename, unsorted(), new_snapshot=str(tmp_path / 'new'))))
+
+    assert not os.path.exists(str(tmp_path / 'new'))
+    assert not os.path.exists(str(tmp_path / 'new.tmp'))
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+
+import asyncoss
+from asyncoss import exceptions, sync
+
+
+def write_files(root, files):
+    for name, data in files.items():
+        path = root.joinpath(*name.split('/'))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+
+def read_files(root):
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(str(root)):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            with open(path, 'rb') as f:
+                files[os.path.relpath(path, str(root)).replace(os.sep, '/')] = f.read()
+    return files
+
+
+FILES = {'a.txt': b'aaa', 'dir/b.txt': b'bbbb', 'dir/sub/c.txt': b'c'}
+
+
+def test_sync_to_bucket(run, oss, bucket, tmp_path):
+    write_files(tmp_path, FILES)
+
+    result = run(asyncoss.sync_to_bucket(bucket, str(tmp_path), prefix='p/', num_threads=2))
+
+    assert sorted(result.transferred_keys) == ['p/a.txt', 'p/dir/b.txt', 'p/dir/sub/c.txt']
+    assert dict((k, oss.data('p/' + k)) for k in FILES) == FILES
+
+    result = run(asyncoss.sync_to_bucket(bucket, str(tmp_path), prefix='p/'))
+    assert (result.transferred_keys, result.skipped_count) == ([], 3)
+
+
+def test_sync_to_bucket_compares_content(run, oss, bucket, tmp_path):
+    write_files(tmp_path, FILES)
+    run(asyncoss.sync_to_bucket(bucket, str(tmp_path), prefix='p/'))
+
+    write_files(tmp_path, {'dir/b.txt': b'BBBB'})
+
+    result = run(asyncoss.sync_to_bucket(bucket, str(tmp_path), prefix='p/', checksum=False))
+    assert result.transferred_keys == []
+
+    result = run(asyncoss.sync_to_bucket(bucket, str(tmp_path), prefix='p/'))
+    assert result.transferred_keys == ['p/dir/b.txt']
+    assert oss.data('p/dir/b.txt') == b'BBBB'
+
+
+def test_sync_to_bucket_uses_crc_for_multipart_objects(run, oss, bucket, tmp_path):
+    write_files(tmp_path, {'big': b'x' * 1000})
+
+    async def upload_multipart():
+        upload_id = (await bucket.init_multipart_upload('big')).upload_id
+        parts = []
+        for n in (1, 2):
+            result = await bucket.upload_part('big', upload_id, n, b'x' * 500)
+            parts.append(asyncoss.models.PartInfo(n, result.etag))
+        await bucket.complete_multipart_upload('big', upload_id, parts)
+
+    run(upload_multipart())
+
+    result = run(asyncoss.sync_to_bucket(bucket, str(tmp_path)))
+
+    assert result.skipped_count == 1
+    assert oss.count('HEAD') == 1
+
+
+def test_sync_to_bucket_deletes_extra_objects(run, oss, bucket, tmp_path):
+    write_files(tmp_path, {'a.txt': b'a'})
+    for key in ['p/old', 'p/deny-old', 'p/dir/', 'other']:
+        oss.put(key, b'x')
+
+    result = run(asyncoss.sync_to_bucket(bucket, str(tmp_path), prefix='p/', delete=True))
+
+    assert result.deleted_keys == ['p/old']
+    assert sorted(oss.objects) == ['other', 'p/a.txt', 'p/deny-old', 'p/dir/']
+
+
+def test_sync_from_bucket(run, oss, bucket, tmp_path):
+    for key, data in FILES.items():
+        oss.put('p/' + key, data)
+    oss.put('p/dir/', b'')
+    oss.put('p/../escape', b'x')
+    oss.put('q/other', b'x')
+    local = tmp_path / 'local'
+
+    result = run(asyncoss.sync_from_bucket(bucket, 'p/', str(local), num_threads=2))
+
+    assert sorted(result.transferred_keys) == ['p/a.txt', 'p/dir/b.txt', 'p/dir/sub/c.txt']
+    assert read_files(local) == FILES
+    assert not (tmp_path / 'escape').exists()
+
+    result = run(asyncoss.sync_from_bucket(bucket, 'p/', str(local)))
+    assert (result.transferred_keys, result.skipped_count) == ([], 3)
+
+
+def test_sync_from_bucket_deletes_extra_files(run, oss, bucket, tmp_path):
+    oss.put('p/a.txt', b'new')
+    write_files(tmp_path, {'a.txt': b'old', 'extra/x': b'x'})
+
+    result = run(asyncoss.sync_from_bucket(bucket, 'p/', str(tmp_path), delete=True))
+
+    assert result.transferred_keys == ['p/a.txt']
+    assert result.deleted_keys == ['p/extra/x']
+    assert read_files(tmp_path) == {'a.txt': b'new'}
+
+
+def test_failed_transfer_reported_per_key(run, monkeypatch, oss, bucket, tmp_path):
+    write_files(tmp_path, FILES)
+    resumable_upload = sync.resumable_upload
+
+    async def flaky_upload(bucket, key, filename):
+        if key == 'p/dir/b.txt':
+            raise exceptions.RequestError(IOError('connection reset'))
+        return await resumable_upload(bucket, key, filename)
+
+    monkeypatch.setattr(sync, 'resumable_upload', flaky_upload)
+
+    result = run(asyncoss.sync_to_bucket(bucket, str(tmp_path), prefix='p/', num_threads=1))
+
+    assert sorted(result.transferred_keys) == ['p/a.txt', 'p/dir/sub/c.txt']
+    assert result.failed_keys == ['p/dir/b.txt']
+    assert isinstance(result.errors[0], exceptions.RequestError)
+
+
+def test_zero_threads_rejected(run, bucket, tmp_path):
+    with pytest.raises(ValueError):
+        run(asyncoss.sync_to_bucket(bucket, str(tmp_path), num_threads=0))
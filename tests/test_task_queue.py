@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import logging
+
+import pytest
+
+from asyncoss.task_queue import TaskQueue
+
+
+async def producer(q):
+    for i in range(3):
+        await q.put(i)
+
+
+async def idle_consumer(q):
+    await asyncio.sleep(10)
+
+
+def test_cancel_is_not_logged_as_error(run, caplog):
+    async def cancel_run():
+        task = asyncio.ensure_future(TaskQueue(producer, [idle_consumer] * 2).run())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await task
+
+    with caplog.at_level(logging.DEBUG, logger='asyncoss.task_queue'):
+        with pytest.raises(asyncio.CancelledError):
+            run(cancel_run())
+
+    assert caplog.records
+    assert all(r.levelno < logging.ERROR for r in caplog.records)
+
+
+def test_consumer_error_is_logged(run, caplog):
+    async def failing_consumer(q):
+        await q.get()
+        raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+        run(TaskQueue(producer, [failing_consumer, idle_consumer]).run())
+
+    assert [r.levelno for r in caplog.records if r.name == 'asyncoss.task_queue'] == [logging.ERROR]
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+
+from xml.etree import ElementTree
+
+import pytest
+from oss2 import models as oss2_models
+from oss2 import xml_utils
+from oss2.exceptions import InconsistentError
+
+from asyncoss import models, xml_stream
+
+
+LIST_OBJECTS = b'''<?xml version="1.0" encoding="UTF-8"?>
+<ListBucketResult>
+  <Name>bk</Name><Prefix>a%2F</Prefix><Marker></Marker><MaxKeys>3</MaxKeys><Delimiter>%2F</Delimiter>
+  <EncodingType>url</EncodingType>
+  <IsTruncated>true</IsTruncated>
+  <NextMarker>a%2Fz%20z</NextMarker>
+  <Contents>
+    <Key>a%2F%E4%B8%AD%E6%96%87</Key>
+    <LastModified>2020-01-01T00:00:00.000Z</LastModified>
+    <ETag>"ETAG1"</ETag><Type>Normal</Type><Size>10</Size><StorageClass>Standard</StorageClass>
+    <Owner><ID>1</ID><DisplayName>owner</DisplayName></Owner>
+  </Contents>
+  <Contents>
+    <Key>a%2Fb%26c</Key>
+    <LastModified>2020-01-02T00:00:00.000Z</LastModified>
+    <ETag>"ETAG2"</ETag><Type>Multipart</Type><Size>20</Size><StorageClass>IA</StorageClass>
+  </Contents>
+  <CommonPrefixes><Prefix>a%2Fdir%2F</Prefix></CommonPrefixes>
+</ListBucketResult>'''
+
+LIST_PARTS = b'''<?xml version="1.0" encoding="UTF-8"?>
+<ListPartsResult>
+  <Bucket>bk</Bucket><Key>obj</Key><UploadId>id</UploadId>
+  <NextPartNumberMarker>2</NextPartNumberMarker><MaxParts>2</MaxParts><IsTruncated>true</IsTruncated>
+  <Part><PartNumber>1</PartNumber><LastModified>2020-01-01T00:00:00.000Z</LastModified><ETag>"P1"</ETag><Size>5</Size></Part>
+  <Part><PartNumber>2</PartNumber><LastModified>2020-01-01T00:00:01.000Z</LastModified><ETag>"P2"</ETag><Size>6</Size></Part>
+</ListPartsResult>'''
+
+LIST_UPLOADS = b'''<?xml version="1.0" encoding="UTF-8"?>
+<ListMultipartUploadsResult>
+  <Bucket>bk</Bucket><EncodingType>url</EncodingType>
+  <KeyMarker></KeyMarker><UploadIdMarker></UploadIdMarker>
+  <NextKeyMarker>b%2Fx</NextKeyMarker><NextUploadIdMarker>U2</NextUploadIdMarker>
+  <Delimiter>%2F</Delimiter><Prefix></Prefix><MaxUploads>2</MaxUploads><IsTruncated>true</IsTruncated>
+  <Upload><Key>a%20b</Key><UploadId>U1</UploadId><Initiated>2020-01-01T00:00:00.000Z</Initiated></Upload>
+  <Upload><Key>b%2Fx</Key><UploadId>U2</UploadId><Initiated>2020-01-03T00:00:00.000Z</Initiated></Upload>
+  <CommonPrefixes><Prefix>c%2F</Prefix></CommonPrefixes>
+</ListMultipartUploadsResult>'''
+
+LIST_BUCKETS = b'''<?xml version="1.0" encoding="UTF-8"?>
+<ListAllMyBucketsResult>
+  <Owner><ID>42</ID><DisplayName>me</DisplayName></Owner>
+  <IsTruncated>true</IsTruncated><NextMarker>b2</NextMarker>
+  <Buckets>
+    <Bucket>
+      <CreationDate>2020-01-01T00:00:00.000Z</CreationDate>
+      <ExtranetEndpoint>oss-cn-hangzhou.aliyuncs.com</ExtranetEndpoint>
+      <IntranetEndpoint>oss-cn-hangzhou-internal.aliyuncs.com</IntranetEndpoint>
+      <Location>oss-cn-hangzhou</Location><Name>b1</Name><StorageClass>Standard</StorageClass>
+      <Region>cn-hangzhou</Region>
+    </Bucket>
+    <Bucket>
+      <CreationDate>2020-01-02T00:00:00.000Z</CreationDate>
+      <ExtranetEndpoint>e</ExtranetEndpoint><IntranetEndpoint>i</IntranetEndpoint>
+      <Location>oss-cn-beijing</Location><Name>b2</Name><StorageClass>IA</StorageClass>
+    </Bucket>
+  </Buckets>
+</ListAllMyBucketsResult>'''
+
+
+class _ChunkedResponse(object):
+    def __init__(self, body, chunk_size=7, headers=None):
+        self.status = 200
+        self.headers = headers or {}
+        self.request_id = 'id'
+        self.response = self
+
+        self.body = body
+        self.chunk_size = chunk_size
+        self.consumed = 0
+        self.released = False
+
+    def release(self):
+        self.released = True
+
+    async def iter_chunked(self, n):
+        for offset in range(0, len(self.body), self.chunk_size):
+            chunk = self.body[offset:offset + self.chunk_size]
+            self.consumed += len(chunk)
+            yield chunk
+
+
+def fields(obj, names):
+    return tuple(getattr(obj, name) for name in names)
+
+
+OBJECT_FIELDS = ('key', 'last_modified', 'etag', 'type', 'size', 'storage_class')
+
+
+def test_list_objects_matches_xml_utils(run):
+    resp = _ChunkedResponse(LIST_OBJECTS)
+    result = run(xml_stream.parse_list_objects(models.ListObjectsResult(resp), resp))
+    expected = xml_utils.parse_list_objects(oss2_models.ListObjectsResult(resp), LIST_OBJECTS)
+
+    assert [fields(o, OBJECT_FIELDS) for o in result.object_list] == \
+        [fields(o, OBJECT_FIELDS) for o in expected.object_list]
+    assert result.object_list[0].owner.display_name == 'owner'
+    assert result.object_list[1].owner is None
+    assert result.prefix_list == expected.prefix_list == ['a/dir/']
+    assert (result.is_truncated, result.next_marker) == (expected.is_truncated, expected.next_marker)
+
+
+def test_list_parts_matches_xml_utils(run):
+    resp = _ChunkedResponse(LIST_PARTS)
+    result = run(xml_stream.parse_list_parts(models.ListPartsResult(resp), resp))
+    expected = xml_utils.parse_list_parts(oss2_models.ListPartsResult(resp), LIST_PARTS)
+
+    names = ('part_number', 'etag', 'size', 'last_modified')
+    assert [fields(p, names) for p in result.parts] == [fields(p, names) for p in expected.parts]
+    assert (result.is_truncated, result.next_marker) == (expected.is_truncated, expected.next_marker)
+
+
+def test_list_multipart_uploads_matches_xml_utils(run):
+    resp = _ChunkedResponse(LIST_UPLOADS)
+    result = run(xml_stream.parse_list_multipart_uploads(models.ListMultipartUploadsResult(resp), resp))
+    expected = xml_utils.parse_list_multipart_uploads(oss2_models.ListMultipartUploadsResult(resp), LIST_UPLOADS)
+
+    names = ('key', 'upload_id', 'initiation_date')
+    assert [fields(u, names) for u in result.upload_list] == [fields(u, names) for u in expected.upload_list]
+    assert result.prefix_list == expected.prefix_list
+    assert fields(result, ('is_truncated', 'next_key_marker', 'next_upload_id_marker')) == \
+        fields(expected, ('is_truncated', 'next_key_marker', 'next_upload_id_marker'))
+
+
+def test_list_buckets_matches_xml_utils(run):
+    resp = _ChunkedResponse(LIST_BUCKETS)
+    result = run(xml_stream.parse_list_buckets(models.ListBucketsResult(resp), resp))
+    expected = xml_utils.parse_list_buckets(oss2_models.ListBucketsResult(resp), LIST_BUCKETS)
+
+    names = ('name', 'location', 'creation_date', 'extranet_endpoint', 'intranet_endpoint', 'storage_class', 'region')
+    assert [fields(b, names) for b in result.buckets] == [fields(b, names) for b in expected.buckets]
+    assert (result.is_truncated, result.next_marker) == (expected.is_truncated, expected.next_marker)
+    assert (result.owner.id, result.owner.display_name) == ('42', 'me')
+
+
+def test_first_entry_before_body_is_read(run):
+    resp = _ChunkedResponse(LIST_OBJECTS)
+
+    async def first_entry():
+        entries = xml_stream.iter_list_objects(models.ListObjectsResult(resp), resp)
+        entry = await entries.__anext__()
+        await entries.aclose()
+        return entry
+
+    entry = run(first_entry())
+
+    assert entry.key == 'a/中文'
+    assert resp.consumed < LIST_OBJECTS.index(b'</Contents>') + 100
+
+
+def test_content_length_checked(run):
+    body = LIST_OBJECTS[:LIST_OBJECTS.index(b'<CommonPrefixes>')]
+    resp = _ChunkedResponse(body, headers={'Content-Length': str(len(LIST_OBJECTS))})
+
+    with pytest.raises(InconsistentError):
+        run(xml_stream.parse_list_objects(models.ListObjectsResult(resp), resp))
+
+    assert resp.released
+
+    resp = _ChunkedResponse(LIST_OBJECTS, headers={'Content-Length': str(len(LIST_OBJECTS))})
+    result = run(xml_stream.parse_list_objects(models.ListObjectsResult(resp), resp))
+
+    assert len(result.object_list) == 2
+    assert not resp.released
+
+
+def test_released_on_parse_error(run):
+    resp = _ChunkedResponse(LIST_OBJECTS.replace(b'</Contents>', b'</Content>', 1))
+
+    with pytest.raises(ElementTree.ParseError):
+        run(xml_stream.parse_list_objects(models.ListObjectsResult(resp), resp))
+
+    assert resp.released
+
+
+@pytest.mark.parametrize('chunk_size', [1, 64, 1 << 20])
+def test_chunk_boundaries(run, chunk_size):
+    resp = _ChunkedResponse(LIST_OBJECTS, chunk_size)
+    result = run(xml_stream.parse_list_objects(models.ListObjectsResult(resp), resp))
+
+    assert [o.key for o in result.object_list] == ['a/中文', 'a/b&c']
+
+
+def test_list_objects_stream(run, oss, bucket):
+    for key in ['a', 'b', 'd/x', 'e']:
+        oss.put(key, b'x')
+
+    async def list_stream():
+        result = await bucket.list_objects_stream(delimiter='/', max_keys=3)
+        keys = [(entry.key, entry.is_prefix()) async for entry in result.entries]
+        return keys, result.is_truncated, result.next_marker
+
+    assert run(list_stream()) == ([('a', False), ('b', False), ('d/', True)], True, 'd/x')
+
+    result = run(bucket.list_objects(marker='d/x'))
+    assert [o.key for o in result.object_list] == ['e']
+    assert result.is_truncated is False